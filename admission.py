@@ -0,0 +1,329 @@
+import asyncio
+import os
+import time
+from collections import deque
+
+import websockets
+
+from json_codec import decode_twilio
+from media_codec import inbound_media_payload
+from structured_log import log
+
+# Most calls this process handles at once (0: no limit). The limit in force
+# drops below this while the event loop lags or the CPU is saturated.
+ADMISSION_MAX_CALLS = int(os.getenv('ADMISSION_MAX_CALLS', '100'))
+# The limit never drops below this many calls
+ADMISSION_MIN_CALLS = int(os.getenv('ADMISSION_MIN_CALLS', '1'))
+# What happens to a call over the limit: queue (hold, then admit in arrival
+# order), reject, or priority (hold, with calls to ADMISSION_PRIORITY_NUMBERS first)
+ADMISSION_POLICY = os.getenv('ADMISSION_POLICY', 'queue')
+# Calls that may wait on hold; further calls are rejected
+ADMISSION_QUEUE_SIZE = int(os.getenv('ADMISSION_QUEUE_SIZE', '10'))
+# Seconds a call waits on hold before it is rejected
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '20'))
+# Dialed numbers ("to") served first under the priority policy, comma-separated
+ADMISSION_PRIORITY_NUMBERS = os.getenv('ADMISSION_PRIORITY_NUMBERS', '')
+# Event-loop lag (seconds) and process CPU (cores) above which the limit shrinks
+ADMISSION_LAG_TARGET = float(os.getenv('ADMISSION_LAG_TARGET', '0.05'))
+ADMISSION_CPU_TARGET = float(os.getenv('ADMISSION_CPU_TARGET', '0.9'))
+# Seconds between load samples and limit adjustments
+ADMISSION_INTERVAL = float(os.getenv('ADMISSION_INTERVAL', '1'))
+# Raw 8 kHz mulaw played to a call on hold (looped) and to a rejected call
+ADMISSION_HOLD_AUDIO = os.getenv('ADMISSION_HOLD_AUDIO', '')
+ADMISSION_REJECT_AUDIO = os.getenv('ADMISSION_REJECT_AUDIO', '')
+
+POLICIES = ("queue", "reject", "priority")
+# How a call left admission, as counted in AdmissionController.results
+RESULTS = ("admitted", "admitted_after_wait", "rejected_full", "rejected_timeout", "evicted", "abandoned")
+
+# Hold audio is sent this many seconds at a time, at real-time pace
+PROMPT_CHUNK_SECONDS = 0.5
+MULAW_BYTES_PER_SECOND = 8000
+
+
+def load_prompt(path):
+    """Audio of a prompt file, or b"" when none is configured or it cannot be read."""
+    if not path:
+        return b""
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except OSError as e:
+        log.warning("admission_prompt_unavailable", path=path, error=str(e))
+        return b""
+
+
+class AdmissionTicket:
+    """One call's place in admission: "admitted", "queued" or "rejected"."""
+
+    __slots__ = ("priority", "state", "result", "admitted", "queued_at")
+
+    def __init__(self, priority=False):
+        self.priority = priority
+        self.state = None
+        self.result = None
+        # Resolved when a queued call is admitted
+        self.admitted = None
+        self.queued_at = None
+
+
+class AdmissionController:
+    """Caps concurrent calls and decides what happens to calls over the cap.
+
+    request() admits a call while fewer than `limit` calls are running.
+    Otherwise, depending on the policy, the call is queued (wait() returns
+    once a running call ends and frees its slot) or rejected. `limit` starts
+    at `max_calls`; run() samples event-loop lag and process CPU every
+    `interval` seconds, cuts the limit to 90% of the running calls when
+    either is over its target, and raises it again by 5% of `max_calls` per
+    interval once both are well under. Running calls are never dropped: a
+    lower limit only holds back new ones.
+    """
+
+    __slots__ = ("max_calls", "min_calls", "policy", "queue_size", "queue_timeout",
+                 "priority_numbers", "lag_target", "cpu_target", "interval", "lag_monitor",
+                 "on_change", "limit", "active", "_queues", "results", "lag", "cpu", "_dirty")
+
+    def __init__(self, max_calls=ADMISSION_MAX_CALLS, policy=ADMISSION_POLICY,
+                 queue_size=ADMISSION_QUEUE_SIZE, queue_timeout=ADMISSION_QUEUE_TIMEOUT,
+                 priority_numbers=ADMISSION_PRIORITY_NUMBERS, lag_target=ADMISSION_LAG_TARGET,
+                 cpu_target=ADMISSION_CPU_TARGET, min_calls=ADMISSION_MIN_CALLS,
+                 interval=ADMISSION_INTERVAL, lag_monitor=None, on_change=None):
+        if policy not in POLICIES:
+            raise ValueError(f"ADMISSION_POLICY must be one of {', '.join(POLICIES)}, not {policy!r}")
+        self.max_calls = max_calls
+        self.min_calls = max(1, min_calls)
+        self.policy = policy
+        self.queue_size = queue_size if policy != "reject" else 0
+        self.queue_timeout = queue_timeout
+        if isinstance(priority_numbers, str):
+            priority_numbers = priority_numbers.split(",")
+        self.priority_numbers = frozenset(n.strip() for n in priority_numbers if n.strip())
+        self.lag_target = lag_target
+        self.cpu_target = cpu_target
+        self.interval = interval
+        # metrics.LoopLagMonitor whose take_recent() gives the lag since the last sample
+        self.lag_monitor = lag_monitor
+        # Called with snapshot() after each interval in which something changed
+        self.on_change = on_change
+        self.limit = max_calls
+        self.active = 0
+        # Waiting tickets: priority calls, then the rest, each in arrival order
+        self._queues = (deque(), deque())
+        self.results = dict.fromkeys(RESULTS, 0)
+        self.lag = 0.0
+        self.cpu = 0.0
+        self._dirty = True
+
+    def queued(self):
+        return len(self._queues[0]) + len(self._queues[1])
+
+    def request(self, dialed=None):
+        """Admit, queue or reject a new call to `dialed`."""
+        ticket = AdmissionTicket(self.policy == "priority" and dialed in self.priority_numbers)
+        self._dirty = True
+        if not self.max_calls or (self.active < self.limit and not self.queued()):
+            self._admit(ticket, "admitted")
+            return ticket
+        if self.queued() >= self.queue_size and not self._evict_for(ticket):
+            ticket.state = "rejected"
+            self._finish(ticket, "rejected_full")
+            return ticket
+        ticket.state = "queued"
+        ticket.queued_at = time.monotonic()
+        ticket.admitted = asyncio.get_running_loop().create_future()
+        self._queues[0 if ticket.priority else 1].append(ticket)
+        return ticket
+
+    def _evict_for(self, ticket):
+        # A priority call takes the place of the latest ordinary one
+        if not ticket.priority or not self._queues[1]:
+            return False
+        evicted = self._queues[1].pop()
+        evicted.state = "rejected"
+        self._finish(evicted, "evicted")
+        evicted.admitted.set_result(False)
+        return True
+
+    def _admit(self, ticket, result):
+        ticket.state = "admitted"
+        self.active += 1
+        self._finish(ticket, result)
+
+    def _finish(self, ticket, result):
+        ticket.result = result
+        self.results[result] += 1
+
+    async def wait(self, ticket, timeout=None):
+        """Wait for a queued call to be admitted; True once it is.
+
+        Past `timeout` (default: queue_timeout) the call is rejected.
+        """
+        if ticket.state == "queued":
+            try:
+                # Shielded: a cancelled wait leaves the ticket for release()
+                await asyncio.wait_for(asyncio.shield(ticket.admitted),
+                                       self.queue_timeout if timeout is None else timeout)
+            except asyncio.TimeoutError:
+                if ticket.state == "queued":
+                    self._dequeue(ticket)
+                    ticket.state = "rejected"
+                    self._finish(ticket, "rejected_timeout")
+        return ticket.state == "admitted"
+
+    def release(self, ticket):
+        """The call is over (or its caller hung up while queued)."""
+        if ticket.state == "admitted":
+            self.active -= 1
+            ticket.state = "released"
+            self._dispatch()
+        elif ticket.state == "queued":
+            self._dequeue(ticket)
+            ticket.state = "rejected"
+            self._finish(ticket, "abandoned")
+        self._dirty = True
+
+    def _dequeue(self, ticket):
+        self._queues[0 if ticket.priority else 1].remove(ticket)
+
+    def _dispatch(self):
+        """Admit waiting calls into free slots, priority calls first."""
+        while self.active < self.limit:
+            queue = self._queues[0] or self._queues[1]
+            if not queue:
+                return
+            ticket = queue.popleft()
+            self._admit(ticket, "admitted_after_wait")
+            ticket.admitted.set_result(True)
+            self._dirty = True
+
+    def adjust(self, lag, cpu):
+        """Move the limit for one interval's event-loop lag and CPU."""
+        self.lag = lag
+        self.cpu = cpu
+        if not self.max_calls:
+            return
+        previous = self.limit
+        if lag > self.lag_target or cpu > self.cpu_target:
+            if self.active:
+                self.limit = max(self.min_calls, min(self.limit, int(self.active * 0.9)))
+        elif lag < self.lag_target / 2 and cpu < self.cpu_target * 0.8:
+            self.limit = min(self.max_calls, self.limit + max(1, round(self.max_calls * 0.05)))
+        if self.limit != previous:
+            log.info("admission_limit", limit=self.limit, previous=previous, active=self.active,
+                     lag=round(lag, 4), cpu=round(cpu, 2))
+            self._dirty = True
+            self._dispatch()
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        wall, cpu = loop.time(), time.process_time()
+        while True:
+            await asyncio.sleep(self.interval)
+            now, cpu_now = loop.time(), time.process_time()
+            lag = self.lag_monitor.take_recent() if self.lag_monitor is not None else 0.0
+            self.adjust(lag, (cpu_now - cpu) / (now - wall))
+            wall, cpu = now, cpu_now
+            if self._dirty and self.on_change is not None:
+                self._dirty = False
+                self.on_change(self.snapshot())
+
+    def snapshot(self):
+        return {"policy": self.policy, "max_calls": self.max_calls, "limit": self.limit,
+                "active": self.active, "queued": self.queued(), "lag": round(self.lag, 4),
+                "cpu": round(self.cpu, 2), "results": dict(self.results)}
+
+
+async def wait_for_start(ws, timeout):
+    """Read a Twilio stream up to its start event: (messages read, start event).
+
+    The start event is None if the stream closed or `timeout` passed first.
+    """
+    messages = []
+
+    async def read():
+        async for message in ws:
+            messages.append(message)
+            if isinstance(message, str) and inbound_media_payload(message) is not None:
+                continue
+            event = decode_twilio(message)
+            if event.event == "start":
+                return event
+        return None
+
+    try:
+        return messages, await asyncio.wait_for(read(), timeout or None)
+    except (asyncio.TimeoutError, ValueError, websockets.ConnectionClosed):
+        return messages, None
+
+
+async def _until_stop(ws, mark=None):
+    """Read and discard a held call's events until it stops or `mark` comes back."""
+    try:
+        async for message in ws:
+            if isinstance(message, str) and inbound_media_payload(message) is not None:
+                continue
+            try:
+                event = decode_twilio(message)
+            except ValueError:
+                continue
+            if event.event == "stop" or (mark is not None and event.event == "mark" and event.name == mark):
+                return
+    except websockets.ConnectionClosed:
+        return
+
+
+async def _play(ws, encoder, audio, repeat):
+    step = int(PROMPT_CHUNK_SECONDS * MULAW_BYTES_PER_SECOND)
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    while True:
+        for offset in range(0, len(audio), step):
+            chunk = audio[offset:offset + step]
+            await ws.send(encoder.media(chunk))
+            # Stay about one chunk ahead of playback
+            next_at += len(chunk) / MULAW_BYTES_PER_SECOND
+            await asyncio.sleep(max(0.0, next_at - loop.time() - PROMPT_CHUNK_SECONDS))
+        if not repeat:
+            return
+
+
+async def hold(ws, encoder, controller, ticket, audio=b""):
+    """Play `audio` in a loop to a queued call until it is admitted.
+
+    Returns True once admitted, with the hold audio cleared; False if the
+    wait timed out or the caller hung up (the ticket is then released by
+    the caller of hold(), like an admitted one).
+    """
+    waiter = asyncio.ensure_future(controller.wait(ticket))
+    listener = asyncio.ensure_future(_until_stop(ws))
+    player = asyncio.ensure_future(_play(ws, encoder, audio, repeat=True)) if audio else None
+    try:
+        await asyncio.wait((waiter, listener), return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        for task in (waiter, listener, player):
+            if task is not None:
+                task.cancel()
+        await asyncio.gather(*(task for task in (waiter, listener, player) if task is not None),
+                             return_exceptions=True)
+    if ticket.state != "admitted":
+        return False
+    try:
+        await ws.send(encoder.clear())
+    except websockets.ConnectionClosed:
+        return False
+    return True
+
+
+async def reject(ws, encoder, audio=b"", timeout=2.0):
+    """Play `audio` to a rejected call, wait for it to be heard, and hang up."""
+    try:
+        if audio:
+            await _play(ws, encoder, audio, repeat=False)
+            await ws.send(encoder.mark("rejected"))
+            await asyncio.wait_for(_until_stop(ws, mark="rejected"),
+                                   PROMPT_CHUNK_SECONDS + timeout)
+    except (websockets.ConnectionClosed, asyncio.TimeoutError):
+        pass
+    finally:
+        await ws.close()
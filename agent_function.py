@@ -1,43 +1,74 @@
-import json
+import threading
 from datetime import datetime
+from booking_store import BookingStore, SlotUnavailableError, slot_time
+from slot_index import SlotIndex, spoken_time
+from structured_log import log
 
-# File path for the booking database
+# Legacy JSON booking database, imported into the booking store on first use
 BOOKING_DB_FILE = 'booking_db.json'
 
+_booking_store = None
+_booking_store_lock = threading.Lock()
+
+def get_booking_store():
+    """Open the booking store, importing booking_db.json the first time."""
+    global _booking_store
+    with _booking_store_lock:
+        if _booking_store is None:
+            store = BookingStore()
+            imported = store.import_json(BOOKING_DB_FILE)
+            if imported:
+                log.info("bookings_imported", count=imported, path=BOOKING_DB_FILE)
+            _booking_store = store
+    return _booking_store
+
+_slot_index = None
+
+def get_slot_index():
+    """Index of booked slots over the booking store, built on first use."""
+    global _slot_index
+    with _booking_store_lock:
+        if _slot_index is not None:
+            return _slot_index
+    index = SlotIndex(get_booking_store())
+    index.sync()
+    with _booking_store_lock:
+        if _slot_index is None:
+            _slot_index = index
+        return _slot_index
+
 def load_bookings():
-    """Load existing bookings from the JSON file."""
-    try:
-        with open(BOOKING_DB_FILE, 'r') as file:
-            data = json.load(file)
-            return data.get("bookings", [])
-    except FileNotFoundError:
-        return []  # Return an empty list if the file doesn't exist
-    except json.JSONDecodeError:
-        return []  # If the file is corrupted or empty, return an empty list
+    """Load existing bookings from the booking store."""
+    return get_booking_store().all()
 
 def save_bookings(bookings):
-    """Save the updated list of bookings to the JSON file."""
-    with open(BOOKING_DB_FILE, 'w') as file:
-        json.dump({"bookings": bookings}, file, indent=4)
-    print("Bookings saved successfully!")
+    """Replace the stored bookings with the given list."""
+    get_booking_store().replace_all(bookings)
+    log.info("bookings_saved", count=len(bookings))
 
-def create_booking(name, age, symptoms, treatment, email, phone, appointment_date, appointment_time):
-    """Create a new booking and save it to the file."""
+def create_booking(name, age, symptoms, treatment, email, appointment_date, appointment_time, phone=None):
+    """Create a new booking and save it to the booking store."""
     # Validate the input data
-    if not name or not age or not symptoms or not treatment or not email or not phone or not appointment_date or not appointment_time:
+    if not name or not age or not symptoms or not treatment or not email or not appointment_date or not appointment_time:
         raise ValueError("All fields are required to create a booking.")
 
     # Format the booking date and time to ensure it's consistent
     try:
         # Ensure the date is in the correct format (YYYY-MM-DD)
-        datetime.strptime(appointment_date, '%Y-%m-%d')
+        day = datetime.strptime(appointment_date, '%Y-%m-%d').date()
         # Ensure the time is in the correct format (HH:MM AM/PM)
-        datetime.strptime(appointment_time, '%I:%M %p')
+        slot = slot_time(appointment_time)
     except ValueError:
         raise ValueError("Invalid date or time format. Please use 'YYYY-MM-DD' for date and 'HH:MM AM/PM' for time.")
 
-    # Load existing bookings
-    bookings = load_bookings()
+    # Only times on the booking calendar, and not ones that have passed
+    index = get_slot_index()
+    if datetime.combine(day, datetime.strptime(slot, '%H:%M').time()) <= datetime.now():
+        raise ValueError(f"{appointment_date} at {appointment_time} has already passed.")
+    if not index.calendar.is_open(day, slot):
+        free = [spoken_time(free_slot) for free_slot in index.free_slots(appointment_date, treatment)]
+        alternatives = f" Free times that day: {', '.join(free)}." if free else " No times are free that day."
+        raise ValueError(f"{appointment_time} on {appointment_date} is outside booking hours.{alternatives}")
 
     # Create the new booking entry
     new_booking = {
@@ -47,28 +78,53 @@ def create_booking(name, age, symptoms, treatment, email, phone, appointment_dat
         "treatment": treatment,
         "appointment_date": appointment_date,
         "appointment_time": appointment_time,
-        "contact_email": email
+        "contact_email": email,
+        "contact_phone": phone
     }
 
-    # Add the new booking to the list
-    bookings.append(new_booking)
-
-    # Save the updated bookings to the file
-    save_bookings(bookings)
+    # Append the booking to the store; the slot check and the insert are one
+    # transaction, so two callers cannot both get the last place
+    try:
+        get_booking_store().add(new_booking, slot=index.calendar.bounds(slot))
+    except SlotUnavailableError as e:
+        free = [spoken_time(slot) for slot in index.free_slots(appointment_date, treatment)]
+        alternatives = f" Free times that day: {', '.join(free)}." if free else " No other times are free that day."
+        raise SlotUnavailableError(f"{e}{alternatives}") from None
+    index.sync()
 
     return f"Booking for {name} has been created successfully!"
 
 # Example usage:
 # Uncomment to test the create_booking function
-# create_booking('John Doe', 34, 'Knee pain, limited mobility', 'PRP', 'john.doe@example.com', '+1234567890', '2025-08-28', '10:00 AM')
+# create_booking('John Doe', 34, 'Knee pain, limited mobility', 'PRP', 'john.doe@example.com', '2025-08-28', '10:00 AM', phone='+1234567890')
+def check_availability(date, treatment):
+    """Free appointment times for a treatment on one date."""
+    try:
+        datetime.strptime(date, '%Y-%m-%d')
+    except ValueError:
+        raise ValueError("Invalid date format. Please use 'YYYY-MM-DD'.")
+    free = get_slot_index().free_slots(date, treatment)
+    return {
+        "date": date,
+        "treatment": treatment,
+        "available_times": [spoken_time(slot) for slot in free],
+    }
+
+def next_free_slots(n=3, treatment=None):
+    """The next n free appointment slots, soonest first.
+
+    Without a treatment, only slots with nothing booked are returned.
+    """
+    n = max(1, min(int(n), 10))
+    slots = get_slot_index().next_free(n, treatment)
+    return {
+        "treatment": treatment,
+        "slots": [{"date": day, "time": spoken_time(slot)} for day, slot in slots],
+    }
+
 def send_email(email_address):
     return f"Email sent to {email_address} successfully"
 
-FUNCTION_MAP = {
-    'create_booking' : create_booking,
-    'send_email' : send_email
-}
-
 
 # print(get_user_data("USR001"))
 # {
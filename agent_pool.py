@@ -0,0 +1,254 @@
+import asyncio
+import os
+import time
+from contextlib import asynccontextmanager
+
+from structured_log import log
+
+# Warm connections kept ready even with no traffic (0: only after a call
+# has missed the pool), and the cap on warm + connecting ones, per worker
+# process. Each warm connection has been sent Settings, so it is a live
+# agent session
+AGENT_POOL_MIN = int(os.getenv('AGENT_POOL_MIN', '0'))
+AGENT_POOL_MAX = int(os.getenv('AGENT_POOL_MAX', '8'))
+# Seconds between health checks / KeepAlive messages on idle connections
+AGENT_POOL_KEEPALIVE = float(os.getenv('AGENT_POOL_KEEPALIVE', '5'))
+# Idle connections older than this are recycled (seconds). Every recycle
+# opens a new session, so this is kept long
+AGENT_POOL_MAX_IDLE = float(os.getenv('AGENT_POOL_MAX_IDLE', '1800'))
+# Seconds without a call before the pool gives up one warm connection above
+# AGENT_POOL_MIN
+AGENT_POOL_SHRINK_AFTER = float(os.getenv('AGENT_POOL_SHRINK_AFTER', '300'))
+# Seconds to wait for a pong before declaring an idle connection dead
+AGENT_POOL_PING_TIMEOUT = float(os.getenv('AGENT_POOL_PING_TIMEOUT', '5'))
+
+KEEPALIVE_MESSAGE = '{"type": "KeepAlive"}'
+
+
+class AgentConnection:
+    """An agent websocket that has already been sent a Settings payload."""
+
+    __slots__ = ("ws", "config", "connect_started", "ready_at", "pooled", "acquired_at",
+                 "first_audio_at")
+
+    def __init__(self, ws, config, connect_started, pooled):
+        self.ws = ws
+        self.config = config
+        self.connect_started = connect_started
+        self.ready_at = time.monotonic()
+        self.pooled = pooled
+        self.acquired_at = None
+        self.first_audio_at = None
+
+    @property
+    def open(self):
+        return not self.ws.closed
+
+
+class LatencyStats:
+    __slots__ = ("count", "total", "max", "last")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.last = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.total += seconds
+        self.last = seconds
+        if seconds > self.max:
+            self.max = seconds
+
+    def as_dict(self):
+        return {
+            "count": self.count,
+            "avg": self.total / self.count if self.count else 0.0,
+            "max": self.max,
+            "last": self.last,
+        }
+
+
+class AgentConnectionPool:
+    """Keeps pre-configured agent connections ready for incoming calls.
+
+    Each warm connection has completed the TLS/websocket handshake and been
+    sent the current Settings, so a call can start streaming immediately.
+    When the pool is empty, acquire() falls back to connecting on demand.
+    Connections configured with an older config version are discarded.
+    A warm connection is an open agent session from the moment Settings is
+    sent, billed like a call, so the pool grows only on misses and shrinks
+    by one connection per `shrink_after` seconds without a call, down to
+    `min_size` (which may be 0).
+    With `resources` (a ResourceRegistry), every open socket, idle or in a
+    call, is counted as an "agent_socket" until it is closed.
+    """
+
+    def __init__(self, connect, current_config, min_size=AGENT_POOL_MIN, max_size=AGENT_POOL_MAX,
+                 keepalive=AGENT_POOL_KEEPALIVE, max_idle=AGENT_POOL_MAX_IDLE,
+                 shrink_after=AGENT_POOL_SHRINK_AFTER, ping_timeout=AGENT_POOL_PING_TIMEOUT,
+                 resources=None):
+        self.connect = connect
+        self.current_config = current_config
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size)
+        self.keepalive = keepalive
+        self.max_idle = max_idle
+        self.shrink_after = shrink_after
+        self.ping_timeout = ping_timeout
+        self.resources = resources
+        self._idle = []
+        self._connecting = 0
+        # Warm connections to keep; grows on misses up to max_size and decays
+        # back to min_size while the pool goes unused
+        self.target = min_size
+        self._last_used = time.monotonic()
+        self._refill_wakeup = None
+        self._tasks = []
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.discarded = 0
+        self.first_audio = {"pooled": LatencyStats(), "on_demand": LatencyStats()}
+
+    async def _open(self, config, pooled):
+        started = time.monotonic()
+        ws = await self.connect()
+        try:
+            await ws.send(config.message)
+        except Exception:
+            await ws.close()
+            raise
+        if self.resources is not None:
+            self.resources.acquire("agent_socket")
+        return AgentConnection(ws, config, started, pooled)
+
+    async def _close(self, conn):
+        try:
+            await conn.ws.close()
+        finally:
+            if self.resources is not None:
+                self.resources.release("agent_socket")
+
+    def start(self):
+        if self._tasks:
+            return
+        self._refill_wakeup = asyncio.Event()
+        self._tasks = [
+            asyncio.ensure_future(self._refill_loop()),
+            asyncio.ensure_future(self._health_loop()),
+        ]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        idle, self._idle = self._idle, []
+        await asyncio.gather(*(self._close(conn) for conn in idle), return_exceptions=True)
+
+    async def acquire(self):
+        """Return a ready AgentConnection, from the pool if possible."""
+        acquired_at = self._last_used = time.monotonic()
+        config = self.current_config()
+        while self._idle:
+            conn = self._idle.pop()
+            if conn.open and conn.config is config:
+                self.hits += 1
+                self._wake_refill()
+                conn.acquired_at = acquired_at
+                return conn
+            self._discard(conn)
+        self.misses += 1
+        self.target = min(self.max_size, self.target + 1)
+        self._wake_refill()
+        conn = await self._open(config, pooled=False)
+        conn.acquired_at = acquired_at
+        return conn
+
+    @asynccontextmanager
+    async def connection(self):
+        """acquire() as a context manager that closes the socket afterwards."""
+        conn = await self.acquire()
+        try:
+            yield conn
+        finally:
+            await self._close(conn)
+
+    def record_first_audio(self, conn):
+        """Record the time from acquire() (call connect) to the first agent audio."""
+        if conn.first_audio_at is not None:
+            return
+        conn.first_audio_at = time.monotonic()
+        stats = self.first_audio["pooled" if conn.pooled else "on_demand"]
+        stats.add(conn.first_audio_at - conn.acquired_at)
+
+    def _discard(self, conn):
+        self.discarded += 1
+        asyncio.ensure_future(self._close(conn))
+
+    def _wake_refill(self):
+        if self._refill_wakeup is not None:
+            self._refill_wakeup.set()
+
+    async def _refill_loop(self):
+        backoff = 0.5
+        while True:
+            while len(self._idle) + self._connecting < self.target:
+                self._connecting += 1
+                try:
+                    conn = await self._open(self.current_config(), pooled=True)
+                except Exception as e:
+                    self.failures += 1
+                    log.warning("agent_pool_connect_failed", error=str(e))
+                    await asyncio.sleep(backoff)
+                    backoff = min(backoff * 2, 30)
+                    continue
+                finally:
+                    self._connecting -= 1
+                backoff = 0.5
+                self._idle.append(conn)
+            self._refill_wakeup.clear()
+            await self._refill_wakeup.wait()
+
+    async def _health_loop(self):
+        while True:
+            await asyncio.sleep(self.keepalive)
+            config = self.current_config()
+            now = time.monotonic()
+            for conn in list(self._idle):
+                stale = conn.config is not config or now - conn.ready_at > self.max_idle
+                healthy = conn.open and not stale and await self._check(conn)
+                if not healthy and conn in self._idle:
+                    self._idle.remove(conn)
+                    self._discard(conn)
+            if (self.target > self.min_size and len(self._idle) >= self.target
+                    and now - self._last_used > self.shrink_after):
+                # No call for a while; shrink by one, then wait another period
+                self._last_used = now
+                self.target -= 1
+                if len(self._idle) > self.target:
+                    self._discard(self._idle.pop(0))
+            self._wake_refill()
+
+    async def _check(self, conn):
+        try:
+            await conn.ws.send(KEEPALIVE_MESSAGE)
+            pong = await conn.ws.ping()
+            await asyncio.wait_for(pong, self.ping_timeout)
+            return True
+        except Exception:
+            return False
+
+    def snapshot(self):
+        return {
+            "idle": len(self._idle),
+            "target": self.target,
+            "connecting": self._connecting,
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "discarded": self.discarded,
+            "first_audio": {kind: stats.as_dict() for kind, stats in self.first_audio.items()},
+        }
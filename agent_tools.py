@@ -0,0 +1,113 @@
+"""The agent's tools, each declared once.
+
+The function schemas sent to the agent (config.json lists tools by name),
+argument validation, result caching and timeouts all come from these
+declarations. Implementations are imported on a tool's first call.
+
+Print schemas for pasting elsewhere with:
+    python agent_tools.py [--group menu] [names...]
+"""
+import argparse
+import json
+
+from tool_cache import CachePolicy
+from tool_registry import Param, ToolRegistry
+
+TREATMENTS = ("PRP", "Lasers", "Non-Operative Orthopedics")
+
+TOOLS = ToolRegistry()
+
+# Clinic bookings. Lookups are cached per argument set until a booking is
+# written (or, for bookings made by other workers, until the TTL runs out);
+# writes declare what they invalidate.
+TOOLS.add(
+    "create_booking", "agent_function:create_booking",
+    "Create a new booking and save it to the system. The booking includes customer details like name, age, symptoms, treatment, and appointment information.",
+    {
+        "name": Param("string", "The full name of the customer booking the appointment."),
+        "age": Param("integer", "The age of the customer.", minimum=0, maximum=130),
+        "symptoms": Param("string", "The symptoms or medical condition the customer is experiencing (e.g., 'Knee pain')."),
+        "treatment": Param("string", "The treatment type being requested. Must be one of 'PRP', 'Lasers', or 'Non-Operative Orthopedics'.",
+                           enum=TREATMENTS),
+        "email": Param("string", "The email address of the customer."),
+        "appointment_date": Param("string", "The preferred appointment date (in 'YYYY-MM-DD' format)."),
+        "appointment_time": Param("string", "The preferred appointment time (in 'HH:MM AM/PM' format)."),
+    },
+    group="clinic", invalidates=("bookings",), timeout=10.0,
+)
+TOOLS.add(
+    "check_availability", "agent_function:check_availability",
+    "List the free appointment times for a treatment on a given date. Use this before booking, when a customer asks whether a day or time is available, or when create_booking reports that a slot is taken.",
+    {
+        "date": Param("string", "The date to check (in 'YYYY-MM-DD' format)."),
+        "treatment": Param("string", "The treatment type. Must be one of 'PRP', 'Lasers', or 'Non-Operative Orthopedics'.",
+                           enum=TREATMENTS),
+    },
+    group="clinic", cache=CachePolicy(ttl=15, max_entries=512, tags=("bookings",)),
+)
+TOOLS.add(
+    "next_free_slots", "agent_function:next_free_slots",
+    "Find the soonest free appointment slots. Use this when the customer asks for the next available appointment or has no preferred date.",
+    {
+        # Clamped to 1-10 by the function rather than rejected
+        "n": Param("integer", "How many slots to return (1 to 10)."),
+        "treatment": Param("string", "The treatment type. Must be one of 'PRP', 'Lasers', or 'Non-Operative Orthopedics'.",
+                           required=False, enum=TREATMENTS),
+    },
+    group="clinic", cache=CachePolicy(ttl=15, max_entries=64, tags=("bookings",)),
+)
+TOOLS.add(
+    "send_email", "agent_function:send_email",
+    "Send an email to the provided email address with a predefined message. The function takes the recipient's email as a parameter and sends an email to that address.",
+    {
+        "email_address": Param("string", "The recipient's email address to which the email will be sent."),
+    },
+    group="clinic", cache=CachePolicy(idempotent=False), timeout=15.0,
+)
+
+# Restaurant menu (ai-voice-dashboard/rest_menu.py). The menu is static, so
+# results stay cached until evicted.
+TOOLS.add(
+    "get_menu_classes", "menu_catalog:get_menu_classes",
+    "Get the list of menu categories. Use this function when: A user asks for the available categories in the menu. A user asks for types of dishes available at the restaurant. This function will give the user a list of the categories like 'Biryani', 'Curries', 'Tandoori', etc.",
+    group="menu", cache=CachePolicy(max_entries=1, tags=("menu",)),
+)
+TOOLS.add(
+    "get_dishes_in_class", "menu_catalog:get_dishes_in_class",
+    "Get the list of dishes in a selected category. Use this function when: A user selects a category of the menu and asks for the dishes within that category. This function will return only the dishes belonging to the chosen category like 'Biryani', 'Curries', etc.",
+    {
+        "class_name": Param("string", "The name of the category chosen by the user. Examples: 'Biryani', 'Curries', 'Tandoori', etc."),
+    },
+    group="menu", cache=CachePolicy(max_entries=128, tags=("menu",)),
+)
+TOOLS.add(
+    "get_dish_details", "menu_catalog:get_dish_details",
+    "Get the price, taste, origin, main ingredients and dietary tags (as marked on the menu) of one dish. Use this function when: A user asks about a specific dish. The name may be misheard; the closest dish on the menu is returned.",
+    {
+        "dish_name": Param("string", "The dish name as the user said it, e.g. 'Butter Chicken'."),
+    },
+    group="menu", cache=CachePolicy(max_entries=256, tags=("menu",)),
+)
+TOOLS.add(
+    "find_dishes", "menu_catalog:find_dishes",
+    "Find dishes by ingredient and/or dietary need. Use this function when: A user asks for dishes with or without an ingredient, or for vegetarian, vegan or gluten-free options. Only dishes the menu marks with the tag are returned.",
+    {
+        "ingredient": Param("string", "An ingredient the dish should contain, e.g. 'paneer' or 'mango'.",
+                            required=False),
+        "dietary": Param("string", "One of 'vegetarian', 'vegan', 'gluten-free', 'non-vegetarian'.",
+                         required=False),
+    },
+    group="menu", cache=CachePolicy(max_entries=128, tags=("menu",)),
+)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Print agent.think.functions schemas.")
+    parser.add_argument("names", nargs="*", help="tools to print (default: all)")
+    parser.add_argument("--group", choices=TOOLS.groups())
+    args = parser.parse_args()
+    print(json.dumps(TOOLS.schemas(args.names or None, args.group), indent=4))
+
+
+if __name__ == "__main__":
+    main()
@@ -30,60 +30,80 @@ Menu
 Menu Descriptions
 
 1. Hyderabadi Dum Biryani
+    Category: Biryani
+    Dietary: Non-Vegetarian
     Taste: Spicy, savory, and aromatic.
     Origin: Hyderabad, India
     Main Ingredients: Long-grain basmati rice, marinated chicken or mutton, saffron, yogurt, and a blend of spices.
     Flavour: The rice is infused with the savory essence of meat or vegetables, and the slow-cooked biryani gives off a rich, tantalizing fragrance from the saffron and ghee.
 
 2. Butter Chicken
+    Category: Curries
+    Dietary: Non-Vegetarian
     Taste: Creamy, mildly spiced, and indulgent.
     Origin: Delhi, India
     Main Ingredients: Boneless chicken, tomatoes, cream, butter, and a mix of aromatic spices.
     Flavour: The dish is rich and creamy, with a mild, smoky flavor from the tandoor, combined with the tang of tomatoes and the richness of butter and cream.
 
 3. Paneer Tikka
+    Category: Tandoori
+    Dietary: Vegetarian
     Taste: Spicy, smoky, and tangy.
     Origin: North India
     Main Ingredients: Paneer (Indian cottage cheese), yogurt, red chili powder, turmeric, cumin, and coriander.
     Flavour: The marinated paneer cubes are grilled to perfection in the tandoor, giving them a smoky flavor and a crunchy outer layer, while the inside remains soft and juicy.
 
 4. Methi Thepla
+    Category: Breads
+    Dietary: Vegetarian
     Taste: Earthy, savory, and lightly spiced.
     Origin: Gujarat, India
     Main Ingredients: Whole wheat flour, fenugreek leaves, turmeric, cumin, and coriander.
     Flavour: A flatbread that’s soft, savory, and slightly bitter from the fenugreek, with a warm spiciness that pairs perfectly with yogurt or pickle.
 
 5. Tandoori Roti
+    Category: Breads
+    Dietary: Vegetarian
     Taste: Soft, chewy, and slightly smoky.
     Origin: North India
     Main Ingredients: Whole wheat flour, salt, water, and ghee.
     Flavour: A simple, smoky flatbread baked in the tandoor. Its chewy texture and slight crispness make it the perfect accompaniment to any curry or gravy.
 
 6. Aloo Paratha
+    Category: Breads
+    Dietary: Vegetarian
     Taste: Warm, comforting, and spicy.
     Origin: Punjab, India
     Main Ingredients: Whole wheat flour, mashed potatoes, onions, green chilies, and spices.
     Flavour: A stuffed flatbread filled with spiced potatoes. When served hot with yogurt and pickle, it’s an unbeatable comfort food.
 
 7. Chicken Seekh Kebab
+    Category: Tandoori
+    Dietary: Non-Vegetarian
     Taste: Juicy, smoky, and spicy.
     Origin: Delhi, India
     Main Ingredients: Ground chicken, onions, garlic, green chilies, and a blend of spices.
     Flavour: Minced chicken mixed with a fragrant blend of spices, then grilled on skewers to perfection, creating a smoky, juicy, and flavorful kebab.
 
 8. Gulab Jamun
+    Category: Desserts
+    Dietary: Vegetarian
     Taste: Sweet, warm, and soft.
     Origin: India
     Main Ingredients: Milk solids (khoya), sugar, ghee, cardamom, and rose water.
     Flavour: Soft, syrup-soaked dumplings that melt in your mouth with a perfect balance of sweetness, flavored with a hint of rose and cardamom.
 
 9. Mango Lassi
+    Category: Beverages
+    Dietary: Vegetarian
     Taste: Refreshing, sweet, and creamy.
     Origin: Punjab, India
     Main Ingredients: Yogurt, fresh mango pulp, sugar, and cardamom.
     Flavour: A smooth, creamy drink that combines the rich sweetness of ripe mangoes with the tartness of yogurt, perfect for cooling down.
 
 10. Masala Chai
+    Category: Beverages
+    Dietary: Vegetarian
     Taste: Warm, spiced, and aromatic.
     Origin: India
     Main Ingredients: Black tea, milk, ginger, cardamom, cloves, cinnamon, and sugar.
@@ -108,31 +128,9 @@ Delivery Options: Yes, available via our app and popular delivery services (Zoma
 Special Requests: Vegan, vegetarian, and gluten-free options available. Please inform the staff about any allergies.
 """
 
-
-"functions": [
-                {
-                    "name": "get_menu_classes",
-                    "description": "Get the list of menu categories. Use this function when: A user asks for the available categories in the menu. A user asks for types of dishes available at the restaurant. This function will give the user a list of the categories like 'Biryani', 'Curries', 'Tandoori', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {}
-                    },
-                    "required": []
-                },
-                {
-                    "name": "get_dishes_in_class",
-                    "description": "Get the list of dishes in a selected category. Use this function when: A user selects a category of the menu and asks for the dishes within that category. This function will return only the dishes belonging to the chosen category like 'Biryani', 'Curries', etc.",
-                    "parameters": {
-                        "type": "object",
-                        "properties": {
-                            "class_name": {
-                                "type": "string",
-                                "description": "The name of the category chosen by the user. Examples: 'Biryani', 'Curries', 'Tandoori', etc."
-                            }
-                        },
-                        "required": [
-                            "class_name"
-                        ]
-                    }
-                }
-            ]
\ No newline at end of file
+# Tool schemas for a restaurant agent: list get_menu_classes,
+# get_dishes_in_class, get_dish_details and find_dishes by name in
+# agent.think.functions (config.json), or print them with
+# `python agent_tools.py --group menu`. The tools are implemented in
+# menu_catalog.py, so the prompt only needs the basic details above instead
+# of the whole menu.
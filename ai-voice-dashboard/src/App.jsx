@@ -1,4 +1,4 @@
-import { useState, useEffect } from 'react';
+import { useState, useEffect, useRef } from 'react';
 import CallLogs from './components/CallLogs';
 import ActiveCall from './components/ActiveCall';
 import Header from './components/Header';
@@ -9,42 +9,167 @@ function App() {
   const [calls, setCalls] = useState([]);
   const [ws, setWs] = useState(null);
   const [showSidebar, setShowSidebar] = useState(false);
+  // Last transcript sequence number applied per call, used to detect gaps
+  const lastSeqRef = useRef({});
 
-  // Load saved calls from localStorage on page load
-  useEffect(() => {
-    const savedCalls = localStorage.getItem("call_logs");
-    if (savedCalls) {
-      setCalls(JSON.parse(savedCalls));
+  // Older calls from the server's call history, loaded a page at a time
+  const [history, setHistory] = useState({ calls: [], cursor: null, hasMore: true, loading: false });
+
+  // Live admission counters reported by each server worker
+  const [admission, setAdmission] = useState({});
+
+  // Remarks typed on this dashboard, by CallSid. Kept apart from the call
+  // lists so they survive snapshots, reconnects and reloaded history pages.
+  const [remarks, setRemarks] = useState({});
+
+  const handleUpdateCallRemark = (callSid, remark) => {
+    setRemarks(prev => ({ ...prev, [callSid]: remark }));
+  };
+
+  const withRemark = (call) =>
+    call && call.CallSid in remarks ? { ...call, remark: remarks[call.CallSid] } : call;
+
+  // Derive active call from the live calls, then from the history
+  const activeCall = activeCallSid
+    ? withRemark(calls.find(call => call.CallSid === activeCallSid) || history.calls.find(call => call.CallSid === activeCallSid))
+    : null;
+
+  // Append transcript turns the call has not seen yet. Consecutive user turns
+  // are merged into one message bubble.
+  const applyTranscriptTurns = (call, turns) => {
+    let messages = [...(call.messages || [])];
+    let lastSeq = call.lastSeq || 0;
+
+    turns.forEach(turn => {
+      if (turn.seq <= lastSeq) {
+        return;
+      }
+      const speaker = turn.role === 'user' ? 'user' : 'ai';
+      const last = messages[messages.length - 1];
+      if (speaker === 'user' && last && last.speaker === 'user') {
+        messages[messages.length - 1] = { ...last, text: `${last.text} ${turn.text}`, timestamp: Date.now() };
+      } else {
+        messages.push({ speaker, text: turn.text, timestamp: Date.now() });
+      }
+      lastSeq = turn.seq;
+    });
+
+    return { ...call, messages, lastSeq };
+  };
+
+  // Server-side state (active and recent calls) as sent on connect; replaces
+  // what we had
+  const applyDashboardSnapshot = (snapshot) =>
+    [...snapshot.active, ...snapshot.recent].map(view => {
+      const { turns, last_seq: lastSeq, ...fields } = view;
+      return applyTranscriptTurns({ ...fields, messages: [], lastSeq: 0 }, turns);
+    });
+
+  const requestHistoryPage = (socket, cursor) => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({ type: 'call_history_request', cursor, limit: 50 }));
     }
-  }, []);
+  };
 
-  // Save calls to localStorage whenever they change
-  useEffect(() => {
-    if (calls.length > 0) {
-      localStorage.setItem("call_logs", JSON.stringify(calls));
+  const loadMoreHistory = () => {
+    if (history.loading || !history.hasMore) {
+      return;
     }
-  }, [calls]);
+    setHistory(prev => ({ ...prev, loading: true }));
+    requestHistoryPage(ws, history.cursor);
+  };
 
-  const handleUpdateCallRemark = (callSid, remark) => {
-  setCalls(prevCalls => {
-    const updatedCalls = prevCalls.map(call => 
-      call.CallSid === callSid ? { ...call, remark } : call
-    );
-    
-    // Save to localStorage
-    localStorage.setItem('callLogs', JSON.stringify(updatedCalls));
-    
-    return updatedCalls;
-  });
-};
-
-  // Derive active call from calls array
-  const activeCall = activeCallSid ? calls.find(call => call.CallSid === activeCallSid) : null;
+  const applyHistoryMessage = (data) => {
+    if (data.type === 'call_history_page') {
+      setHistory(prev => {
+        // A reply for a page we already have (e.g. after a reconnect)
+        if ((data.data.cursor || null) !== prev.cursor) {
+          return { ...prev, loading: false };
+        }
+        const known = new Set(prev.calls.map(call => call.CallSid));
+        const calls = data.data.calls
+          .filter(call => !known.has(call.CallSid))
+          .map(call => ({ ...call, messages: null }));
+        return {
+          calls: [...prev.calls, ...calls],
+          cursor: data.data.next_cursor,
+          hasMore: data.data.next_cursor !== null,
+          loading: false
+        };
+      });
+      return true;
+    }
+    if (data.type === 'call_detail') {
+      const record = data.data.record;
+      setHistory(prev => ({
+        ...prev,
+        calls: prev.calls.map(call =>
+          call.CallSid === data.data.CallSid
+            ? applyTranscriptTurns({ ...call, messages: [], lastSeq: 0 }, record ? record.turns : [])
+            : call
+        )
+      }));
+      return true;
+    }
+    return false;
+  };
+
+  const requestTranscriptSnapshot = (socket, callSid, fromSeq) => {
+    if (socket && socket.readyState === WebSocket.OPEN) {
+      socket.send(JSON.stringify({
+        type: 'transcript_snapshot_request',
+        call_sid: callSid,
+        from_seq: fromSeq
+      }));
+    }
+  };
+
+  // Track sequence numbers outside the state reducer; returns false when a
+  // delta must be dropped because a snapshot has been requested instead
+  const checkTranscriptSequence = (socket, data) => {
+    const seqs = lastSeqRef.current;
+    if (data.type === 'transcript_delta') {
+      const { call_sid: callSid, seq } = data.data;
+      const lastSeq = seqs[callSid] || 0;
+      if (seq <= lastSeq) {
+        return false;
+      }
+      if (seq > lastSeq + 1) {
+        requestTranscriptSnapshot(socket, callSid, lastSeq);
+        return false;
+      }
+      seqs[callSid] = seq;
+    } else if (data.type === 'transcript_snapshot') {
+      const { call_sid: callSid, last_seq: lastSeq } = data.data;
+      seqs[callSid] = Math.max(seqs[callSid] || 0, lastSeq);
+    } else if (data.type === 'dashboard_snapshot') {
+      lastSeqRef.current = {};
+      data.data.active.forEach(view => {
+        lastSeqRef.current[view.CallSid] = view.last_seq;
+      });
+    }
+    return true;
+  };
+
+  // Returns true when the message only carries admission counters
+  const applyAdmissionMessage = (data) => {
+    if (data.type === 'admission') {
+      setAdmission(prev => ({ ...prev, [data.data.worker]: data.data }));
+      return true;
+    }
+    if (data.type === 'dashboard_snapshot') {
+      setAdmission(Object.fromEntries((data.data.admission || []).map(stats => [stats.worker, stats])));
+    }
+    return false;
+  };
 
   // Connect to WebSocket server
   const handleWebSocketMessage = (data) => {
     setCalls(prevCalls => {
       switch (data.type) {
+        case 'dashboard_snapshot':
+          return applyDashboardSnapshot(data.data);
+
         case 'incoming_call':
           // Check if call already exists
           if (prevCalls.some(call => call.CallSid === data.data.CallSid)) {
@@ -59,55 +184,26 @@ function App() {
               : call
           );
 
-        case 'transcription':
-        case 'ai_response':
-          return prevCalls.map(call => {
-            if (call.CallSid === data.data.call_sid) {
-              const existingMessages = call.messages || [];
-              const isDuplicate = existingMessages.some(msg =>
-                msg.text === data.data.message &&
-                msg.speaker === (data.type === 'transcription' ? 'user' : 'ai') &&
-                Math.abs(msg.timestamp - Date.now()) < 1000 // Within 1 second
-              );
-
-              if (isDuplicate) {
-                return call;
-              }
-
-              const isTranscription = data.type === 'transcription';
-              const newMessage = {
-                speaker: isTranscription ? 'user' : 'ai',
-                text: data.data.message,
-                timestamp: Date.now()
-              };
-
-              let messages = [...existingMessages];
-
-              if (isTranscription && messages.length > 0 && messages[messages.length - 1].speaker === 'user') {
-                messages[messages.length - 1] = newMessage;
-              } else {
-                messages.push(newMessage);
-              }
-
-              return {
-                ...call,
-                messages
-              };
-            }
-            return call;
-          });
-          
+        case 'transcript_delta':
+          return prevCalls.map(call =>
+            call.CallSid === data.data.call_sid
+              ? applyTranscriptTurns(call, [data.data])
+              : call
+          );
+
+        case 'transcript_snapshot':
+          return prevCalls.map(call =>
+            call.CallSid === data.data.call_sid
+              ? applyTranscriptTurns(call, data.data.turns)
+              : call
+          );
+
         case 'call_summary':
-          setCalls(prevCalls => prevCalls.map(call => {
-            if (call.CallSid === data.data.CallSid) {
-              return {
-                ...call,
-                summary: data.data.summary,
-                name: data.data.name // Make sure this field exists
-              };
-            }
-            return call;
-          }));
+          return prevCalls.map(call =>
+            call.CallSid === data.data.CallSid
+              ? { ...call, summary: data.data.summary, name: data.data.name }
+              : call
+          );
 
         default:
           console.log('Unknown message type:', data.type);
@@ -124,11 +220,20 @@ function App() {
       websocket.onopen = () => {
         console.log('Connected to WebSocket server');
         setWs(websocket);
+        // The server sends a dashboard_snapshot first; older calls come from
+        // the paginated history, starting again from the newest
+        setHistory({ calls: [], cursor: null, hasMore: true, loading: true });
+        requestHistoryPage(websocket, null);
       };
 
       websocket.onmessage = (event) => {
         const data = JSON.parse(event.data);
-        handleWebSocketMessage(data);
+        if (applyHistoryMessage(data) || applyAdmissionMessage(data)) {
+          return;
+        }
+        if (checkTranscriptSequence(websocket, data)) {
+          handleWebSocketMessage(data);
+        }
       };
 
       websocket.onclose = () => {
@@ -145,13 +250,17 @@ function App() {
   }, [ws]);
 
   const clearCallLogs = () => {
-    localStorage.removeItem("call_logs");
+    lastSeqRef.current = {};
     setCalls([]);
   };
 
   const handleSelectCall = (call) => {
     setActiveCallSid(call.CallSid);
     setShowSidebar(true);
+    // History entries carry no transcript until one is opened
+    if (call.messages === null && ws && ws.readyState === WebSocket.OPEN) {
+      ws.send(JSON.stringify({ type: 'call_detail_request', call_sid: call.CallSid }));
+    }
   };
 
   const handleCloseSidebar = () => {
@@ -161,11 +270,15 @@ function App() {
 
   return (
     <div className="min-h-screen bg-gradient-to-br from-cyan-50 via-white to-cyan-50/30 font-light">
-      <Header />
+      <Header admission={Object.values(admission)} />
       <Toaster position="top-right" reverseOrder={false} />
       <main className="flex flex-1 p-6 max-w-7xl mx-auto w-full h-[calc(100vh-6rem)]">
         <CallLogs
-          calls={calls}
+          calls={calls.map(withRemark)}
+          history={history.calls.filter(call => !calls.some(live => live.CallSid === call.CallSid)).map(withRemark)}
+          hasMoreHistory={history.hasMore}
+          loadingHistory={history.loading}
+          onLoadMoreHistory={loadMoreHistory}
           activeCallSid={activeCallSid}
           onSelectCall={handleSelectCall}
           onClearLogs={clearCallLogs}
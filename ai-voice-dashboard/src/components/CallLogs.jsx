@@ -1,7 +1,10 @@
 import { useState, useEffect } from 'react';
 import { TrashIcon, ChevronDownIcon, ChevronUpIcon, ChatIcon, ChatAlt2Icon } from '@heroicons/react/solid';
 
-export default function CallLogs({ calls, activeCallSid, onSelectCall, onClearLogs, sidebarOpen, onUpdateCallRemark }) {
+export default function CallLogs({
+  calls, history = [], hasMoreHistory = false, loadingHistory = false, onLoadMoreHistory,
+  activeCallSid, onSelectCall, onClearLogs, sidebarOpen, onUpdateCallRemark
+}) {
   const [expandedSummaries, setExpandedSummaries] = useState(new Set());
   const [expandedRemarks, setExpandedRemarks] = useState(new Set());
   const [remarkTexts, setRemarkTexts] = useState({});
@@ -108,6 +111,14 @@ export default function CallLogs({ calls, activeCallSid, onSelectCall, onClearLo
     });
   }, [calls, customerNames]);
 
+  // Fetch the next page of call history when scrolled near the bottom
+  const handleScroll = (e) => {
+    const { scrollTop, scrollHeight, clientHeight } = e.currentTarget;
+    if (hasMoreHistory && !loadingHistory && onLoadMoreHistory && scrollHeight - scrollTop - clientHeight < 200) {
+      onLoadMoreHistory();
+    }
+  };
+
   return (
     <div
       className={`w-full h-full bg-white/80 backdrop-blur-sm border border-gray-100 rounded-3xl shadow-xl flex flex-col overflow-hidden relative transition-all duration-300 ${
@@ -129,8 +140,8 @@ export default function CallLogs({ calls, activeCallSid, onSelectCall, onClearLo
         </div>
       </div>
 
-      <div className="flex-1 overflow-y-auto p-4">
-        {calls.length === 0 ? (
+      <div className="flex-1 overflow-y-auto p-4" onScroll={handleScroll}>
+        {calls.length === 0 && history.length === 0 ? (
           <div className="text-center py-12">
             <p className="text-gray-500 font-normal">No calls yet</p>
             <p className="text-sm text-gray-400 mt-1 font-light">Waiting for incoming calls...</p>
@@ -205,6 +216,45 @@ export default function CallLogs({ calls, activeCallSid, onSelectCall, onClearLo
                 </div>
               </div>
             ))}
+
+            {/* Earlier calls from the server's call history */}
+            {history.length > 0 && (
+              <h3 className="pt-2 text-sm font-normal text-gray-500">Earlier calls</h3>
+            )}
+            {history.map(call => (
+              <div
+                key={call.CallSid}
+                className={`p-4 rounded-2xl cursor-pointer transition-all duration-300 ${
+                  activeCallSid === call.CallSid
+                    ? 'bg-gradient-to-r from-cyan-50 to-cyan-50 border-2 border-cyan-200 shadow-lg'
+                    : 'bg-gray-50/50 hover:bg-white hover:shadow-md border border-gray-100'
+                }`}
+                onClick={() => onSelectCall(call)}
+              >
+                <div className="flex items-center justify-between">
+                  <div>
+                    <div className="font-normal text-gray-900">{call.name || call.From}</div>
+                    <div className="text-sm text-gray-500 font-light">
+                      Phone no: {call.From}
+                      {call.started_at && ` · ${new Date(call.started_at * 1000).toLocaleString()}`}
+                    </div>
+                  </div>
+                  <StatusBadge status={call.status} />
+                </div>
+                {call.summary && (
+                  <p className="mt-2 text-xs text-gray-600 line-clamp-2">{call.summary}</p>
+                )}
+              </div>
+            ))}
+            {hasMoreHistory && onLoadMoreHistory && (
+              <button
+                onClick={onLoadMoreHistory}
+                disabled={loadingHistory}
+                className="w-full py-2 text-sm text-cyan-700 hover:text-cyan-800 disabled:text-gray-400"
+              >
+                {loadingHistory ? 'Loading...' : 'Load earlier calls'}
+              </button>
+            )}
           </div>
         )}
       </div>
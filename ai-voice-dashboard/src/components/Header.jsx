@@ -1,7 +1,7 @@
 import { useState, useEffect } from 'react';
 import { toast } from 'react-hot-toast';
 
-export default function Header() {
+export default function Header({ admission = [] }) {
   const [selectedFile, setSelectedFile] = useState(null);
   const [uploading, setUploading] = useState(false);
   const [showHint, setShowHint] = useState(false);
@@ -40,6 +40,7 @@ export default function Header() {
           
           {/* Right side of header */}
           <div className="flex items-center space-x-4">
+            {admission.length > 0 && <AdmissionStats workers={admission} />}
             <div className="flex items-center bg-emerald-50 border border-emerald-200 px-4 py-2 rounded-full">
               <div className="relative">
                 <div className="w-2 h-2 bg-emerald-500 rounded-full"></div>
@@ -54,6 +55,25 @@ export default function Header() {
   );
 }
 
+// Calls in progress against the admission limit, summed over server workers
+function AdmissionStats({ workers }) {
+  const total = (field) => workers.reduce((sum, stats) => sum + (stats[field] || 0), 0);
+  const results = (name) => workers.reduce((sum, stats) => sum + ((stats.results || {})[name] || 0), 0);
+  const limited = workers.every(stats => stats.max_calls);
+  const turnedAway = results('rejected_full') + results('rejected_timeout') + results('evicted');
+  const throttled = workers.some(stats => stats.limit < stats.max_calls);
+
+  return (
+    <div className={`flex items-center space-x-3 px-4 py-2 rounded-full border text-sm font-normal ${
+      throttled ? 'bg-amber-50 border-amber-200 text-amber-700' : 'bg-white border-gray-200 text-gray-600'
+    }`}>
+      <span>Calls {total('active')}{limited ? ` / ${total('limit')}` : ''}</span>
+      <span>{total('queued')} on hold</span>
+      <span>{turnedAway} turned away</span>
+    </div>
+  );
+}
+
 function PhoneIcon() {
   return (
     <svg xmlns="http://www.w3.org/2000/svg" fill="none" viewBox="0 0 24 24" stroke="currentColor" strokeWidth={2}>
@@ -0,0 +1,78 @@
+"""Call-setup latency with and without the warm agent connection pool.
+
+Usage:
+    python benchmarks/bench_agent_pool.py [--calls 50] [--handshake-delay 0.15] [--settings-delay 0.1]
+
+Runs against the local fake agent. Each simulated call acquires a connection
+and waits for the first greeting audio frame; the time from acquire() to that
+frame is what a caller hears as silence.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+
+import websockets
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent_pool import AgentConnectionPool  # noqa: E402
+from config_manager import ConfigManager  # noqa: E402
+from fake_agent import FakeAgent  # noqa: E402
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "..", "config.json")
+
+
+async def one_call(pool):
+    async with pool.connection() as conn:
+        async for message in conn.ws:
+            if isinstance(message, bytes):
+                pool.record_first_audio(conn)
+                return conn.first_audio_at - conn.acquired_at
+
+
+async def run_mode(name, url, config, args, min_size, max_size):
+    def connect():
+        return websockets.connect(url, subprotocols=["token", "stub"], max_queue=1024)
+
+    pool = AgentConnectionPool(connect, lambda: config.current, min_size=min_size,
+                               max_size=max_size, keepalive=1.0)
+    pool.start()
+    await asyncio.sleep(args.warmup)
+    latencies = []
+    for _ in range(args.calls):
+        latencies.append(await one_call(pool))
+        await asyncio.sleep(args.gap)
+    await pool.stop()
+
+    latencies.sort()
+    print(f"{name:<10} p50 {statistics.median(latencies) * 1000:7.1f} ms | "
+          f"p95 {latencies[int(len(latencies) * 0.95) - 1] * 1000:7.1f} ms | "
+          f"max {latencies[-1] * 1000:7.1f} ms | hits {pool.hits} misses {pool.misses}")
+
+
+async def run(args):
+    agent = FakeAgent(args.handshake_delay, args.settings_delay, greeting_frames=5)
+    config = ConfigManager(CONFIG_PATH)
+    async with agent.serve() as server:
+        url = f"ws://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+        await run_mode("on demand", url, config, args, min_size=0, max_size=0)
+        await run_mode("pooled", url, config, args, min_size=args.pool_min, max_size=args.pool_max)
+    print(f"fake agent: {agent.connections} connections, {agent.keepalives} keepalives")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50)
+    parser.add_argument("--handshake-delay", type=float, default=0.15)
+    parser.add_argument("--settings-delay", type=float, default=0.1)
+    parser.add_argument("--pool-min", type=int, default=2)
+    parser.add_argument("--pool-max", type=int, default=8)
+    parser.add_argument("--gap", type=float, default=0.3, help="seconds between calls")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
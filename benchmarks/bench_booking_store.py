@@ -0,0 +1,100 @@
+"""Write cost of create_booking-style inserts as the booking count grows.
+
+Usage:
+    python benchmarks/bench_booking_store.py [--max 300000] [--sample 200]
+
+Prints the mean cost of a single booking write at each checkpoint for the
+SQLite booking store and, for small sizes, for the legacy rewrite-the-whole-
+JSON approach it replaced.
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from booking_store import BookingStore  # noqa: E402
+
+
+def make_booking(i):
+    return {
+        "name": f"Customer {i}",
+        "age": 20 + i % 60,
+        "symptoms": "Knee pain",
+        "treatment": ("PRP", "Lasers", "Non-Operative Orthopedics")[i % 3],
+        "appointment_date": f"2026-{1 + i % 12:02d}-{1 + i % 28:02d}",
+        "appointment_time": f"{1 + i % 12}:{(i % 2) * 30:02d} {'AM' if i % 4 < 2 else 'PM'}",
+        "contact_email": f"customer{i}@example.com",
+        "contact_phone": f"+1555{i:07d}",
+    }
+
+
+def bench_store(path, checkpoints, sample):
+    store = BookingStore(path)
+    results = []
+    count = 0
+    for checkpoint in checkpoints:
+        # Bulk-fill up to the checkpoint, then time individual appends
+        fill = [make_booking(i) for i in range(count, checkpoint)]
+        if fill:
+            with store._transaction() as conn:
+                store._insert_many(conn, fill)
+        count = checkpoint
+        start = time.perf_counter()
+        for i in range(count, count + sample):
+            store.add(make_booking(i))
+        elapsed = time.perf_counter() - start
+        count += sample
+        results.append((checkpoint, elapsed / sample))
+    store.close()
+    return results
+
+
+def bench_legacy_json(path, checkpoints, sample):
+    bookings = []
+    results = []
+    for checkpoint in checkpoints:
+        bookings.extend(make_booking(i) for i in range(len(bookings), checkpoint))
+        with open(path, "w") as f:
+            json.dump({"bookings": bookings}, f, indent=4)
+        start = time.perf_counter()
+        for i in range(sample):
+            with open(path) as f:
+                current = json.load(f)["bookings"]
+            current.append(make_booking(checkpoint + i))
+            with open(path, "w") as f:
+                json.dump({"bookings": current}, f, indent=4)
+        elapsed = time.perf_counter() - start
+        bookings = current
+        results.append((checkpoint, elapsed / sample))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max", type=int, default=300_000, help="largest booking count")
+    parser.add_argument("--sample", type=int, default=200, help="timed writes per checkpoint")
+    parser.add_argument("--legacy-max", type=int, default=20_000,
+                        help="largest booking count for the legacy JSON run")
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (0, 1_000, 10_000, 50_000, 100_000, 200_000, 300_000, 500_000)
+                   if n <= args.max]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print("SQLite booking store (WAL)")
+        for count, per_write in bench_store(os.path.join(tmp, "bench.sqlite3"), checkpoints, args.sample):
+            print(f"  {count:>8} bookings: {per_write * 1e6:10.1f} us/write")
+
+        legacy = [n for n in checkpoints if n <= args.legacy_max]
+        print("Legacy booking_db.json rewrite")
+        for count, per_write in bench_legacy_json(os.path.join(tmp, "bench.json"), legacy,
+                                                  max(1, args.sample // 20)):
+            print(f"  {count:>8} bookings: {per_write * 1e6:10.1f} us/write")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Dashboard call-history latency: indexed pages against reading the whole call log.
+
+Usage:
+    python benchmarks/bench_call_history.py [--calls 100000] [--turns 20] [--page 50] [--pages 200]
+
+Writes `--calls` call records of `--turns` transcript turns each to a
+temporary call log through CallLog with a history index, then times
+fetching `--pages` history pages (`--page` calls each, at random depths)
+and single call records, against parsing the whole JSONL log as a
+dashboard-side history would have to.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from call_log import CallHistoryIndex, CallLog  # noqa: E402
+
+
+def make_record(i, turns):
+    return {
+        "CallSid": f"CA{i:032x}",
+        "From": f"+1555{i % 10000000:07d}",
+        "To": "+15550000000",
+        "status": "completed",
+        "started_at": 1.7e9 + i * 60,
+        "ended_at": 1.7e9 + i * 60 + 45,
+        "turns": [{"seq": t + 1, "role": "user" if t % 2 == 0 else "assistant",
+                   "text": "I would like to book an appointment for next week please"}
+                  for t in range(turns)],
+    }
+
+
+async def run(args, tmp):
+    rng = random.Random(1)
+    path = os.path.join(tmp, "call_log.jsonl")
+    log = CallLog(path, CallHistoryIndex(os.path.join(tmp, "call_log.index.sqlite3")))
+    start = time.perf_counter()
+    for i in range(args.calls):
+        await log.append(make_record(i, args.turns))
+    written = time.perf_counter() - start
+    print(f"Logged and indexed {args.calls} calls in {written:.1f}s "
+          f"({written / args.calls * 1e6:.0f}us/call), log {os.path.getsize(path) / 1e6:.0f}MB")
+
+    # Cursors at random depths, as a dashboard scrolling back would reach
+    cursors, cursor = [None], None
+    while cursor is not None or len(cursors) == 1:
+        _, cursor = await log.page(cursor, args.page)
+        cursors.append(cursor)
+    cursors = [c for c in cursors if c is not None] + [None]
+    sample = [rng.choice(cursors) for _ in range(args.pages)]
+    start = time.perf_counter()
+    for cursor in sample:
+        await log.page(cursor, args.page)
+    per_page = (time.perf_counter() - start) / len(sample)
+
+    sids = [make_record(rng.randrange(args.calls), 0)["CallSid"] for _ in range(args.pages)]
+    start = time.perf_counter()
+    for sid in sids:
+        await log.read(sid)
+    per_read = (time.perf_counter() - start) / len(sids)
+    log.close()
+
+    start = time.perf_counter()
+    with open(path, "rb") as f:
+        records = [json.loads(line) for line in f]
+    full = time.perf_counter() - start
+    print(f"  {'history page of ' + str(args.page):<24} {per_page * 1e3:9.2f}ms")
+    print(f"  {'one call record':<24} {per_read * 1e3:9.2f}ms")
+    print(f"  {'whole log, ' + str(len(records)) + ' calls':<24} {full * 1e3:9.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100000)
+    parser.add_argument("--turns", type=int, default=20, help="transcript turns per call")
+    parser.add_argument("--page", type=int, default=50, help="calls per history page")
+    parser.add_argument("--pages", type=int, default=200, help="pages and records fetched")
+    args = parser.parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        asyncio.run(run(args, tmp))
+
+
+if __name__ == "__main__":
+    main()
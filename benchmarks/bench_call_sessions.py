@@ -0,0 +1,109 @@
+"""Resident memory across many simulated calls.
+
+Usage:
+    python benchmarks/bench_call_sessions.py [--calls 10000] [--turns 40]
+
+Runs N short calls through CallSession -> teardown -> SessionHandoff (with a
+persistence consumer writing to a temporary call log) and samples RSS along
+the way. The legacy mode keeps per-call state in never-cleared module dicts,
+as main.py used to.
+"""
+import argparse
+import asyncio
+import gc
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from call_log import CallLog  # noqa: E402
+from call_session import CallSession, SessionHandoff  # noqa: E402
+
+
+def rss_mb():
+    with open("/proc/self/statm") as f:
+        pages = int(f.read().split()[1])
+    return pages * os.sysconf("SC_PAGE_SIZE") / 1e6
+
+
+USER_LINE = "I have had pain in my left knee for about three weeks now"
+AGENT_LINE = "I'm sorry to hear that. PRP therapy can help with knee pain like yours."
+
+
+async def run_sessions(args, log_path):
+    call_log = CallLog(log_path)
+    summarized = []
+
+    def summarize(session):
+        summarized.append(len(session.conversation()))
+        if len(summarized) > 100:
+            summarized.clear()
+
+    async def persist(session):
+        await call_log.append(session.to_record())
+
+    handoff = SessionHandoff([summarize, persist])
+    active = {}
+    samples = []
+    for i in range(args.calls):
+        session = CallSession(f"CA{i:08d}", f"MZ{i:08d}", "+15550000000", "+15551111111")
+        active[session.call_sid] = session
+        for t in range(args.turns):
+            session.transcript.append("user" if t % 2 == 0 else "assistant",
+                                      USER_LINE if t % 2 == 0 else AGENT_LINE)
+        session.end()
+        active.pop(session.call_sid, None)
+        handoff.put(session)
+        if i % 500 == 0:
+            await handoff.join()
+        if i % args.sample_every == 0 or i == args.calls - 1:
+            gc.collect()
+            samples.append((i + 1, rss_mb()))
+    await handoff.join()
+    await handoff.stop()
+    call_log.close()
+    return samples
+
+
+def run_legacy(args):
+    full_transcript = {}
+    all_conversation = {}
+    samples = []
+    for i in range(args.calls):
+        callsid = f"CA{i:08d}"
+        full_transcript[callsid] = ""
+        all_conversation[callsid] = []
+        for t in range(0, args.turns, 2):
+            full_transcript[callsid] += USER_LINE
+            all_conversation[callsid].append({
+                "user_message": full_transcript[callsid],
+                "assistant_message": AGENT_LINE
+            })
+        if i % args.sample_every == 0 or i == args.calls - 1:
+            samples.append((i + 1, rss_mb()))
+    return samples
+
+
+def print_samples(name, samples):
+    print(name)
+    base = samples[0][1]
+    for calls, rss in samples:
+        print(f"  {calls:>7} calls: RSS {rss:7.1f} MB ({rss - base:+.1f} MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=10_000)
+    parser.add_argument("--turns", type=int, default=40)
+    parser.add_argument("--sample-every", type=int, default=2_000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        samples = asyncio.run(run_sessions(args, os.path.join(tmp, "call_log.jsonl")))
+    print_samples("CallSession + hand-off", samples)
+    print_samples("Legacy global dicts", run_legacy(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+"""Dashboard fan-out with many subscribers, some deliberately slow or stalled.
+
+Usage:
+    python benchmarks/bench_fanout.py [--clients 500] [--slow 50] [--stalled 5] [--events 2000]
+
+Publishes events at a fixed rate (as a busy set of calls would) and reports how
+long each publish blocks the caller, for the Broadcaster and for the previous
+serial await-every-client loop. Most events are unkeyed transcript deltas;
+every `--summary-every`th is a call's rolling summary, keyed by call as the
+server sends it, so `--policy coalesce` has something to merge.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from fanout import Broadcaster  # noqa: E402
+
+
+class FakeDashboard:
+    def __init__(self, delay):
+        self.delay = delay
+        self.received = 0
+
+    async def send(self, message):
+        if self.delay is None:
+            await asyncio.Event().wait()  # stalled tab: never completes
+        elif self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self):
+        pass
+
+
+def make_clients(args):
+    clients = [FakeDashboard(0) for _ in range(args.clients - args.slow - args.stalled)]
+    clients += [FakeDashboard(args.slow_delay) for _ in range(args.slow)]
+    clients += [FakeDashboard(None) for _ in range(args.stalled)]
+    return clients
+
+
+def event(i, summary_every):
+    """(event, coalesce key) number i."""
+    call_sid = f"CA{i % 20:04d}"
+    if summary_every and i % summary_every == summary_every - 1:
+        return ({"type": "call_summary",
+                 "data": {"CallSid": call_sid, "summary": "caller words " * 20, "partial": True}},
+                f"summary:{call_sid}")
+    return ({"type": "transcript_delta",
+             "data": {"call_sid": call_sid, "seq": i, "role": "user", "text": "caller words " * 8}},
+            None)
+
+
+def report(name, samples, elapsed, extra=""):
+    samples = sorted(samples)
+    p99 = samples[int(len(samples) * 0.99) - 1] if samples else 0.0
+    print(f"{name}: {len(samples)} events in {elapsed:.2f}s, publish p50 "
+          f"{statistics.median(samples) * 1e6:.0f} us, p99 {p99 * 1e6:.0f} us, "
+          f"max {samples[-1] * 1e3:.1f} ms {extra}")
+
+
+async def bench_broadcaster(args):
+    broadcaster = Broadcaster(policy=args.policy, max_queue=args.queue)
+    clients = make_clients(args)
+    for ws in clients:
+        broadcaster.subscribe(ws)
+
+    samples = []
+    start = time.perf_counter()
+    for i in range(args.events):
+        t = time.perf_counter()
+        data, key = event(i, args.summary_every)
+        broadcaster.publish(data, key=key)
+        samples.append(time.perf_counter() - t)
+        await asyncio.sleep(args.interval)
+    elapsed = time.perf_counter() - start
+    await asyncio.sleep(0.2)
+    fast = [c.received for c in clients if c.delay == 0]
+    report("Broadcaster", samples, elapsed,
+           f"| fast clients got {min(fast)}-{max(fast)} frames | {broadcaster.snapshot()}")
+    for ws in clients:
+        broadcaster.unsubscribe(ws)
+
+
+async def bench_serial(args):
+    clients = make_clients(args)
+    # The old loop would block forever on a stalled client; give it a timeout
+    # per send so the benchmark terminates
+    samples = []
+    start = time.perf_counter()
+    events = min(args.events, args.serial_events)
+    for i in range(events):
+        t = time.perf_counter()
+        message = json.dumps(event(i, args.summary_every)[0])
+        for ws in clients:
+            try:
+                await asyncio.wait_for(ws.send(message), args.serial_timeout)
+            except asyncio.TimeoutError:
+                pass
+        samples.append(time.perf_counter() - t)
+        await asyncio.sleep(args.interval)
+    report("Serial awaits", samples, time.perf_counter() - start,
+           f"(stalled sends capped at {args.serial_timeout}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=500)
+    parser.add_argument("--slow", type=int, default=50)
+    parser.add_argument("--slow-delay", type=float, default=0.05)
+    parser.add_argument("--stalled", type=int, default=5)
+    parser.add_argument("--events", type=int, default=2000)
+    parser.add_argument("--summary-every", type=int, default=10)
+    parser.add_argument("--interval", type=float, default=0.001)
+    parser.add_argument("--policy", default="coalesce")
+    parser.add_argument("--queue", type=int, default=256)
+    parser.add_argument("--serial-events", type=int, default=5)
+    parser.add_argument("--serial-timeout", type=float, default=0.1)
+    args = parser.parse_args()
+
+    asyncio.run(bench_broadcaster(args))
+    asyncio.run(bench_serial(args))
+
+
+if __name__ == "__main__":
+    main()
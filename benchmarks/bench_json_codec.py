@@ -0,0 +1,167 @@
+"""JSON CPU per call-minute: the previous json module paths vs json_codec backends.
+
+Usage:
+    python benchmarks/bench_json_codec.py [--minutes 200] [--turns 8] [--function-calls 2]
+                                          [--talk-share 0.5] [--workers 1]
+
+Replays the JSON work the server does for one minute of a call:
+  - Twilio mark echoes, one per OUTBOUND_MARK_INTERVAL of agent speech
+    (`--talk-share` of the minute), decoded into events
+  - five agent events per turn (UserStartedSpeaking, two ConversationText,
+    AgentStartedSpeaking, AgentAudioDone), decoded
+  - `--function-calls` FunctionCallRequests: request and arguments decoded,
+    the response encoded
+  - two dashboard transcript deltas per turn, encoded once and decoded by
+    each of `--workers` processes when the event bus is shared
+  - the structured log records of those events, encoded with default=str
+  - the call's call-log record, written and read back once
+"legacy" is the previous code: json.dumps/json.loads into dicts. Each
+backend decodes into json_codec's typed events. Media events are not part
+of the mix: media_codec handles them without JSON. The report adds what one
+media event would cost through a full decode, for reference.
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from json_codec import agent_event, available_codecs, twilio_event  # noqa: E402
+from media_codec import inbound_media_payload  # noqa: E402
+from outbound_audio import OUTBOUND_MARK_INTERVAL  # noqa: E402
+
+CALL_SID = "CA5f2e1d0c9b8a7f6e5d4c3b2a1f0e9d8c"
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+USER_TEXT = "Yes, stairs are the worst. It's stiff in the morning and swells a little after a long walk."
+AGENT_TEXT = ("I'm sorry to hear that. PRP can help with that kind of knee pain. "
+              "Would you like me to check what times are free this week?")
+ARGUMENTS = {"treatment": "PRP", "appointment_date": "2025-08-28"}
+RESULT = {"date": "2025-08-28", "treatment": "PRP",
+          "free": [f"{hour}:00 {'AM' if hour < 12 else 'PM'}" for hour in range(9, 18)],
+          "message": "The following times are free on Thursday, August 28th: " + ", ".join(
+              f"{hour} o'clock" for hour in range(9, 18))}
+MEDIA = json.dumps({"event": "media", "sequenceNumber": "2", "streamSid": STREAM_SID,
+                    "media": {"track": "inbound", "chunk": "1", "timestamp": "20",
+                              "payload": "f" * 212 + "=="}}, separators=(",", ":"))
+
+
+def minute_of_traffic(args):
+    """The messages of one call-minute, grouped by the work done on them."""
+    marks = int(60 * args.talk_share / OUTBOUND_MARK_INTERVAL)
+    agent = []
+    for turn in range(args.turns):
+        agent += [
+            json.dumps({"type": "UserStartedSpeaking"}),
+            json.dumps({"type": "ConversationText", "role": "user", "content": USER_TEXT}),
+            json.dumps({"type": "ConversationText", "role": "assistant", "content": AGENT_TEXT}),
+            json.dumps({"type": "AgentStartedSpeaking"}),
+            json.dumps({"type": "AgentAudioDone"}),
+        ]
+    requests = [json.dumps({"type": "FunctionCallRequest", "functions": [{
+        "id": f"fc-{i}", "name": "check_availability", "arguments": json.dumps(ARGUMENTS),
+        "client_side": True}]}) for i in range(args.function_calls)]
+    deltas = [{"type": "transcript_delta", "data": {"call_sid": CALL_SID, "seq": seq,
+                                                    "role": "user" if seq % 2 else "assistant",
+                                                    "text": USER_TEXT if seq % 2 else AGENT_TEXT}}
+              for seq in range(1, 2 * args.turns + 1)]
+    records = [{"ts": time.time(), "level": "info", "event": "transcript", "call_sid": CALL_SID,
+                "role": "user", "seq": seq, "text": USER_TEXT} for seq in range(2 * args.turns)]
+    records += [{"ts": time.time(), "level": "info", "event": "function_result", "call_sid": CALL_SID,
+                 "function": "check_availability", "id": f"fc-{i}", "seconds": 0.002, "result": RESULT}
+                for i in range(args.function_calls)]
+    call_record = {"CallSid": CALL_SID, "status": "completed", "transcript": [
+        {"seq": d["data"]["seq"], "role": d["data"]["role"], "text": d["data"]["text"]} for d in deltas],
+        "summary": {"cust_name": "[redacted]", "summary": AGENT_TEXT}}
+    return {
+        "marks": [json.dumps({"event": "mark", "streamSid": STREAM_SID, "sequenceNumber": str(i),
+                              "mark": {"name": f"m{i}"}}) for i in range(marks)],
+        "agent": agent, "requests": requests, "deltas": deltas, "records": records,
+        "call_record": call_record,
+    }
+
+
+def legacy_minute(traffic, workers):
+    for message in traffic["marks"]:
+        data = json.loads(message)
+        data["event"], data.get("mark", {}).get("name")
+    for message in traffic["agent"]:
+        decoded = json.loads(message)
+        decoded["type"], decoded.get("content", "").strip()
+    for message in traffic["requests"]:
+        for call in json.loads(message).get("functions", []):
+            json.loads(call["arguments"])
+            json.dumps({"type": "FunctionCallResponse", "id": call["id"], "name": call["name"],
+                        "content": json.dumps(RESULT)})
+    for delta in traffic["deltas"]:
+        message = json.dumps(delta)
+        for _ in range(workers):
+            json.loads(message)
+    for record in traffic["records"]:
+        json.dumps(record, ensure_ascii=False, separators=(",", ":"), default=str).encode()
+    line = (json.dumps(traffic["call_record"], separators=(",", ":")) + "\n").encode("utf-8")
+    json.loads(line)
+
+
+def codec_minute(codec, traffic, workers):
+    dumps, dumpb, loads = codec.dumps, codec.dumpb, codec.loads
+    for message in traffic["marks"]:
+        twilio_event(loads(message)).name
+    for message in traffic["agent"]:
+        agent_event(loads(message)).type
+    for message in traffic["requests"]:
+        for call in agent_event(loads(message)).functions:
+            loads(call.arguments)
+            dumps({"type": "FunctionCallResponse", "id": call.id, "name": call.name,
+                   "content": dumps(RESULT)})
+    for delta in traffic["deltas"]:
+        message = dumps(delta)
+        for _ in range(workers):
+            loads(message)
+    for record in traffic["records"]:
+        dumpb(record, default=str)
+    loads(dumpb(traffic["call_record"]) + b"\n")
+
+
+def per_call(fn, repeat):
+    fn()
+    best = float("inf")
+    for _ in range(3):
+        started = time.process_time()
+        for _ in range(repeat):
+            fn()
+        best = min(best, (time.process_time() - started) / repeat)
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--minutes", type=int, default=200, help="call-minutes replayed per timing")
+    parser.add_argument("--turns", type=int, default=8, help="conversation turns per minute")
+    parser.add_argument("--function-calls", type=int, default=2, help="function calls per minute")
+    parser.add_argument("--talk-share", type=float, default=0.5, help="share of the minute the agent speaks")
+    parser.add_argument("--workers", type=int, default=1, help="processes decoding each dashboard event")
+    args = parser.parse_args()
+
+    traffic = minute_of_traffic(args)
+    counts = {name: len(messages) for name, messages in traffic.items() if isinstance(messages, list)}
+    print(f"per call-minute: {counts}, 1 call record")
+    runs = [("legacy", lambda: legacy_minute(traffic, args.workers), json.loads)]
+    for codec in available_codecs():
+        runs.append((codec.name, lambda codec=codec: codec_minute(codec, traffic, args.workers), codec.loads))
+    baseline = None
+    for name, fn, loads in runs:
+        cost = per_call(fn, args.minutes)
+        baseline = baseline or cost
+        media = per_call(lambda: twilio_event(loads(MEDIA)), 20000)
+        print(f"{name:<8} {cost * 1e6:8.1f}us CPU per call-minute ({baseline / cost:4.1f}x)"
+              f"  {cost / 60 * 100:.4f}% of a core per call"
+              f"  media event decoded in full {media * 1e6:5.2f}us")
+    fast = per_call(lambda: inbound_media_payload(MEDIA), 20000)
+    print(f"media fast path {fast * 1e6:5.2f}us per event, "
+          f"{fast * 3000 * 1e6:.0f}us per call-minute at 50 events/s")
+
+
+if __name__ == "__main__":
+    main()
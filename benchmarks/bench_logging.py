@@ -0,0 +1,159 @@
+"""Event-loop cost of logging: print() to a slow pipe vs the structured logger.
+
+Usage:
+    python benchmarks/bench_logging.py [--calls 100] [--seconds 5] [--turn-interval 0.05]
+                                       [--drain-kbps 256] [--iterations 100000]
+
+First times one log call in a tight loop, with output going to /dev/null;
+"enqueue" holds the writer back to show the caller's share alone.
+Then plays `--calls` concurrent calls that log what the server logs per
+turn: the transcript line, and every third turn a function call and its
+full result. Output goes to a pipe drained at `--drain-kbps`, like a log
+collector that falls behind. "print" writes with flush=True, as the server
+did under PYTHONUNBUFFERED. The report gives the time per log call on the
+event loop, the worst event-loop stall, and the records written or
+dropped.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from structured_log import StructuredLogger  # noqa: E402
+
+ARGUMENTS = {"name": "John Doe", "age": 34, "symptoms": "Knee pain", "treatment": "PRP",
+             "email": "john.doe@example.com", "appointment_date": "2025-08-28",
+             "appointment_time": "10:00 AM"}
+RESULT = {"date": "2025-08-28", "treatment": "PRP",
+          "free": [f"{hour}:00 {'AM' if hour < 12 else 'PM'}" for hour in range(9, 18)],
+          "message": "The following times are free on Thursday, August 28th: " + ", ".join(
+              f"{hour} o'clock" for hour in range(9, 18))}
+TEXT = "Yes, stairs are the worst. It's stiff in the morning and swells a little after a long walk."
+
+
+class PrintLog:
+    """The old logging: formatted print() calls straight to the output."""
+
+    def __init__(self, fd):
+        self.out = os.fdopen(fd, "w", closefd=False)
+
+    def transcript(self, call_sid, seq):
+        print(f"\033[92mUser:\033[0m {TEXT}", file=self.out, flush=True)
+
+    def function_call(self, call_sid):
+        print(f"Function call: check_availability (ID: fc_1), arguments: {ARGUMENTS}", file=self.out, flush=True)
+        print(f"Function call result: {RESULT}", file=self.out, flush=True)
+        print(f"Sent function result: {RESULT}", file=self.out, flush=True)
+
+    def snapshot(self):
+        return {}
+
+
+class StructuredLog:
+    def __init__(self, fd, **options):
+        self.log = StructuredLogger(fd=fd, level="info", rate_limit=0, **options)
+
+    def transcript(self, call_sid, seq):
+        self.log.info("transcript", call_sid, role="user", seq=seq, text=TEXT)
+
+    def function_call(self, call_sid):
+        self.log.info("function_call", call_sid, function="check_availability", id="fc_1",
+                      arguments=ARGUMENTS)
+        self.log.info("function_result", call_sid, function="check_availability", id="fc_1",
+                      seconds=0.002, result=RESULT)
+
+    def snapshot(self):
+        self.log.close()
+        return self.log.snapshot()
+
+
+def drain(fd, bytes_per_second, stop):
+    """A log collector reading at a fixed rate."""
+    while not stop.is_set():
+        try:
+            data = os.read(fd, 4096)
+        except OSError:
+            return
+        if not data:
+            return
+        time.sleep(len(data) / bytes_per_second)
+
+
+def tight_loop(make, iterations):
+    fd = os.open(os.devnull, os.O_WRONLY)
+    logger = make(fd)
+    start = time.perf_counter()
+    for i in range(iterations):
+        logger.transcript("CA000001", i)
+    elapsed = time.perf_counter() - start
+    logger.snapshot()
+    os.close(fd)
+    return elapsed / iterations
+
+
+async def play(make, args):
+    read_fd, write_fd = os.pipe()
+    stop = threading.Event()
+    reader = threading.Thread(target=drain, args=(read_fd, args.drain_kbps * 1024, stop), daemon=True)
+    reader.start()
+    logger = make(write_fd)
+    costs = []
+    stalls = [0.0]
+
+    async def monitor():
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(0.005)
+            stalls.append(time.perf_counter() - started - 0.005)
+
+    async def call(index):
+        call_sid = f"CA{index:06d}"
+        deadline = time.perf_counter() + args.seconds
+        seq = 0
+        while time.perf_counter() < deadline:
+            await asyncio.sleep(args.turn_interval)
+            seq += 1
+            started = time.perf_counter()
+            logger.transcript(call_sid, seq)
+            if seq % 3 == 0:
+                logger.function_call(call_sid)
+            costs.append(time.perf_counter() - started)
+
+    watcher = asyncio.ensure_future(monitor())
+    await asyncio.gather(*(call(i) for i in range(args.calls)))
+    watcher.cancel()
+    stats = await asyncio.to_thread(logger.snapshot)
+    stop.set()
+    os.close(write_fd)
+    costs.sort()
+    return costs, max(stalls), stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=100)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--turn-interval", type=float, default=0.05)
+    parser.add_argument("--drain-kbps", type=float, default=256, help="collector read rate")
+    parser.add_argument("--iterations", type=int, default=100000, help="tight-loop log calls")
+    args = parser.parse_args()
+
+    # The writer held back until the loop is done: the caller's share alone
+    enqueue_only = lambda fd: StructuredLog(fd, flush_interval=3600, batch_size=args.iterations + 1,
+                                            max_pending=args.iterations + 1)
+    for name, make in (("print", PrintLog), ("structured", StructuredLog), ("enqueue", enqueue_only)):
+        per_call = tight_loop(make, args.iterations)
+        print(f"{name:<10}  /dev/null: {per_call * 1e6:6.2f}us per transcript line")
+    for name, make in (("print", PrintLog), ("structured", StructuredLog)):
+        costs, stall, stats = asyncio.run(play(make, args))
+        p = lambda q: costs[min(len(costs) - 1, int(len(costs) * q))] * 1e6
+        print(f"{name:<10}  slow pipe: per turn p50 {p(0.5):8.1f}us  p99 {p(0.99):9.1f}us"
+              f"  max {costs[-1] * 1e3:8.1f}ms  worst loop stall {stall * 1e3:8.1f}ms  {stats}")
+
+
+if __name__ == "__main__":
+    main()
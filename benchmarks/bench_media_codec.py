@@ -0,0 +1,107 @@
+"""Twilio media-frame throughput: media_codec vs the previous json/base64 path.
+
+Usage:
+    python benchmarks/bench_media_codec.py [--frames 200000]
+
+Reports single-core frames per second for the inbound path (parse a Twilio
+media event and assemble 400 ms upstream frames) and the outbound path (wrap
+an agent audio chunk into a Twilio media event).
+"""
+import argparse
+import base64
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from media_codec import FrameAssembler, MediaFrameEncoder, inbound_media_payload  # noqa: E402
+
+BUFFER_SIZE = 20 * 160
+STREAM_SID = "MZ18ad3ab5a668481ce02b83e7395059f0"
+
+
+def twilio_media_messages(count):
+    messages = []
+    for i in range(64):
+        payload = base64.b64encode(bytes((i + j) % 256 for j in range(160))).decode("ascii")
+        messages.append(json.dumps({
+            "event": "media",
+            "sequenceNumber": str(i + 2),
+            "media": {"track": "inbound", "chunk": str(i + 1),
+                      "timestamp": str(i * 20), "payload": payload},
+            "streamSid": STREAM_SID,
+        }, separators=(",", ":")))
+    return [messages[i % 64] for i in range(count)]
+
+
+def inbound_legacy(messages):
+    frames = 0
+    inbuffer = bytearray(b"")
+    for message in messages:
+        data = json.loads(message)
+        if data["event"] == "media" and "payload" in data["media"]:
+            if data["media"].get("track") == "inbound":
+                inbuffer.extend(base64.b64decode(data["media"]["payload"]))
+                while len(inbuffer) >= BUFFER_SIZE:
+                    bytes(inbuffer[:BUFFER_SIZE])
+                    del inbuffer[:BUFFER_SIZE]
+                    frames += 1
+    return frames
+
+
+def inbound_codec(messages):
+    frames = 0
+    assembler = FrameAssembler(BUFFER_SIZE)
+    for message in messages:
+        payload = inbound_media_payload(message)
+        if payload:
+            frames += len(assembler.feed(payload))
+    return frames
+
+
+def outbound_legacy(chunks):
+    for raw_mulaw in chunks:
+        json.dumps({
+            "event": "media",
+            "streamSid": STREAM_SID,
+            "media": {"payload": base64.b64encode(raw_mulaw).decode("ascii")},
+        })
+
+
+def outbound_codec(chunks):
+    encoder = MediaFrameEncoder(STREAM_SID)
+    for raw_mulaw in chunks:
+        encoder.media(raw_mulaw)
+
+
+def timed(func, items):
+    start = time.process_time()
+    func(items)
+    return len(items) / (time.process_time() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--frames", type=int, default=200_000)
+    parser.add_argument("--chunk", type=int, default=160, help="agent audio chunk size in bytes")
+    args = parser.parse_args()
+
+    messages = twilio_media_messages(args.frames)
+    assert inbound_legacy(messages[:1000]) == inbound_codec(messages[:1000])
+    chunk = (bytes(range(256)) * (args.chunk // 256 + 1))[: args.chunk]
+    chunks = [chunk] * args.frames
+
+    for name, legacy, codec, items in (
+        ("inbound ", inbound_legacy, inbound_codec, messages),
+        ("outbound", outbound_legacy, outbound_codec, chunks),
+    ):
+        old = timed(legacy, items)
+        new = timed(codec, items)
+        print(f"{name}: legacy {old:>10,.0f} frames/s/core | media_codec {new:>10,.0f} "
+              f"frames/s/core | {new / old:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
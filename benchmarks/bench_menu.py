@@ -0,0 +1,132 @@
+"""Menu tool latency, fuzzy-match accuracy, and prompt size with and without the catalogue.
+
+Usage:
+    python benchmarks/bench_menu.py [--lookups 5000] [--dishes 5000] [--seed 1]
+
+Prompt size compares stuffing the whole menu text into the prompt with the
+restaurant's basic details plus the menu tool schemas. Tokens are counted
+with tiktoken when installed, otherwise estimated at 4 characters per token.
+Fuzzy accuracy uses dish names with one speech-recognition-style slip per
+word (dropped or swapped vowel, doubled or dropped letter, sound-alike
+spelling). The scaling run repeats the lookups on a synthetic menu of
+`--dishes` dishes against a brute-force difflib scan of every name.
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import time
+from difflib import get_close_matches
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from agent_tools import TOOLS  # noqa: E402
+from menu_catalog import MENU_SOURCE_FILE, FuzzyIndex, MenuCatalog  # noqa: E402
+
+SOUND_ALIKES = (("ee", "i"), ("oo", "u"), ("ph", "f"), ("k", "c"), ("w", "v"), ("sh", "s"),
+                ("a", "e"), ("ya", "ia"))
+WORDS = ("spicy tandoori paneer chicken mutton masala butter garlic mango saffron kesari "
+         "malai achari hariyali kadai shahi dum lassi kulfi korma tikka kebab pulao naan "
+         "kofta rogan josh dal makhani bhuna jalfrezi vindaloo chaat samosa pakora halwa").split()
+
+
+def count_tokens(text):
+    try:
+        import tiktoken
+        return len(tiktoken.get_encoding("cl100k_base").encode(text)), "tiktoken"
+    except ImportError:
+        return len(text) // 4, "estimated"
+
+
+def misspell(name, rng):
+    words = []
+    for word in name.split():
+        if len(word) < 4:
+            words.append(word)
+            continue
+        kind = rng.randrange(4)
+        i = rng.randrange(1, len(word) - 1)
+        if kind == 0:
+            word = word[:i] + word[i + 1:]
+        elif kind == 1:
+            word = word[:i] + word[i] + word[i:]
+        elif kind == 2:
+            word = word[:i] + word[i + 1] + word[i] + word[i + 2:]
+        else:
+            for a, b in rng.sample(SOUND_ALIKES, len(SOUND_ALIKES)):
+                if a in word:
+                    word = word.replace(a, b, 1)
+                    break
+        words.append(word)
+    return " ".join(words)
+
+
+def timed(fn, queries):
+    start = time.perf_counter()
+    results = [fn(q) for q in queries]
+    return (time.perf_counter() - start) / len(queries), results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--lookups", type=int, default=5000)
+    parser.add_argument("--dishes", type=int, default=5000, help="synthetic menu size")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    start = time.perf_counter()
+    catalog = MenuCatalog.from_file(MENU_SOURCE_FILE)
+    build = time.perf_counter() - start
+    spec_globals = {}
+    with open(MENU_SOURCE_FILE, encoding="utf-8") as f:
+        exec(compile(f.read(), MENU_SOURCE_FILE, "exec"), spec_globals)
+    full_prompt = spec_globals["menu"]
+    small_prompt = catalog.prompt_details()
+    schemas = json.dumps(TOOLS.schemas(group="menu"))
+
+    full_tokens, method = count_tokens(full_prompt)
+    small_tokens, _ = count_tokens(small_prompt)
+    schema_tokens, _ = count_tokens(schemas)
+    print(f"Menu: {len(catalog.dishes)} dishes, {len(catalog.categories)} categories, "
+          f"parsed and indexed in {build * 1e3:.1f}ms")
+    print(f"Prompt tokens ({method}): full menu {full_tokens}, details {small_tokens} "
+          f"+ tool schemas {schema_tokens} = {small_tokens + schema_tokens} "
+          f"({1 - (small_tokens + schema_tokens) / full_tokens:.0%} smaller per LLM turn)")
+
+    names = [dish.name for dish in catalog.dishes]
+    cases = (
+        ("get_menu_classes", lambda q: catalog.category_list(), [None]),
+        ("get_dishes_in_class", catalog.dishes_in, list(catalog.categories)),
+        ("get_dish_details (exact)", catalog.dish, names),
+        ("get_dish_details (misheard)", catalog.dish, [misspell(n, rng) for n in names]),
+        ("find_dishes (ingredient)", lambda q: catalog.find(ingredient=q),
+         ["chicken", "paneer", "cardamom", "mango"]),
+    )
+    for label, fn, queries in cases:
+        queries = [queries[i % len(queries)] for i in range(args.lookups)]
+        per_call, _ = timed(fn, queries)
+        print(f"  {label:<28} {per_call * 1e6:8.1f}us")
+
+    misheard = [(misspell(n, rng), n) for n in names for _ in range(50)]
+    hits = sum(catalog.dish(q).get("name") == n for q, n in misheard)
+    print(f"Misheard dish names resolved: {hits}/{len(misheard)} ({hits / len(misheard):.0%})")
+
+    synthetic = sorted({" ".join(rng.sample(WORDS, rng.randrange(2, 4))).title()
+                        for _ in range(args.dishes * 2)})[:args.dishes]
+    start = time.perf_counter()
+    index = FuzzyIndex(synthetic)
+    build = time.perf_counter() - start
+    sample = [(misspell(n, rng), n) for n in rng.sample(synthetic, min(200, len(synthetic)))]
+    per_index, found = timed(lambda q: index.match(q[0], 1), sample)
+    per_scan, scanned = timed(lambda q: get_close_matches(q[0], synthetic, 1, 0.0), sample[:50])
+    index_hits = sum(bool(m) and synthetic[m[0][1]] == n for m, (_, n) in zip(found, sample))
+    scan_hits = sum(bool(m) and m[0] == n for m, (_, n) in zip(scanned, sample[:50]))
+    print(f"Synthetic menu of {len(synthetic)} dishes (index built in {build * 1e3:.0f}ms):")
+    print(f"  fuzzy index  {per_index * 1e3:7.2f}ms/lookup  top-1 {index_hits / len(sample):.0%}")
+    print(f"  difflib scan {per_scan * 1e3:7.2f}ms/lookup  top-1 {scan_hits / len(sample[:50]):.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""What a barge-in throws away, with and without paced outbound audio.
+
+Usage:
+    python benchmarks/bench_outbound_audio.py [--utterance 6] [--barge-in 1.5] [--lead 0.1]
+
+The agent delivers a whole TTS utterance in a burst; the caller interrupts
+`--barge-in` seconds after playback starts. Unpaced (the previous behaviour)
+every frame is written to Twilio immediately, so the clear has to discard
+everything Twilio buffered. Paced, only `lead` seconds sit at Twilio and the
+rest is dropped locally before it is ever sent.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from media_codec import MediaFrameEncoder  # noqa: E402
+from outbound_audio import FRAME_SECONDS, OutboundAudio  # noqa: E402
+
+CHUNK = 800  # agent audio arrives in 100 ms pieces
+
+
+class FakeTwilioSocket:
+    """Counts what was written to Twilio and when."""
+
+    def __init__(self):
+        self.media = 0
+        self.marks = 0
+        self.bytes_written = 0
+
+    async def send(self, message):
+        self.bytes_written += len(message)
+        if message.startswith('{"event":"media"'):
+            self.media += 1
+        elif message.startswith('{"event":"mark"'):
+            self.marks += 1
+
+
+async def unpaced(args, audio):
+    ws = FakeTwilioSocket()
+    encoder = MediaFrameEncoder("MZ0")
+    for i in range(0, len(audio), CHUNK):
+        await ws.send(encoder.media(audio[i:i + CHUNK]))
+    written = ws.bytes_written
+    await asyncio.sleep(args.barge_in)
+    await ws.send(encoder.clear())
+    heard = args.barge_in
+    return {
+        "sent_s": len(audio) / 8000,
+        "unplayed_s": len(audio) / 8000 - heard,
+        "dropped_local_s": 0.0,
+        "heard_estimate_s": None,
+        "peak_bytes_in_flight": written,
+    }
+
+
+async def paced(args, audio):
+    ws = FakeTwilioSocket()
+    outbound = OutboundAudio(ws.send, MediaFrameEncoder("MZ0"), lead=args.lead)
+    outbound.start()
+    for i in range(0, len(audio), CHUNK):
+        outbound.write(audio[i:i + CHUNK])
+    outbound.finish()
+    await asyncio.sleep(args.barge_in)
+    dropped, unplayed = await outbound.clear()
+    await outbound.stop()
+    return {
+        "sent_s": outbound.sent_frames * FRAME_SECONDS,
+        "unplayed_s": unplayed,
+        "dropped_local_s": dropped,
+        "heard_estimate_s": outbound.played_frames * FRAME_SECONDS,
+        # Base64 JSON frames written ahead of playback, at most `lead` seconds
+        "peak_bytes_in_flight": round(args.lead / FRAME_SECONDS + 1) * len(
+            MediaFrameEncoder("MZ0").media(bytes(160))),
+    }
+
+
+async def run(args):
+    audio = b"\x10" * int(args.utterance * 8000)
+    start = time.perf_counter()
+    for name, mode in (("unpaced", unpaced), ("paced", paced)):
+        result = await mode(args, audio)
+        heard = result["heard_estimate_s"]
+        print(f"{name:<8} sent {result['sent_s']:5.2f}s | discarded at Twilio "
+              f"{result['unplayed_s']:5.2f}s | dropped locally {result['dropped_local_s']:5.2f}s | "
+              f"heard {'unknown' if heard is None else f'{heard:.2f}s'} "
+              f"(actual {args.barge_in:.2f}s) | "
+              f"~{result['peak_bytes_in_flight'] / 1024:.0f} KiB buffered downstream")
+    print(f"({time.perf_counter() - start:.1f}s)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--utterance", type=float, default=6.0, help="seconds of agent speech")
+    parser.add_argument("--barge-in", type=float, default=1.5, help="seconds until the caller interrupts")
+    parser.add_argument("--lead", type=float, default=0.1)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""Time from hang-up to final summary: one summary of the whole call vs rolling summarization.
+
+Usage:
+    python benchmarks/bench_rolling_summary.py [--calls 20] [--turns 60] [--turn-interval 0.3]
+                                               [--latency 0.1] [--token-latency 0.15] [--every 6]
+
+Plays `--calls` concurrent calls of `--turns` transcript turns, one turn
+every `--turn-interval` seconds, against the local chat-completions stub
+(`--latency` seconds per reply plus `--token-latency` per 1000 prompt
+tokens). The defaults are real timings scaled down about 10x: a turn every
+few seconds and LLM replies of a second or more. "whole call" is the
+previous approach: at hang-up the full conversation goes to the LLM in one
+prompt. "rolling" folds turns in every `--every` turns during the call, so
+at hang-up only the tail is left. "fallback" is rolling with the LLM
+failing every request from hang-up on. Reports time to final summary and
+the prompt tokens sent.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generate_summary import get_client, request_summary  # noqa: E402
+from rolling_summary import RollingSummarizer  # noqa: E402
+from stub_chat_completions import start_stub  # noqa: E402
+from transcript import Transcript  # noqa: E402
+
+SCRIPT = (
+    ("assistant", "Hello! I'm Joe's Voice Assistant. How can I assist you?"),
+    ("user", "Hi, my name is Sam Patel. My left knee has been hurting for about three months."),
+    ("assistant", "I'm sorry to hear that, Sam. Does the pain get worse when you climb stairs or after walking?"),
+    ("user", "Yes, stairs are the worst. It's stiff in the morning and swells a little after a long walk."),
+    ("assistant", "That sounds like it could be early joint wear. PRP, or platelet-rich plasma, uses your own "
+                  "blood to support healing and is often used for knee pain like yours."),
+    ("user", "How long does a PRP session take, and is there any downtime afterwards?"),
+    ("assistant", "A session takes about an hour. Most people go back to normal activity within a day or two, "
+                  "avoiding strenuous exercise for a week."),
+    ("user", "Okay. Could you email me the free guide? It's sam dot patel at example dot com."),
+    ("assistant", "Of course. That's s-a-m dot p-a-t-e-l at example dot com. Is that right?"),
+    ("user", "That's right. Can I book PRP for next Tuesday at 10 AM?"),
+    ("assistant", "Let me check. Tuesday at 10 AM is free. Shall I book it for you?"),
+    ("user", "Yes please, book it."),
+)
+
+
+def script_turn(i):
+    role, text = SCRIPT[i % len(SCRIPT)]
+    # Longer calls go over the same ground again, as real ones do
+    return role, text if i < len(SCRIPT) else f"{text} (again)"
+
+
+async def play_call(index, args, mode, stub):
+    transcript = Transcript(f"CA{index:06d}", max_turns=max(args.turns, 1))
+    limiter = args.limiter
+    summarizer = None
+    if mode != "whole call":
+        summarizer = RollingSummarizer(transcript.call_sid, transcript, every=args.every, limiter=limiter)
+    for i in range(args.turns):
+        await asyncio.sleep(args.turn_interval)
+        transcript.append(*script_turn(i))
+        if summarizer is not None:
+            summarizer.on_turn()
+
+    hung_up = time.perf_counter()
+    if mode == "whole call":
+        async with limiter:
+            summary = await request_summary(transcript.conversation())
+    else:
+        if mode == "fallback":
+            stub.fail_rate = 1.0
+        try:
+            async with limiter:
+                summary = await summarizer.finish()
+        except Exception:
+            summary = summarizer.fallback()
+    return time.perf_counter() - hung_up, summary
+
+
+async def run(args):
+    _, stub, base_url = start_stub(latency=args.latency, token_latency=args.token_latency)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    get_client()
+
+    for mode in ("whole call", "rolling", "fallback"):
+        stub.fail_rate = 0.0
+        stub.requests = stub.prompt_tokens = 0
+        args.limiter = asyncio.Semaphore(args.concurrency)
+        results = await asyncio.gather(*(play_call(i, args, mode, stub) for i in range(args.calls)))
+        times = sorted(seconds for seconds, _ in results)
+        mean = sum(times) / len(times)
+        p95 = times[min(len(times) - 1, int(len(times) * 0.95))]
+        print(f"{mode:<10}  final summary after hang-up: mean {mean * 1e3:7.0f}ms  p95 {p95 * 1e3:7.0f}ms"
+              f"  | {stub.requests} LLM requests, {stub.prompt_tokens} prompt tokens")
+        if args.verbose:
+            print(f"            {results[0][1]}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=20)
+    parser.add_argument("--turns", type=int, default=60)
+    parser.add_argument("--turn-interval", type=float, default=0.3, help="seconds between turns")
+    parser.add_argument("--latency", type=float, default=0.1, help="stub seconds per reply")
+    parser.add_argument("--token-latency", type=float, default=0.15,
+                        help="stub seconds per 1000 prompt tokens")
+    parser.add_argument("--every", type=int, default=6, help="turns per rolling update")
+    parser.add_argument("--concurrency", type=int, default=8, help="LLM requests in flight")
+    parser.add_argument("--verbose", action="store_true", help="print one final summary per mode")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
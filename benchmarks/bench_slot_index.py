@@ -0,0 +1,160 @@
+"""Availability lookups against the slot index as the booking count grows.
+
+Usage:
+    python benchmarks/bench_slot_index.py [--max 500000] [--lookups 2000] [--racers 16]
+
+At each checkpoint the store is bulk-filled with bookings spread over the
+coming year, then the bench reports the index build time and the mean cost
+of check_availability-style lookups (slot index vs. scanning the day with
+a SQL query), of next_free_slots on a fully booked stretch, and of a
+create_booking insert with its conflict check. Finally `--racers` threads
+try to book the same slot at once; exactly one must succeed.
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from booking_store import BookingStore, SlotUnavailableError  # noqa: E402
+from slot_index import SlotCalendar, SlotIndex, spoken_time  # noqa: E402
+
+TREATMENTS = ("PRP", "Lasers", "Non-Operative Orthopedics")
+START = date(2030, 1, 7)  # a Monday, safely in the future
+NOW = datetime(2030, 1, 7, 7, 0)
+
+
+def make_booking(i, day, slot, treatment):
+    return {
+        "name": f"Customer {i}",
+        "age": 20 + i % 60,
+        "symptoms": "Knee pain",
+        "treatment": treatment,
+        "appointment_date": day.isoformat(),
+        "appointment_time": spoken_time(slot),
+        "contact_email": f"customer{i}@example.com",
+        "contact_phone": f"+1555{i:07d}",
+    }
+
+
+def all_slots(calendar, days):
+    for offset in range(days):
+        day = START + timedelta(days=offset)
+        for slot in calendar.day_slots(day):
+            for treatment in TREATMENTS:
+                yield day, slot, treatment
+
+
+def fill(store, calendar, count):
+    """Book the first `count` (day, slot, treatment) places, earliest first.
+
+    With capacity > 1 the same places are booked again until `count` rows.
+    """
+    per_day = len(calendar.day_slots(START)) * len(TREATMENTS)
+    days = max(1, -(-count // (per_day * calendar.capacity)) * 7 // 5 + 7)
+    rows = []
+    places = list(all_slots(calendar, days))
+    i = 0
+    while len(rows) < count:
+        day, slot, treatment = places[i % len(places)]
+        rows.append(make_booking(len(rows), day, slot, treatment))
+        i += 1
+    with store._transaction() as conn:
+        store._insert_many(conn, rows)
+    return days
+
+
+def timed(fn, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat
+
+
+def race(store, calendar, racers, day):
+    results = []
+    barrier = threading.Barrier(racers)
+
+    def book(i):
+        barrier.wait()
+        booking = make_booking(10_000_000 + i, day, "09:00", "PRP")
+        try:
+            store.add(booking, slot=calendar.bounds("09:00"))
+            results.append("ok")
+        except SlotUnavailableError:
+            results.append("rejected")
+
+    threads = [threading.Thread(target=book, args=(i,)) for i in range(racers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results.count("ok"), results.count("rejected")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--max", type=int, default=500_000, help="largest booking count")
+    parser.add_argument("--lookups", type=int, default=2000, help="timed lookups per checkpoint")
+    parser.add_argument("--racers", type=int, default=16, help="threads booking one slot at once")
+    args = parser.parse_args()
+
+    checkpoints = [n for n in (1_000, 10_000, 100_000, 250_000, 500_000, 1_000_000)
+                   if n <= args.max]
+    calendar = SlotCalendar(slot_minutes=30, open_time="08:00", close_time="17:00",
+                            days="0,1,2,3,4", capacity=1)
+    rng = random.Random(1)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        print(f"{'bookings':>9} {'build':>9} {'index day':>10} {'sql day':>9} "
+              f"{'next 5':>9} {'insert':>9}")
+        for count in checkpoints:
+            store = BookingStore(os.path.join(tmp, f"bench-{count}.sqlite3"))
+            days = fill(store, calendar, count)
+
+            start = time.perf_counter()
+            index = SlotIndex(store, calendar)
+            index.sync()
+            build = time.perf_counter() - start
+
+            def lookup():
+                day = START + timedelta(days=rng.randrange(days))
+                index.free_slots(day.isoformat(), TREATMENTS[rng.randrange(3)], now=NOW)
+
+            def sql_lookup():
+                day = START + timedelta(days=rng.randrange(days))
+                store.by_slot(day.isoformat())
+
+            # Every slot from START on is booked, so this walks the full stretch
+            # up to the first free day (bounded by BOOKING_HORIZON_DAYS)
+            next_free = timed(lambda: index.next_free(5, "PRP", now=NOW), max(1, args.lookups // 100))
+            per_lookup = timed(lookup, args.lookups)
+            per_sql = timed(sql_lookup, max(1, args.lookups // 10))
+
+            inserts = []
+            for i in range(50):
+                day = START + timedelta(days=days + 7 + i)
+                booking = make_booking(count + i, day, "10:00", "Lasers")
+                t = time.perf_counter()
+                store.add(booking, slot=calendar.bounds("10:00"))
+                inserts.append(time.perf_counter() - t)
+            print(f"{count:>9} {build * 1e3:>7.0f}ms {per_lookup * 1e6:>8.1f}us "
+                  f"{per_sql * 1e6:>7.0f}us {next_free * 1e6:>7.0f}us "
+                  f"{sum(inserts) / len(inserts) * 1e6:>7.0f}us")
+            store.close()
+
+        store = BookingStore(os.path.join(tmp, "race.sqlite3"))
+        ok, rejected = race(store, calendar, args.racers, START)
+        print(f"{args.racers} concurrent bookings of one slot: {ok} booked, {rejected} rejected")
+        store.close()
+        if ok != 1:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Drive the summary worker against the local chat-completions stub.
+
+Usage:
+    python benchmarks/bench_summary_worker.py [--calls 200] [--latency 0.5] [--fail-rate 0.1]
+
+Enqueues summaries for N finished calls at once and reports how long the
+enqueue took (what a Twilio stop event now pays), total drain time, retries
+and failures, and the worst event-loop stall observed while the jobs ran.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from generate_summary import get_client  # noqa: E402
+from stub_chat_completions import start_stub  # noqa: E402
+from summary_worker import SummaryWorker  # noqa: E402
+
+
+CONVERSATION = [
+    {"user_message": "Hi, my name is Sam and my knee hurts when I walk.",
+     "assistant_message": "Sorry to hear that, Sam. PRP can help with knee pain."},
+    {"user_message": "Can I book for next Tuesday at 10 AM?",
+     "assistant_message": "Sure, I have booked PRP for Tuesday at 10 AM."},
+]
+
+
+async def monitor_loop_lag(stop, interval=0.01):
+    worst = 0.0
+    loop = asyncio.get_running_loop()
+    while not stop.is_set():
+        start = loop.time()
+        await asyncio.sleep(interval)
+        worst = max(worst, loop.time() - start - interval)
+    return worst
+
+
+async def run(args):
+    _, state, base_url = start_stub(latency=args.latency, fail_rate=args.fail_rate)
+    os.environ["OPENAI_BASE_URL"] = base_url
+    os.environ.setdefault("OPENAI_API_KEY", "stub")
+    # Build the client up front, as the server does at startup, so its
+    # one-off construction cost is not reported as a loop stall
+    get_client()
+
+    published = []
+
+    async def publish(callsid, summary):
+        published.append((callsid, summary))
+
+    worker = SummaryWorker(publish, workers=args.workers, concurrency=args.concurrency,
+                           backoff=0.05, deadline=args.deadline)
+    stop = asyncio.Event()
+    lag_task = asyncio.ensure_future(monitor_loop_lag(stop))
+
+    start = time.perf_counter()
+    for i in range(args.calls):
+        worker.enqueue(f"CA{i:06d}", CONVERSATION)
+    enqueue_time = time.perf_counter() - start
+
+    await worker.join()
+    drain_time = time.perf_counter() - start
+    stop.set()
+    worst_lag = await lag_task
+    await worker.stop()
+
+    print(f"calls:               {args.calls}")
+    print(f"enqueue per call:    {enqueue_time / args.calls * 1e6:.1f} us")
+    print(f"drain time:          {drain_time:.2f} s")
+    print(f"stub requests:       {state.requests} ({state.failures} failed)")
+    print(f"worker:              {worker.snapshot()}")
+    print(f"published summaries: {len(published)}")
+    print(f"worst loop stall:    {worst_lag * 1000:.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.5)
+    parser.add_argument("--fail-rate", type=float, default=0.1)
+    parser.add_argument("--workers", type=int, default=8)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--deadline", type=float, default=30.0)
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
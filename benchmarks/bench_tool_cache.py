@@ -0,0 +1,95 @@
+"""Tool-call latency with and without the result cache.
+
+Usage:
+    python benchmarks/bench_tool_cache.py [--calls 2000] [--concurrency 20] [--dates 10] [--book-every 50]
+
+Fires `--calls` availability lookups (check_availability over `--dates`
+distinct dates and the three treatments, plus next_free_slots) through the
+ToolExecutor, `--concurrency` at a time, with a create_booking every
+`--book-every` calls to exercise invalidation. Reports mean and p95 call
+latency, and the cache counters.
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+TREATMENTS = ("PRP", "Lasers", "Non-Operative Orthopedics")
+
+
+def make_calls(args, rng):
+    start = date.today() + timedelta(days=30)
+    calls = []
+    for i in range(args.calls):
+        if args.book_every and i % args.book_every == args.book_every - 1:
+            day = start + timedelta(days=rng.randrange(args.dates))
+            calls.append(("create_booking", {
+                "name": f"Customer {i}", "age": 40, "symptoms": "Knee pain",
+                "treatment": rng.choice(TREATMENTS), "email": f"c{i}@example.com",
+                "appointment_date": day.isoformat(),
+                "appointment_time": f"{rng.randrange(8, 12)}:{rng.choice(('00', '30'))} AM",
+            }))
+        elif rng.random() < 0.2:
+            calls.append(("next_free_slots", {"n": 3, "treatment": rng.choice(TREATMENTS)}))
+        else:
+            day = start + timedelta(days=rng.randrange(args.dates))
+            calls.append(("check_availability",
+                          {"date": day.isoformat(), "treatment": rng.choice(TREATMENTS)}))
+    return calls
+
+
+async def run(executor, calls, concurrency):
+    latencies = []
+    queue = list(reversed(calls))
+
+    async def worker():
+        while queue:
+            name, arguments = queue.pop()
+            start = time.perf_counter()
+            try:
+                await executor.execute(name, arguments)
+            except ValueError:
+                pass  # slot already taken
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--dates", type=int, default=10, help="distinct dates looked up")
+    parser.add_argument("--book-every", type=int, default=50, help="0 to never write")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["BOOKING_STORE_FILE"] = os.path.join(tmp, "bench.sqlite3")
+        os.chdir(tmp)  # no booking_db.json to import here
+        from agent_tools import TOOLS  # noqa: E402
+        from tool_cache import ToolCache  # noqa: E402
+        from tool_executor import ToolExecutor  # noqa: E402
+
+        for label in ("uncached", "cached"):
+            executor = ToolExecutor(TOOLS)
+            if label == "uncached":
+                executor.cache = ToolCache({})
+            latencies = asyncio.run(run(executor, make_calls(args, random.Random(1)), args.concurrency))
+            mean = sum(latencies) / len(latencies)
+            p95 = latencies[int(len(latencies) * 0.95)]
+            print(f"{label:<9} mean {mean * 1e6:8.0f}us  p95 {p95 * 1e6:8.0f}us")
+            for name, stats in executor.cache.snapshot().items():
+                print(f"  {name}: {stats}")
+            executor.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Per-call cost of tool argument validation, and startup cost of lazy tool loading.
+
+Usage:
+    python benchmarks/bench_tool_registry.py [--calls 200000]
+
+Times each tool's precompiled validator on typical agent arguments (strings
+where the schema says integer, loose enum spelling), against
+`inspect.signature(...).bind` (roughly what splatting checks) and against
+`jsonschema` when it is installed. Startup is the import time, in fresh
+interpreters, of the registry alone and of the registry plus every tool
+module.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(__file__), "..")
+sys.path.insert(0, ROOT)
+
+from agent_tools import TOOLS  # noqa: E402
+
+ARGUMENTS = {
+    "create_booking": {"name": "John Doe", "age": "34", "symptoms": "Knee pain", "treatment": "prp",
+                       "email": "john.doe@example.com", "appointment_date": "2025-08-28",
+                       "appointment_time": "10:00 AM"},
+    "check_availability": {"date": "2025-08-28", "treatment": "Lasers"},
+    "next_free_slots": {"n": 3},
+    "send_email": {"email_address": "john.doe@example.com"},
+    "get_menu_classes": {},
+    "get_dishes_in_class": {"class_name": "Curries"},
+    "get_dish_details": {"dish_name": "Butter Chicken"},
+    "find_dishes": {"ingredient": "paneer", "dietary": "vegetarian"},
+}
+
+
+def per_call(fn, arguments, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        fn(arguments)
+    return (time.perf_counter() - start) / calls
+
+
+def startup(code):
+    # asyncio is loaded by the server before any of this; leave it out
+    timed = f"import asyncio, time\nstart = time.perf_counter()\n{code}\nprint(time.perf_counter() - start)"
+    return min(float(subprocess.run([sys.executable, "-c", timed], cwd=ROOT, check=True,
+                                    capture_output=True, text=True).stdout)
+               for _ in range(5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=200000)
+    args = parser.parse_args()
+
+    try:
+        import jsonschema
+    except ImportError:
+        jsonschema = None
+
+    print(f"{'tool':<20} {'validate':>10} {'bind':>10}" + (f" {'jsonschema':>11}" if jsonschema else ""))
+    for name, arguments in ARGUMENTS.items():
+        spec = TOOLS[name]
+        validated = spec.validate(arguments)
+        signature = spec.__signature__
+        line = (f"{name:<20} {per_call(spec.validate, arguments, args.calls) * 1e6:8.2f}us"
+                f" {per_call(lambda a: signature.bind(**a), validated, args.calls) * 1e6:8.2f}us")
+        if jsonschema:
+            validator = jsonschema.Draft7Validator(spec.schema()["parameters"])
+            line += f" {per_call(validator.validate, validated, args.calls // 10) * 1e6:9.2f}us"
+        print(line)
+
+    lazy = startup("import agent_tools")
+    eager = startup("import agent_tools\nfor spec in agent_tools.TOOLS.values(): spec.load()")
+    print(f"Import time: registry {lazy * 1e3:.1f}ms, registry + all tool modules {eager * 1e3:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
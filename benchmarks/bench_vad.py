@@ -0,0 +1,106 @@
+"""Latency and upstream bytes for the inbound framing and silence modes.
+
+Usage:
+    python benchmarks/bench_vad.py [--seconds 120] [--speech-ratio 0.4]
+
+Feeds a synthetic call (bursts of speech-level noise between stretches of
+line noise, as 20 ms Twilio frames) through InboundAudio for each framing
+size and silence mode, and reports how long caller audio waits before it is
+sent, how late the first audio of each utterance goes out, the bytes sent
+per minute, and the processing cost per frame.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import vad  # noqa: E402
+from vad import InboundAudio  # noqa: E402
+
+FRAME_MS = 20
+
+
+def linear_to_mulaw(sample):
+    sign = 0x80 if sample < 0 else 0
+    sample = min(abs(sample), 32635) + 0x84
+    exponent = max(0, sample.bit_length() - 8)
+    mantissa = (sample >> (exponent + 3)) & 0x0F
+    return ~(sign | exponent << 4 | mantissa) & 0xFF
+
+
+def synthetic_call(seconds, speech_ratio, seed=1):
+    """List of (frame, is_speech) for alternating utterances and pauses."""
+    rng = random.Random(seed)
+    frames = []
+    speech = False
+    while len(frames) * FRAME_MS < seconds * 1000:
+        mean_s = 2.0 * (speech_ratio if speech else 1 - speech_ratio) / 0.5
+        length = max(5, int(rng.expovariate(1 / mean_s) * 1000 / FRAME_MS))
+        level = rng.uniform(2000, 8000) if speech else rng.uniform(20, 120)
+        for _ in range(length):
+            frame = bytes(linear_to_mulaw(int(rng.gauss(0, level))) for _ in range(160))
+            frames.append((frame, speech))
+        speech = not speech
+    return frames
+
+
+def run_config(frames, frame_ms, mode):
+    inbound = InboundAudio(frame_ms=frame_ms, silence_mode=mode)
+    waits = []
+    onset_delays = []
+    queued = []  # arrival times (ms) of speech frames not yet sent
+    onset_at = None
+    prev_speech = False
+    elapsed = 0.0
+    for i, (frame, speech) in enumerate(frames):
+        now = (i + 1) * FRAME_MS
+        if speech and not prev_speech:
+            onset_at = i * FRAME_MS
+        prev_speech = speech
+        if speech:
+            queued.append(now)
+        started = time.perf_counter()
+        chunks = inbound.write(frame)
+        elapsed += time.perf_counter() - started
+        if chunks:
+            waits.extend(now - arrived for arrived in queued)
+            queued.clear()
+            if onset_at is not None and speech:
+                onset_delays.append(now - onset_at)
+                onset_at = None
+    minutes = len(frames) * FRAME_MS / 60000
+    return {
+        "wait": sum(waits) / len(waits) if waits else 0.0,
+        "onset": sum(onset_delays) / len(onset_delays) if onset_delays else 0.0,
+        "kbytes_per_min": inbound.bytes_sent / minutes / 1024,
+        "saved": inbound.bytes_suppressed / inbound.bytes_in,
+        "us_per_frame": elapsed / len(frames) * 1e6,
+        "speech_starts": inbound.speech_starts,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seconds", type=float, default=120)
+    parser.add_argument("--speech-ratio", type=float, default=0.4)
+    args = parser.parse_args()
+
+    frames = synthetic_call(args.seconds, args.speech_ratio)
+    utterances = sum(1 for i, (_, s) in enumerate(frames) if s and (i == 0 or not frames[i - 1][1]))
+    print(f"{args.seconds:.0f}s call, {utterances} utterances, "
+          f"backend: {'numpy' if vad.np is not None else 'pure Python'}")
+    print(f"{'framing':>8} {'silence':>9} | {'avg wait':>9} | {'onset sent':>10} | "
+          f"{'KiB/min':>8} | {'saved':>6} | {'us/frame':>8} | onsets")
+    for frame_ms in (400, 100, 40, 20):
+        for mode in ("off", "suppress", "thin"):
+            r = run_config(frames, frame_ms, mode)
+            print(f"{frame_ms:>6}ms {mode:>9} | {r['wait']:>6.0f} ms | {r['onset']:>7.0f} ms | "
+                  f"{r['kbytes_per_min']:>8.1f} | {r['saved']:>6.1%} | {r['us_per_frame']:>8.1f} | "
+                  f"{r['speech_starts']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,194 @@
+"""Local websocket stand-in for the Deepgram agent converse API.
+
+Usage:
+    python benchmarks/fake_agent.py [--port 8765] [--handshake-delay 0.15] [--settings-delay 0.1]
+    AGENT_URL=ws://127.0.0.1:8765 DEEPGRAM_API_KEY=stub python main.py
+
+Speaks the parts of the protocol the server uses: Welcome on connect, then
+SettingsApplied, the greeting as ConversationText and greeting audio once a
+Settings message arrives. After that, every `turn_bytes` of caller audio is
+treated as one user utterance: the agent sends UserStartedSpeaking, the user
+and assistant ConversationText, optionally a FunctionCallRequest, and a burst
+of synthetic mulaw response audio. The handshake and Settings delays model
+the round trips to the real endpoint. With `hangup_every` set, every Nth
+call is closed from the agent side after its first utterance.
+
+Response audio for turn k is filled with the byte RESPONSE_MARKER + k % 100 so
+a load-test client can tell which utterance a frame answers; greeting audio
+is mulaw silence (0xFF).
+"""
+import argparse
+import asyncio
+import json
+
+import websockets
+
+# 20 ms of mulaw silence
+SILENCE_FRAME = b"\xff" * 160
+RESPONSE_MARKER = 0x10
+
+
+class AgentConnectionState:
+    __slots__ = ("received", "turns", "function_responses", "audio_sent", "tasks")
+
+    def __init__(self):
+        self.received = 0
+        self.turns = 0
+        self.function_responses = 0
+        self.audio_sent = 0
+        self.tasks = set()
+
+
+class FakeAgent:
+    def __init__(self, handshake_delay=0.15, settings_delay=0.1, greeting_frames=50,
+                 turn_bytes=8000, response_bytes=8000, response_chunk=800,
+                 response_delay=0.05, chunk_interval=0.01, function_every=4, hangup_every=0):
+        self.handshake_delay = handshake_delay
+        self.settings_delay = settings_delay
+        self.greeting_frames = greeting_frames
+        self.turn_bytes = turn_bytes
+        self.response_bytes = response_bytes
+        self.response_chunk = response_chunk
+        self.response_delay = response_delay
+        self.chunk_interval = chunk_interval
+        self.function_every = function_every
+        self.hangup_every = hangup_every
+        self.connections = 0
+        self.open_connections = 0
+        self.settings_received = 0
+        self.keepalives = 0
+        self.audio_bytes_received = 0
+        self.audio_bytes_sent = 0
+        self.function_requests = 0
+        self.function_responses = 0
+        # Connections that received a caller utterance, and those the agent
+        # closed after it
+        self.answered = 0
+        self.hangups = 0
+        # Per-connection state, kept after close for reporting
+        self.states = []
+
+    async def process_request(self, path, request_headers):
+        # Delay before accepting the upgrade, like a TLS + HTTP round trip
+        if self.handshake_delay:
+            await asyncio.sleep(self.handshake_delay)
+        return None
+
+    async def handler(self, ws, path=None):
+        self.connections += 1
+        self.open_connections += 1
+        state = AgentConnectionState()
+        self.states.append(state)
+        await ws.send(json.dumps({"type": "Welcome", "request_id": f"fake-{self.connections}"}))
+        try:
+            async for message in ws:
+                if isinstance(message, bytes):
+                    self.audio_bytes_received += len(message)
+                    await self.on_audio(ws, message, state)
+                    continue
+                decoded = json.loads(message)
+                if decoded.get("type") == "Settings":
+                    self.settings_received += 1
+                    await self.on_settings(ws, decoded, state)
+                elif decoded.get("type") == "KeepAlive":
+                    self.keepalives += 1
+                elif decoded.get("type") == "FunctionCallResponse":
+                    self.function_responses += 1
+                    state.function_responses += 1
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            self.open_connections -= 1
+            for task in state.tasks:
+                task.cancel()
+
+    async def on_settings(self, ws, settings, state):
+        if self.settings_delay:
+            await asyncio.sleep(self.settings_delay)
+        await ws.send(json.dumps({"type": "SettingsApplied"}))
+        greeting = settings.get("agent", {}).get("greeting", "Hello!")
+        await ws.send(json.dumps({"type": "ConversationText", "role": "assistant", "content": greeting}))
+        await ws.send(json.dumps({"type": "AgentStartedSpeaking"}))
+        for _ in range(self.greeting_frames):
+            await ws.send(SILENCE_FRAME)
+            self.audio_bytes_sent += len(SILENCE_FRAME)
+            state.audio_sent += len(SILENCE_FRAME)
+        await ws.send(json.dumps({"type": "AgentAudioDone"}))
+
+    async def on_audio(self, ws, chunk, state):
+        if not self.turn_bytes:
+            return
+        before = state.received // self.turn_bytes
+        state.received += len(chunk)
+        for _ in range(state.received // self.turn_bytes - before):
+            turn = state.turns
+            state.turns += 1
+            if turn == 0:
+                self.answered += 1
+                if self.hangup_every and self.answered % self.hangup_every == 0:
+                    self.hangups += 1
+                    await ws.close()
+                    return
+            task = asyncio.ensure_future(self.respond(ws, turn, state))
+            state.tasks.add(task)
+            task.add_done_callback(state.tasks.discard)
+
+    async def respond(self, ws, turn, state):
+        try:
+            await ws.send(json.dumps({"type": "UserStartedSpeaking"}))
+            await ws.send(json.dumps({"type": "ConversationText", "role": "user",
+                                      "content": f"Synthetic caller utterance number {turn}."}))
+            if self.function_every and turn % self.function_every == self.function_every - 1:
+                self.function_requests += 1
+                await ws.send(json.dumps({
+                    "type": "FunctionCallRequest",
+                    "functions": [{
+                        "id": f"fc-{turn}",
+                        "name": "send_email",
+                        "arguments": json.dumps({"email_address": "caller@example.com"}),
+                        "client_side": True
+                    }]
+                }))
+            if self.response_delay:
+                await asyncio.sleep(self.response_delay)
+            await ws.send(json.dumps({"type": "ConversationText", "role": "assistant",
+                                      "content": f"Synthetic agent reply number {turn}."}))
+            await ws.send(json.dumps({"type": "AgentStartedSpeaking"}))
+            frame = bytes([RESPONSE_MARKER + turn % 100]) * self.response_chunk
+            for _ in range(self.response_bytes // self.response_chunk):
+                await ws.send(frame)
+                self.audio_bytes_sent += len(frame)
+                state.audio_sent += len(frame)
+                if self.chunk_interval:
+                    await asyncio.sleep(self.chunk_interval)
+            await ws.send(json.dumps({"type": "AgentAudioDone"}))
+        except websockets.ConnectionClosed:
+            pass
+
+    def serve(self, host="127.0.0.1", port=0):
+        return websockets.serve(self.handler, host, port, process_request=self.process_request,
+                                max_queue=None)
+
+
+async def run(args):
+    agent = FakeAgent(args.handshake_delay, args.settings_delay)
+    async with agent.serve(args.host, args.port) as server:
+        port = server.sockets[0].getsockname()[1]
+        print(f"Fake agent listening on ws://{args.host}:{port}")
+        await asyncio.Future()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--handshake-delay", type=float, default=0.15)
+    parser.add_argument("--settings-delay", type=float, default=0.1)
+    try:
+        asyncio.run(run(parser.parse_args()))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,212 @@
+"""Simulated Twilio media-stream client for the /twilio route.
+
+Sends connected/start, then one 20 ms inbound media event per tick at
+real-time pacing, then stop. Incoming media, clear and mark events are
+tracked so the load test can compute end-to-end latency and audio loss.
+Like Twilio, marks are echoed back once the audio sent before them has been
+"played" (at 20 ms per frame), and pending marks are echoed on clear.
+
+Admission prompts are told apart by their bytes (HOLD_BYTE, REJECT_BYTE):
+a clear after hold audio means the call was admitted, and utterances are
+counted from there, since the agent never heard the audio sent on hold.
+"""
+import asyncio
+import base64
+import json
+import time
+
+import websockets
+
+from fake_agent import RESPONSE_MARKER
+
+FRAME_BYTES = 160
+FRAME_SECONDS = 0.02
+# Fill bytes of the hold and reject prompts the load test gives the server
+HOLD_BYTE = 0xF0
+REJECT_BYTE = 0xF1
+
+
+def speech_frame(i):
+    # Non-silent synthetic mulaw so energy-based stages treat it as speech
+    return bytes((0x20 + (i + j) % 32) for j in range(FRAME_BYTES))
+
+
+class TwilioCall:
+    def __init__(self, url, index, duration, turn_bytes, caller="+15550000000", callee="+15551111111"):
+        self.url = url
+        self.index = index
+        self.duration = duration
+        self.turn_bytes = turn_bytes
+        self.call_sid = f"CA{index:032d}"
+        self.stream_sid = f"MZ{index:032d}"
+        self.caller = caller
+        self.callee = callee
+        self.bytes_sent = 0
+        self.bytes_received = 0
+        self.frames_sent = 0
+        self.late_ticks = 0
+        self.clears = 0
+        self.marks = []
+        self.marks_echoed = 0
+        self.last_audio_at = None
+        self.turn_sent_at = {}
+        self.latencies = []
+        self.error = None
+        self.connected_at = None
+        self.first_audio_at = None
+        # Admission: when hold audio started and the call was admitted
+        self.held_at = None
+        self.admitted_at = None
+        self.rejected = False
+        self.prompt_bytes = 0
+        # The server closed the stream before the caller hung up
+        self.ended_by_server = False
+        # bytes_sent when the agent started listening
+        self.turn_base = 0
+
+    @property
+    def bytes_heard(self):
+        """Caller audio sent while the agent was listening."""
+        if self.rejected or (self.held_at is not None and self.admitted_at is None):
+            return 0
+        return self.bytes_sent - self.turn_base
+
+    async def run(self):
+        try:
+            async with websockets.connect(self.url, max_queue=None) as ws:
+                self.connected_at = time.monotonic()
+                receiver = asyncio.ensure_future(self.receive(ws))
+                try:
+                    await self.send(ws)
+                    # Wait for the last replies, until audio stops arriving
+                    deadline = time.monotonic() + 5
+                    await asyncio.sleep(0.3)
+                    while (time.monotonic() < deadline and self.last_audio_at
+                           and time.monotonic() - self.last_audio_at < 0.3):
+                        await asyncio.sleep(0.1)
+                finally:
+                    receiver.cancel()
+                    await asyncio.gather(receiver, return_exceptions=True)
+        except Exception as e:
+            self.error = repr(e)
+
+    async def send(self, ws):
+        try:
+            await self._send(ws)
+        except websockets.ConnectionClosed:
+            self.ended_by_server = True
+
+    async def _send(self, ws):
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await ws.send(json.dumps({
+            "event": "start",
+            "sequenceNumber": "1",
+            "start": {
+                "streamSid": self.stream_sid,
+                "callSid": self.call_sid,
+                "tracks": ["inbound"],
+                "mediaFormat": {"encoding": "audio/x-mulaw", "sampleRate": 8000, "channels": 1},
+                "customParameters": {"from": self.caller, "to": self.callee}
+            },
+            "streamSid": self.stream_sid
+        }))
+
+        frames = int(self.duration / FRAME_SECONDS)
+        payloads = [base64.b64encode(speech_frame(i)).decode("ascii") for i in range(16)]
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        for i in range(frames):
+            await ws.send(
+                '{"event":"media","sequenceNumber":"%d","media":{"track":"inbound","chunk":"%d",'
+                '"timestamp":"%d","payload":"%s"},"streamSid":"%s"}'
+                % (i + 2, i + 1, i * 20, payloads[i % 16], self.stream_sid)
+            )
+            self.frames_sent += 1
+            heard = self.bytes_sent - self.turn_base
+            before = heard // self.turn_bytes if self.turn_bytes else 0
+            self.bytes_sent += FRAME_BYTES
+            if self.turn_bytes and (heard + FRAME_BYTES) // self.turn_bytes > before:
+                self.turn_sent_at[before] = time.monotonic()
+            # Absolute schedule so pacing does not drift under load
+            delay = start + (i + 1) * FRAME_SECONDS - loop.time()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            elif delay < -FRAME_SECONDS:
+                # More than a frame behind schedule
+                self.late_ticks += 1
+
+        await ws.send(json.dumps({
+            "event": "stop",
+            "sequenceNumber": str(frames + 2),
+            "stop": {"accountSid": "AC0", "callSid": self.call_sid},
+            "streamSid": self.stream_sid
+        }))
+
+    def echo_mark(self, ws, name):
+        self.marks_echoed += 1
+        asyncio.ensure_future(self._send_mark(ws, name))
+
+    async def _send_mark(self, ws, name):
+        try:
+            await ws.send(json.dumps({"event": "mark", "streamSid": self.stream_sid, "mark": {"name": name}}))
+        except websockets.ConnectionClosed:
+            # Hung up by the server, e.g. after the rejection prompt
+            pass
+
+    async def receive(self, ws):
+        loop = asyncio.get_running_loop()
+        last_marker = None
+        next_turn = 0
+        # Loop time at which playback of everything received so far ends
+        play_end = 0.0
+        pending_marks = {}
+        async for message in ws:
+            data = json.loads(message)
+            event = data.get("event")
+            if event == "media":
+                audio = base64.b64decode(data["media"]["payload"])
+                if audio and audio[0] in (HOLD_BYTE, REJECT_BYTE):
+                    self.prompt_bytes += len(audio)
+                    play_end = max(play_end, loop.time()) + len(audio) / 8000
+                    if audio[0] == REJECT_BYTE:
+                        self.rejected = True
+                    elif self.held_at is None:
+                        self.held_at = time.monotonic()
+                    continue
+                self.bytes_received += len(audio)
+                play_end = max(play_end, loop.time()) + len(audio) / 8000
+                now = time.monotonic()
+                self.last_audio_at = now
+                if self.first_audio_at is None:
+                    self.first_audio_at = now
+                marker = audio[0] - RESPONSE_MARKER if audio else -1
+                if 0 <= marker < 100 and marker != last_marker:
+                    # First frame of the response to utterance `turn`
+                    last_marker = marker
+                    turn = next_turn + (marker - next_turn) % 100
+                    sent_at = self.turn_sent_at.get(turn)
+                    if sent_at is not None:
+                        self.latencies.append(now - sent_at)
+                    next_turn = turn + 1
+            elif event == "clear":
+                if self.held_at is not None and self.admitted_at is None:
+                    # Off hold: the agent hears the caller from here on
+                    self.admitted_at = time.monotonic()
+                    self.turn_base = self.bytes_sent
+                    self.turn_sent_at.clear()
+                    continue
+                self.clears += 1
+                play_end = 0.0
+                for name, handle in list(pending_marks.items()):
+                    handle.cancel()
+                    self.echo_mark(ws, name)
+                pending_marks.clear()
+            elif event == "mark":
+                name = data.get("mark", {}).get("name")
+                self.marks.append(name)
+
+                def played(name=name):
+                    pending_marks.pop(name, None)
+                    self.echo_mark(ws, name)
+
+                pending_marks[name] = loop.call_at(max(play_end, loop.time()), played)
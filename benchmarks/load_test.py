@@ -0,0 +1,436 @@
+"""Concurrent-call load test for main.py against local stand-ins.
+
+Usage:
+    python benchmarks/load_test.py [--calls 50] [--ramp 10] [--duration 20]
+    python benchmarks/load_test.py --calls 20 --duration 8 --max-p95-ms 800 --max-drop-rate 0.01
+
+Starts the fake agent (benchmarks/fake_agent.py) and the server in their own
+processes and the chat-completions stub on a thread, then ramps up to N
+simulated Twilio calls (benchmarks/fake_twilio.py), each streaming caller
+audio at real-time pacing. No live service is contacted.
+
+Reported:
+  - end-to-end latency: last byte of a caller utterance sent -> first frame
+    of the agent's reply received (includes the fake agent's response delay
+    and the server's inbound audio buffering)
+  - server event-loop lag, CPU and memory while the calls ran
+  - audio lost in either direction, and server-side leftovers after hang-up
+
+With --record, every call is recorded, which shows the recording overhead
+when compared with a run without it.
+
+With --max-calls, the server's admission control caps concurrent calls
+(ADMISSION_MAX_CALLS, per worker) and holds or rejects the rest per
+--admission-policy. Run at twice the capacity found without a cap, e.g.
+    python benchmarks/load_test.py --calls 100 --max-calls 50 --duration 20
+admitted calls should see the latency and loop lag of a 50-call run. Held
+and rejected calls hear marked prompt audio, so the report can count them;
+latency and audio loss are counted from the moment a call is admitted.
+
+With any of the --max-* thresholds set, the exit status is 1 when a threshold
+is exceeded, so the script can gate CI.
+"""
+import argparse
+import asyncio
+import multiprocessing
+import os
+import resource
+import socket
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+from fake_twilio import HOLD_BYTE, REJECT_BYTE, TwilioCall  # noqa: E402
+from stub_chat_completions import start_stub  # noqa: E402
+
+# Bytes main.py accumulates before forwarding caller audio to the agent; up to
+# this much per call may legitimately still be buffered when the call stops
+SERVER_INBOUND_BYTES = int(os.getenv('INBOUND_FRAME_MS', '400')) // 20 * 160
+# Dialed by every --priority-every-th call; listed in ADMISSION_PRIORITY_NUMBERS
+PRIORITY_NUMBER = "+15552222222"
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def rss_bytes():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * resource.getpagesize()
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+async def recv(conn):
+    # Pipe reads block, so they happen off the event loop
+    return await asyncio.get_running_loop().run_in_executor(None, conn.recv)
+
+
+def agent_process(conn, options):
+    from fake_agent import FakeAgent
+
+    async def run():
+        agent = FakeAgent(**options)
+        async with agent.serve() as server:
+            conn.send(server.sockets[0].getsockname()[1])
+            await recv(conn)
+            call_states = [s for s in agent.states if s.received]
+            conn.send({
+                "connections": agent.connections,
+                "open_connections": agent.open_connections,
+                "settings_received": agent.settings_received,
+                "audio_bytes_received": agent.audio_bytes_received,
+                # Greeting audio on warm connections no call picked up is
+                # not expected to reach anyone, so only count answered calls
+                "call_audio_bytes_sent": sum(s.audio_sent for s in call_states),
+                "function_requests": agent.function_requests,
+                "function_responses": agent.function_responses,
+            })
+
+    asyncio.run(run())
+
+
+def hub_process(conn, path):
+    sys.path.insert(0, REPO_ROOT)
+    from event_bus import EventHub
+
+    async def run():
+        hub = EventHub(path)
+        await hub.start()
+        conn.send("ready")
+        await recv(conn)
+        conn.send({"relayed": hub.relayed, "dropped": hub.dropped})
+        await hub.stop()
+
+    asyncio.run(run())
+
+
+def server_process(conn, port, env, quiet, lag_interval, reuse_port):
+    os.environ.update(env)
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+    if quiet:
+        sys.stdout = open(os.devnull, "w")
+
+    import main
+
+    async def sample_lag(samples):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(lag_interval)
+            samples.append(loop.time() - start - lag_interval)
+
+    async def run():
+        await main.serve("127.0.0.1", port, reuse_port=reuse_port)
+        conn.send("ready")
+        samples = []
+        sampler = asyncio.ensure_future(sample_lag(samples))
+
+        await recv(conn)  # calls are starting
+        samples.clear()
+        started, cpu_start, rss_start = time.monotonic(), cpu_seconds(), rss_bytes()
+
+        await recv(conn)  # calls are done
+        wall = time.monotonic() - started
+        sampler.cancel()
+        conn.send({
+            "loop_lag": samples,
+            "cpu_percent": (cpu_seconds() - cpu_start) / wall * 100 if wall else 0.0,
+            "rss_start": rss_start,
+            "rss_end": rss_bytes(),
+            "rss_peak": max(rss_bytes(), resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024),
+            "active_sessions": len(main.active_sessions),
+            "tasks": len(asyncio.all_tasks()),
+            "tool_calls": main.tool_executor.snapshot(),
+            "agent_pool": main.agent_pool.snapshot(),
+            "event_bus": main.event_bus.snapshot(),
+            "admission": main.admission.snapshot(),
+        })
+
+    asyncio.run(run())
+
+
+async def run_calls(url, indexes, step, duration, turn_bytes, priority_every):
+    calls = [TwilioCall(url, i, duration, turn_bytes,
+                        callee=PRIORITY_NUMBER if priority_every and i % priority_every == 0 else "+15551111111")
+             for i in indexes]
+
+    async def start_later(call):
+        await asyncio.sleep(call.index * step)
+        await call.run()
+
+    await asyncio.gather(*(start_later(call) for call in calls))
+    return calls
+
+
+def client_process(url, indexes, step, duration, turn_bytes, priority_every):
+    return asyncio.run(run_calls(url, indexes, step, duration, turn_bytes, priority_every))
+
+
+def merge_server_stats(workers):
+    """Combine per-worker stats into totals for the whole server."""
+    merged = {"loop_lag": [sample for stats in workers for sample in stats["loop_lag"]]}
+    for name in ("cpu_percent", "rss_start", "rss_end", "rss_peak", "active_sessions", "tasks"):
+        merged[name] = sum(stats[name] for stats in workers)
+    merged["agent_pool"] = {name: sum(stats["agent_pool"][name] for stats in workers)
+                            for name in ("hits", "misses")}
+    merged["calls_per_worker"] = [stats["agent_pool"]["hits"] + stats["agent_pool"]["misses"]
+                                  for stats in workers]
+    merged["admission"] = {name: sum(stats["admission"][name] for stats in workers)
+                           for name in ("max_calls", "limit")}
+    merged["admission"]["results"] = {
+        name: sum(stats["admission"]["results"][name] for stats in workers)
+        for name in workers[0]["admission"]["results"]}
+    return merged
+
+
+def report(args, calls, agent, server, elapsed):
+    failures = []
+
+    def check(name, value, limit):
+        if limit is not None and value > limit:
+            failures.append(f"{name} {value:.3f} > {limit}")
+
+    latencies = [lat * 1000 for call in calls for lat in call.latencies]
+    lag = [sample * 1000 for sample in server["loop_lag"]]
+    errors = [call.error for call in calls if call.error]
+    unexpected_ends = [call for call in calls if call.ended_by_server and not call.rejected]
+
+    bytes_sent = sum(call.bytes_heard for call in calls)
+    inbound_expected = sum(call.bytes_heard // SERVER_INBOUND_BYTES * SERVER_INBOUND_BYTES
+                           for call in calls)
+    inbound_lost = max(0, inbound_expected - agent["audio_bytes_received"])
+    outbound_sent = agent["call_audio_bytes_sent"]
+    outbound_lost = max(0, outbound_sent - sum(call.bytes_received for call in calls))
+    inbound_drop = inbound_lost / inbound_expected if inbound_expected else 0.0
+    outbound_drop = outbound_lost / outbound_sent if outbound_sent else 0.0
+
+    print(f"calls:            {args.calls} over {args.ramp:.0f}s ramp, {args.duration:.0f}s each "
+          f"({elapsed:.1f}s total), {len(errors)} failed")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    if args.max_calls:
+        held = [call for call in calls if call.held_at is not None]
+        waits = [(call.admitted_at - call.held_at) * 1000 for call in held if call.admitted_at]
+        results = server["admission"]["results"]
+        print(f"admission:        limit {server['admission']['limit']} of {server['admission']['max_calls']} "
+              f"({args.admission_policy}); {results}")
+        at_once = sum(call.held_at is None and not call.rejected for call in calls)
+        print(f"callers:          {at_once} answered at once, {len(held)} held ({len(waits)} admitted after "
+              f"p50 {percentile(waits, 50):.0f} ms / max {max(waits, default=0.0):.0f} ms), "
+              f"{sum(call.rejected for call in calls)} heard the rejection prompt")
+        if args.priority_every:
+            priority = [call for call in calls if call.callee == PRIORITY_NUMBER]
+            print(f"priority callers: {len(priority)}, {sum(call.held_at is not None for call in priority)} held, "
+                  f"{sum(call.rejected for call in priority)} rejected")
+    if unexpected_ends:
+        print(f"ended by server:  {len(unexpected_ends)} calls closed without a rejection prompt")
+    print(f"e2e latency:      p50 {percentile(latencies, 50):7.1f} ms | "
+          f"p95 {percentile(latencies, 95):7.1f} ms | p99 {percentile(latencies, 99):7.1f} ms | "
+          f"{len(latencies)} replies")
+    print(f"server loop lag:  p50 {percentile(lag, 50):7.1f} ms | p99 {percentile(lag, 99):7.1f} ms | "
+          f"max {max(lag, default=0.0):7.1f} ms")
+    if args.workers > 1:
+        print(f"workers:          {args.workers}, calls per worker {server['calls_per_worker']}")
+    print(f"server CPU:       {server['cpu_percent']:.0f}%")
+    print(f"server RSS:       {server['rss_start'] / 2**20:.1f} -> {server['rss_end'] / 2**20:.1f} MB "
+          f"(peak {server['rss_peak'] / 2**20:.1f} MB)")
+    print(f"caller audio:     {bytes_sent} bytes sent, {agent['audio_bytes_received']} reached agent "
+          f"({inbound_drop:.2%} lost)")
+    print(f"agent audio:      {outbound_sent} bytes sent, "
+          f"{sum(call.bytes_received for call in calls)} reached callers ({outbound_drop:.2%} lost)")
+    print(f"client pacing:    {sum(call.late_ticks for call in calls)} late ticks "
+          f"(non-zero means the load generator itself is saturated)")
+    print(f"twilio events:    {sum(call.clears for call in calls)} clears, "
+          f"{sum(len(call.marks) for call in calls)} marks")
+    print(f"function calls:   {agent['function_requests']} requested, "
+          f"{agent['function_responses']} answered")
+    print(f"agent pool:       {server['agent_pool']['hits']} hits, {server['agent_pool']['misses']} misses")
+    print(f"after hang-up:    {server['active_sessions']} active sessions, {server['tasks']} server tasks, "
+          f"{agent['open_connections']} open agent connections")
+
+    check("e2e p95 ms", percentile(latencies, 95), args.max_p95_ms)
+    check("loop lag p99 ms", percentile(lag, 99), args.max_loop_lag_ms)
+    check("drop rate", max(inbound_drop, outbound_drop), args.max_drop_rate)
+    if args.max_drop_rate is not None and errors:
+        failures.append(f"{len(errors)} calls failed")
+    if args.max_drop_rate is not None and unexpected_ends:
+        failures.append(f"{len(unexpected_ends)} calls ended by the server")
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def run(args):
+    ctx = multiprocessing.get_context("spawn")
+    tmpdir = tempfile.mkdtemp(prefix="load_test_")
+
+    agent_conn, agent_child = ctx.Pipe()
+    agent_options = {
+        "handshake_delay": args.handshake_delay,
+        "settings_delay": args.settings_delay,
+        "greeting_frames": 5,
+        "turn_bytes": args.turn_bytes,
+        "response_bytes": args.response_bytes,
+        "response_chunk": min(800, args.response_bytes),
+        "response_delay": args.response_delay,
+    }
+    agent = ctx.Process(target=agent_process, args=(agent_child, agent_options), daemon=True)
+    agent.start()
+    agent_port = agent_conn.recv()
+
+    _, stub_state, base_url = start_stub(latency=args.summary_latency)
+
+    port = free_port()
+    env = {
+        "AGENT_URL": f"ws://127.0.0.1:{agent_port}",
+        "DEEPGRAM_API_KEY": "stub",
+        "OPENAI_BASE_URL": base_url,
+        "OPENAI_API_KEY": "stub",
+        "BOOKING_STORE_FILE": os.path.join(tmpdir, "bookings.sqlite3"),
+        "CALL_LOG_FILE": os.path.join(tmpdir, "call_log.jsonl"),
+        "ADMISSION_MAX_CALLS": str(args.max_calls),
+    }
+    if args.max_calls:
+        env.update({
+            "ADMISSION_POLICY": args.admission_policy,
+            "ADMISSION_QUEUE_SIZE": str(args.queue_size),
+            "ADMISSION_QUEUE_TIMEOUT": str(args.queue_timeout),
+            "ADMISSION_PRIORITY_NUMBERS": PRIORITY_NUMBER,
+            "ADMISSION_HOLD_AUDIO": os.path.join(tmpdir, "hold.ulaw"),
+            "ADMISSION_REJECT_AUDIO": os.path.join(tmpdir, "reject.ulaw"),
+        })
+        # Marked prompts, so callers can tell hold and rejection from the agent
+        with open(env["ADMISSION_HOLD_AUDIO"], "wb") as f:
+            f.write(bytes([HOLD_BYTE]) * 16000)
+        with open(env["ADMISSION_REJECT_AUDIO"], "wb") as f:
+            f.write(bytes([REJECT_BYTE]) * 12000)
+    if args.record:
+        # Compare with a run without --record to see the recording overhead
+        env["RECORDING_DIR"] = os.path.join(tmpdir, "recordings")
+        os.makedirs(env["RECORDING_DIR"])
+    processes = [agent]
+    hub_conn = None
+    if args.workers > 1:
+        # Same layout as WORKERS=N: an event hub plus N workers on one port
+        env["EVENT_BUS_SOCKET"] = os.path.join(tmpdir, "bus.sock")
+        hub_conn, hub_child = ctx.Pipe()
+        hub = ctx.Process(target=hub_process, args=(hub_child, env["EVENT_BUS_SOCKET"]), daemon=True)
+        hub.start()
+        processes.append(hub)
+        hub_conn.recv()
+
+    server_conns = []
+    for worker_id in range(args.workers):
+        server_conn, server_child = ctx.Pipe()
+        worker_env = dict(env, WORKER_ID=str(worker_id)) if args.workers > 1 else env
+        server = ctx.Process(target=server_process, daemon=True,
+                             args=(server_child, port, worker_env, not args.verbose,
+                                   args.lag_interval, args.workers > 1))
+        server.start()
+        processes.append(server)
+        server_conns.append(server_conn)
+    try:
+        for server_conn in server_conns:
+            if not server_conn.poll(30):
+                raise RuntimeError("server did not start within 30s")
+            server_conn.recv()
+        # Let the agent pool warm up, as it would before real traffic
+        time.sleep(args.warmup)
+
+        for server_conn in server_conns:
+            server_conn.send("begin")
+        started = time.monotonic()
+        # Callers are spread over several processes so the load generator
+        # does not fall behind real time before the server does
+        url = f"ws://127.0.0.1:{port}/twilio"
+        step = args.ramp / args.calls if args.calls else 0
+        with ctx.Pool(args.clients) as pool:
+            shares = pool.starmap(client_process, [
+                (url, range(i, args.calls, args.clients), step, args.duration, args.turn_bytes,
+                 args.priority_every)
+                for i in range(args.clients)
+            ])
+        calls = [call for share in shares for call in share]
+        elapsed = time.monotonic() - started
+        time.sleep(args.settle)
+
+        for server_conn in server_conns:
+            server_conn.send("stop")
+        server_stats = merge_server_stats([server_conn.recv() for server_conn in server_conns])
+        agent_conn.send("stop")
+        agent_stats = agent_conn.recv()
+        if hub_conn is not None:
+            hub_conn.send("stop")
+            hub_stats = hub_conn.recv()
+            print(f"event hub:        {hub_stats['relayed']} messages relayed, "
+                  f"{hub_stats['dropped']} dropped")
+    finally:
+        for process in processes:
+            process.terminate()
+
+    print(f"summary stub:     {stub_state.requests} requests")
+    if args.record:
+        names = os.listdir(env["RECORDING_DIR"])
+        size = sum(os.path.getsize(os.path.join(env["RECORDING_DIR"], name)) for name in names)
+        print(f"recordings:       {len(names)} files, {size / 2**20:.1f} MB in {env['RECORDING_DIR']}")
+    return report(args, calls, agent_stats, server_stats, elapsed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=50, help="concurrent calls to reach")
+    parser.add_argument("--ramp", type=float, default=10.0, help="seconds to start all calls")
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds of caller audio per call")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="server processes sharing the port through SO_REUSEPORT")
+    parser.add_argument("--clients", type=int, default=max(1, min(4, (os.cpu_count() or 1) // 2)),
+                        help="processes generating caller traffic")
+    parser.add_argument("--turn-bytes", type=int, default=8000,
+                        help="caller audio per utterance (8000 bytes = 1s)")
+    parser.add_argument("--response-bytes", type=int, default=4000,
+                        help="agent reply audio per utterance; replies longer than an utterance "
+                             "are cut short by the next barge-in")
+    parser.add_argument("--response-delay", type=float, default=0.05,
+                        help="fake agent think time before replying")
+    parser.add_argument("--handshake-delay", type=float, default=0.15)
+    parser.add_argument("--settings-delay", type=float, default=0.1)
+    parser.add_argument("--summary-latency", type=float, default=0.2)
+    parser.add_argument("--warmup", type=float, default=2.0)
+    parser.add_argument("--settle", type=float, default=1.0,
+                        help="seconds to wait after the last call before collecting stats")
+    parser.add_argument("--lag-interval", type=float, default=0.01)
+    parser.add_argument("--record", action="store_true", help="record every call (RECORDING_DIR)")
+    parser.add_argument("--max-calls", type=int, default=0,
+                        help="server admission limit per worker (ADMISSION_MAX_CALLS; 0: none)")
+    parser.add_argument("--admission-policy", default="queue", choices=("queue", "reject", "priority"))
+    parser.add_argument("--queue-size", type=int, default=10, help="calls held at once per worker")
+    parser.add_argument("--queue-timeout", type=float, default=20.0, help="seconds a call may be held")
+    parser.add_argument("--priority-every", type=int, default=0,
+                        help="every Nth call dials the priority number")
+    parser.add_argument("--verbose", action="store_true", help="show the server's output")
+    parser.add_argument("--max-p95-ms", type=float, help="fail if e2e p95 latency exceeds this")
+    parser.add_argument("--max-loop-lag-ms", type=float, help="fail if p99 loop lag exceeds this")
+    parser.add_argument("--max-drop-rate", type=float, help="fail if lost audio exceeds this fraction")
+    sys.exit(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+"""Soak test: thousands of calls, then check nothing they used is still open.
+
+Usage:
+    python benchmarks/soak_calls.py [--calls 2000] [--concurrency 50] [--idle-timeout 1]
+                                    [--max-seconds 3] [--hangup-every 5]
+
+Runs the server in this process against the fake agent (in its own
+process) and the chat-completions stub, and plays calls that end every way
+a call can end:
+  - normal: caller audio, then a Twilio stop event
+  - drop:   the caller's socket is aborted mid-call, without a stop
+  - silent: start, then nothing; the server's idle timeout ends it
+  - long:   audio past the maximum call duration; the server ends it
+and every `--hangup-every`th answered call is closed by the agent.
+
+A warm-up round opens lazily opened files and starts worker threads. After
+the soak the script compares open file descriptors, asyncio tasks and the
+server's resource registry with that baseline. The warm agent pool is
+closed before both measurements. It exits with status 1 if anything
+leaked.
+"""
+import argparse
+import asyncio
+import base64
+import json
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+REPO_ROOT = os.path.dirname(BENCH_DIR)
+sys.path.insert(0, BENCH_DIR)
+
+import websockets  # noqa: E402
+
+from fake_twilio import speech_frame  # noqa: E402
+from load_test import free_port, recv  # noqa: E402
+from stub_chat_completions import start_stub  # noqa: E402
+
+KINDS = ("normal", "normal", "drop", "silent", "long")
+# Caller audio is sent in 100 ms media events to keep the load generator light
+CHUNK_SECONDS = 0.1
+PAYLOAD = base64.b64encode(b"".join(speech_frame(i) for i in range(5))).decode("ascii")
+
+
+def agent_process(conn, hangup_every):
+    from fake_agent import FakeAgent
+
+    async def run():
+        agent = FakeAgent(greeting_frames=5, response_bytes=4000, response_chunk=800,
+                          function_every=1, hangup_every=hangup_every)
+        async with agent.serve() as server:
+            conn.send(server.sockets[0].getsockname()[1])
+            await recv(conn)
+            conn.send({"connections": agent.connections, "open_connections": agent.open_connections,
+                       "hangups": agent.hangups})
+
+    asyncio.run(run())
+
+
+def open_fds():
+    """Open descriptors of this process by type (socket, pipe, file, ...)."""
+    kinds = {}
+    for fd in os.listdir("/proc/self/fd"):
+        try:
+            target = os.readlink(f"/proc/self/fd/{fd}")
+        except OSError:
+            continue
+        kind = target.split(":", 1)[0] if ":" in target else "file"
+        kinds[kind] = kinds.get(kind, 0) + 1
+    return kinds
+
+
+async def caller(url, index, kind, args):
+    stream_sid = f"MZ{index:032d}"
+    ws = await websockets.connect(url, max_queue=None, close_timeout=1)
+    # Done when the server closes the stream
+    reader = asyncio.ensure_future(ws.wait_closed())
+    try:
+        await ws.send(json.dumps({"event": "connected", "protocol": "Call", "version": "1.0.0"}))
+        await ws.send(json.dumps({"event": "start", "streamSid": stream_sid, "start": {
+            "streamSid": stream_sid, "callSid": f"CA{index:032d}",
+            "customParameters": {"from": "+15550000000", "to": "+15551111111"}}}))
+        if kind != "silent":
+            seconds = {"normal": args.call_seconds, "drop": args.call_seconds / 2,
+                       "long": args.max_seconds + 2}[kind]
+            for i in range(int(seconds / CHUNK_SECONDS)):
+                if reader.done():
+                    # Ended by the server: agent hang-up or maximum duration
+                    break
+                try:
+                    await ws.send('{"event":"media","streamSid":"%s","media":{"track":"inbound",'
+                                  '"chunk":"%d","payload":"%s"}}' % (stream_sid, i + 1, PAYLOAD))
+                except websockets.ConnectionClosed:
+                    break
+                await asyncio.sleep(CHUNK_SECONDS)
+            if kind == "drop":
+                ws.transport.abort()
+                return
+            if kind == "normal" and not reader.done():
+                try:
+                    await ws.send(json.dumps({"event": "stop", "streamSid": stream_sid}))
+                except websockets.ConnectionClosed:
+                    # The agent hung up first
+                    pass
+        await asyncio.wait_for(reader, args.idle_timeout + 10)
+    finally:
+        reader.cancel()
+        if kind != "drop":
+            await ws.close()
+
+
+async def run_calls(url, indexes, args):
+    limiter = asyncio.Semaphore(args.concurrency)
+    errors = []
+
+    async def one(index):
+        async with limiter:
+            try:
+                await caller(url, index, KINDS[index % len(KINDS)], args)
+            except Exception as e:
+                errors.append(repr(e))
+
+    await asyncio.gather(*(one(i) for i in indexes))
+    return errors
+
+
+async def settle(main, timeout):
+    """Wait for ended calls to be torn down and their summaries published."""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        busy = (main.active_sessions or main.summary_worker.queue_depth()
+                or any(count for kind, count in main.resources.open.items() if kind != "agent_socket"))
+        if not busy:
+            break
+        await asyncio.sleep(0.1)
+    # Sockets closed by the peer are released on the next loop iterations
+    await asyncio.sleep(1.0)
+
+
+async def measure(main):
+    # Warm agent connections come and go with the pool's size; close them
+    # so only what calls left behind is counted
+    await main.agent_pool.stop()
+    await asyncio.sleep(0.5)
+    return {"fds": open_fds(), "tasks": len(asyncio.all_tasks()),
+            "resources": {kind: count for kind, count in main.resources.open.items()},
+            "admission": {"active": main.admission.active, "queued": main.admission.queued()}}
+
+
+async def soak(args, agent_port, stub_url, tmpdir):
+    os.environ.update({
+        "AGENT_URL": f"ws://127.0.0.1:{agent_port}",
+        "DEEPGRAM_API_KEY": "stub",
+        "OPENAI_BASE_URL": stub_url,
+        "OPENAI_API_KEY": "stub",
+        "BOOKING_STORE_FILE": os.path.join(tmpdir, "bookings.sqlite3"),
+        "CALL_LOG_FILE": os.path.join(tmpdir, "call_log.jsonl"),
+        "CALL_HISTORY_INDEX": os.path.join(tmpdir, "call_log.index.sqlite3"),
+        "CALL_IDLE_TIMEOUT": str(args.idle_timeout),
+        "CALL_MAX_SECONDS": str(args.max_seconds),
+        "LOG_FILE": os.path.join(tmpdir, "server.log"),
+    })
+    os.chdir(REPO_ROOT)
+    sys.path.insert(0, REPO_ROOT)
+    import main
+
+    port = free_port()
+    server = await main.serve("127.0.0.1", port)
+    url = f"ws://127.0.0.1:{port}/twilio"
+    await asyncio.sleep(1.0)
+
+    warmup = max(args.concurrency, len(KINDS))
+    await run_calls(url, range(warmup), args)
+    await settle(main, 30)
+    before = await measure(main)
+    ended_before = dict(main.calls_ended_total.values)
+    main.agent_pool.start()
+    await asyncio.sleep(1.0)
+
+    started = time.monotonic()
+    errors = await run_calls(url, range(warmup, warmup + args.calls), args)
+    elapsed = time.monotonic() - started
+    await settle(main, 30)
+    after = await measure(main)
+
+    ended = {labels[0]: count - ended_before.get(labels, 0)
+             for labels, count in main.calls_ended_total.values.items()}
+    stuck = sum(main.call_tasks_stuck_total.values.values())
+    server.close()
+    await server.wait_closed()
+    return before, after, ended, stuck, errors, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--call-seconds", type=float, default=1.5, help="caller audio per normal call")
+    parser.add_argument("--idle-timeout", type=float, default=1.0, help="server CALL_IDLE_TIMEOUT")
+    parser.add_argument("--max-seconds", type=float, default=3.0, help="server CALL_MAX_SECONDS")
+    parser.add_argument("--hangup-every", type=int, default=5, help="agent closes every Nth answered call")
+    args = parser.parse_args()
+
+    resource.setrlimit(resource.RLIMIT_NOFILE, (resource.getrlimit(resource.RLIMIT_NOFILE)[1],) * 2)
+    ctx = multiprocessing.get_context("spawn")
+    agent_conn, agent_child = ctx.Pipe()
+    agent = ctx.Process(target=agent_process, args=(agent_child, args.hangup_every), daemon=True)
+    agent.start()
+    agent_port = agent_conn.recv()
+    _, stub_state, stub_url = start_stub(latency=0.05)
+    tmpdir = tempfile.mkdtemp(prefix="soak_calls_")
+    try:
+        before, after, ended, stuck, errors, elapsed = asyncio.run(
+            soak(args, agent_port, stub_url, tmpdir))
+        agent_conn.send("stop")
+        agent_stats = agent_conn.recv()
+    finally:
+        agent.terminate()
+
+    print(f"calls:           {args.calls} in {elapsed:.1f}s, {len(errors)} client errors")
+    for error in sorted(set(errors))[:5]:
+        print(f"  error: {error}")
+    print(f"ended by:        {dict(sorted(ended.items()))}")
+    print(f"agent:           {agent_stats['connections']} connections, {agent_stats['hangups']} hung up by the agent")
+    print(f"summaries:       {stub_state.requests} stub requests")
+    print(f"before:          {before}")
+    print(f"after:           {after}")
+
+    leaks = []
+    fd_growth = sum(after["fds"].values()) - sum(before["fds"].values())
+    if fd_growth > 0:
+        leaks.append(f"{fd_growth} file descriptors")
+    if after["tasks"] > before["tasks"]:
+        leaks.append(f"{after['tasks'] - before['tasks']} asyncio tasks")
+    for kind, count in after["resources"].items():
+        if count:
+            leaks.append(f"{count} open {kind}")
+    for kind, count in after["admission"].items():
+        if count:
+            leaks.append(f"{count} calls still {kind} in admission control")
+    if agent_stats["open_connections"]:
+        leaks.append(f"{agent_stats['open_connections']} agent connections still open at the agent")
+    if stuck:
+        leaks.append(f"{stuck} call tasks stuck after cancellation")
+    for leak in leaks:
+        print(f"LEAK: {leak}")
+    if not leaks:
+        print("no leaks")
+    sys.exit(1 if leaks else 0)
+
+
+if __name__ == "__main__":
+    main()
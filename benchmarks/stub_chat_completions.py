@@ -0,0 +1,117 @@
+"""Local stand-in for the OpenAI chat-completions endpoint.
+
+Usage:
+    python benchmarks/stub_chat_completions.py [--port 8089] [--latency 0.5] [--token-latency 0] [--fail-rate 0.1]
+    OPENAI_BASE_URL=http://127.0.0.1:8089/v1 OPENAI_API_KEY=stub python main.py
+
+Replies to POST /v1/chat/completions with a JSON summary after a configurable
+delay (plus `--token-latency` seconds per 1000 prompt tokens, so longer
+prompts take longer), failing a configurable fraction of requests with HTTP
+500 so retries and deadlines in the summary worker can be exercised without a
+live service.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubState:
+    def __init__(self, latency=0.2, fail_rate=0.0, token_latency=0.0):
+        self.latency = latency
+        self.fail_rate = fail_rate
+        self.token_latency = token_latency
+        self.requests = 0
+        self.failures = 0
+        self.prompt_tokens = 0
+        self.lock = threading.Lock()
+
+
+def make_handler(state):
+    class ChatCompletionsHandler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, format, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            body = json.loads(self.rfile.read(length) or b"{}")
+            prompt_tokens = sum(len(m.get("content", "")) for m in body.get("messages", [])) // 4
+            with state.lock:
+                state.requests += 1
+                state.prompt_tokens += prompt_tokens
+                fail = random.random() < state.fail_rate
+                if fail:
+                    state.failures += 1
+            time.sleep(state.latency + state.token_latency * prompt_tokens / 1000)
+
+            if not self.path.rstrip("/").endswith("/chat/completions"):
+                self._reply(404, {"error": {"message": "not found"}})
+                return
+            if fail:
+                self._reply(500, {"error": {"message": "stub failure", "type": "server_error"}})
+                return
+
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            content = json.dumps({
+                "cust_name": "Stub Customer",
+                "summary": f"Stub summary of {prompt.count('USER:')} user turns."
+            })
+            self._reply(200, {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": content},
+                    "finish_reason": "stop"
+                }],
+                "usage": {"prompt_tokens": prompt_tokens, "completion_tokens": 20,
+                          "total_tokens": prompt_tokens + 20}
+            })
+
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+    return ChatCompletionsHandler
+
+
+def start_stub(host="127.0.0.1", port=0, latency=0.2, fail_rate=0.0, token_latency=0.0):
+    """Start the stub on a background thread; returns (server, state, base_url)."""
+    state = StubState(latency, fail_rate, token_latency)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, state, f"http://{host}:{server.server_address[1]}/v1"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8089)
+    parser.add_argument("--latency", type=float, default=0.5, help="seconds per reply")
+    parser.add_argument("--token-latency", type=float, default=0.0,
+                        help="extra seconds per 1000 prompt tokens")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of HTTP 500 replies")
+    args = parser.parse_args()
+
+    server, _, base_url = start_stub(args.host, args.port, args.latency, args.fail_rate,
+                                     args.token_latency)
+    print(f"Chat-completions stub listening on {base_url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
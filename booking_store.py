@@ -0,0 +1,268 @@
+import json
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from datetime import datetime
+
+from slot_index import normalize_treatment
+
+# SQLite file backing the booking store (WAL mode, one connection per thread)
+BOOKING_STORE_FILE = os.getenv('BOOKING_STORE_FILE', 'booking_db.sqlite3')
+
+BOOKING_FIELDS = (
+    "name",
+    "age",
+    "symptoms",
+    "treatment",
+    "appointment_date",
+    "appointment_time",
+    "contact_email",
+    "contact_phone",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS bookings (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    age INTEGER,
+    symptoms TEXT,
+    treatment TEXT,
+    treatment_key TEXT,
+    appointment_date TEXT NOT NULL,
+    appointment_time TEXT NOT NULL,
+    slot_time TEXT NOT NULL,
+    contact_email TEXT,
+    contact_phone TEXT,
+    created_at TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_bookings_slot ON bookings (appointment_date, slot_time);
+CREATE INDEX IF NOT EXISTS idx_bookings_email ON bookings (contact_email);
+CREATE INDEX IF NOT EXISTS idx_bookings_phone ON bookings (contact_phone);
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT
+);
+"""
+
+
+class SlotUnavailableError(ValueError):
+    """The requested time slot is already fully booked."""
+
+
+def slot_time(appointment_time):
+    """Normalize 'HH:MM AM/PM' to a sortable 24h 'HH:MM' slot key."""
+    return datetime.strptime(appointment_time.strip(), '%I:%M %p').strftime('%H:%M')
+
+
+def _treatment_key(treatment):
+    """The treatment as slot_index compares it, None when there is none."""
+    return None if treatment is None else normalize_treatment(treatment)
+
+
+def _row_to_booking(row):
+    booking = {field: row[field] for field in BOOKING_FIELDS}
+    if booking["contact_phone"] is None:
+        del booking["contact_phone"]
+    return booking
+
+
+class BookingStore:
+    """Indexed, append-only booking storage on top of SQLite in WAL mode.
+
+    Every write is a single-row INSERT inside its own transaction, so the cost
+    of a booking does not depend on how many bookings already exist, and
+    concurrent writers (threads or processes) cannot lose each other's rows.
+    """
+
+    def __init__(self, path=BOOKING_STORE_FILE):
+        self.path = path
+        self._local = threading.local()
+        self._write_lock = threading.Lock()
+        self._connection().executescript(SCHEMA)
+        self._migrate()
+
+    def _migrate(self):
+        """Add and fill treatment_key in stores created before it existed."""
+        conn = self._connection()
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(bookings)")}
+        if "treatment_key" in columns:
+            return
+        with self._transaction() as conn:
+            columns = {row["name"] for row in conn.execute("PRAGMA table_info(bookings)")}
+            if "treatment_key" in columns:
+                return
+            conn.execute("ALTER TABLE bookings ADD COLUMN treatment_key TEXT")
+            rows = conn.execute("SELECT id, treatment FROM bookings").fetchall()
+            conn.executemany("UPDATE bookings SET treatment_key = ? WHERE id = ?",
+                             [(_treatment_key(row["treatment"]), row["id"]) for row in rows])
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        """BEGIN IMMEDIATE ... COMMIT on this thread's connection."""
+        conn = self._connection()
+        with self._write_lock:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.execute("ROLLBACK")
+                raise
+            conn.execute("COMMIT")
+
+    def add(self, booking, slot=None):
+        """Append one booking atomically and return its row id.
+
+        `slot` is an optional (start, end, capacity) tuple of 24h 'HH:MM'
+        times: the insert is rejected with SlotUnavailableError when the
+        same treatment already has `capacity` bookings on that date with a
+        slot time in [start, end). Treatments are compared the way the slot
+        index compares them (normalize_treatment), so 'PRP' and ' prp '
+        are the same treatment. The check and the insert share one
+        write transaction, so concurrent writers cannot both take the last
+        place.
+        """
+        values = [booking.get(field) for field in BOOKING_FIELDS]
+        key = _treatment_key(booking.get("treatment"))
+        with self._transaction() as conn:
+            if slot is not None:
+                start, end, capacity = slot
+                taken = conn.execute(
+                    "SELECT COUNT(*) FROM bookings WHERE appointment_date = ?"
+                    " AND slot_time >= ? AND slot_time < ? AND treatment_key IS ?",
+                    (booking["appointment_date"], start, end, key)
+                ).fetchone()[0]
+                if taken >= capacity:
+                    raise SlotUnavailableError(
+                        f"{booking.get('treatment')} is already booked on"
+                        f" {booking['appointment_date']} at {booking['appointment_time']}."
+                    )
+            cursor = conn.execute(
+                "INSERT INTO bookings (name, age, symptoms, treatment, appointment_date,"
+                " appointment_time, contact_email, contact_phone, treatment_key, slot_time,"
+                " created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                values + [key, slot_time(booking["appointment_time"]), datetime.now().isoformat()]
+            )
+            return cursor.lastrowid
+
+    def all(self):
+        """Return every booking in insertion order."""
+        rows = self._connection().execute("SELECT * FROM bookings ORDER BY id").fetchall()
+        return [_row_to_booking(row) for row in rows]
+
+    def count(self):
+        return self._connection().execute("SELECT COUNT(*) FROM bookings").fetchone()[0]
+
+    def slots_since(self, last_id=0):
+        """(id, treatment, appointment_date, slot_time) of rows after `last_id`."""
+        cursor = self._connection().cursor()
+        # Plain tuples: this is read in bulk when the slot index is built
+        cursor.row_factory = None
+        return cursor.execute(
+            "SELECT id, treatment, appointment_date, slot_time FROM bookings"
+            " WHERE id > ? ORDER BY id", (last_id,)
+        ).fetchall()
+
+    def generation(self):
+        """Bumped whenever rows are deleted, so readers know to rebuild."""
+        row = self._connection().execute(
+            "SELECT value FROM meta WHERE key = 'generation'"
+        ).fetchone()
+        return 0 if row is None else int(row[0])
+
+    def by_slot(self, appointment_date, appointment_time=None):
+        """Bookings on a date, optionally narrowed to one time slot."""
+        conn = self._connection()
+        if appointment_time is None:
+            rows = conn.execute(
+                "SELECT * FROM bookings WHERE appointment_date = ? ORDER BY slot_time",
+                (appointment_date,)
+            ).fetchall()
+        else:
+            rows = conn.execute(
+                "SELECT * FROM bookings WHERE appointment_date = ? AND slot_time = ?",
+                (appointment_date, slot_time(appointment_time))
+            ).fetchall()
+        return [_row_to_booking(row) for row in rows]
+
+    def by_contact(self, email=None, phone=None):
+        """Bookings made with a given email address and/or phone number."""
+        if email is None and phone is None:
+            return []
+        clauses, params = [], []
+        if email is not None:
+            clauses.append("contact_email = ?")
+            params.append(email)
+        if phone is not None:
+            clauses.append("contact_phone = ?")
+            params.append(phone)
+        rows = self._connection().execute(
+            f"SELECT * FROM bookings WHERE {' OR '.join(clauses)} ORDER BY id", params
+        ).fetchall()
+        return [_row_to_booking(row) for row in rows]
+
+    def replace_all(self, bookings):
+        """Replace the full contents of the store in one transaction."""
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM bookings")
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('generation', '1')"
+                " ON CONFLICT (key) DO UPDATE SET value = CAST(value AS INTEGER) + 1"
+            )
+            self._insert_many(conn, bookings)
+
+    def import_json(self, json_path):
+        """Import bookings from a legacy booking_db.json file.
+
+        The import runs once per store; the marker in the meta table makes
+        repeated calls (e.g. on every startup) a no-op.
+        """
+        with self._transaction() as conn:
+            done = conn.execute(
+                "SELECT value FROM meta WHERE key = 'json_import'"
+            ).fetchone()
+            if done is not None:
+                return 0
+            try:
+                with open(json_path, 'r') as file:
+                    bookings = json.load(file).get("bookings", [])
+            except FileNotFoundError:
+                bookings = []
+            except json.JSONDecodeError:
+                bookings = []
+            self._insert_many(conn, bookings)
+            conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('json_import', ?)",
+                (os.path.abspath(json_path),)
+            )
+            return len(bookings)
+
+    def _insert_many(self, conn, bookings):
+        now = datetime.now().isoformat()
+        conn.executemany(
+            "INSERT INTO bookings (name, age, symptoms, treatment, appointment_date,"
+            " appointment_time, contact_email, contact_phone, treatment_key, slot_time,"
+            " created_at) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            [
+                [booking.get(field) for field in BOOKING_FIELDS]
+                + [_treatment_key(booking.get("treatment")),
+                   slot_time(booking["appointment_time"]), now]
+                for booking in bookings
+            ]
+        )
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
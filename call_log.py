@@ -0,0 +1,197 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from json_codec import dumpb, loads
+
+# Append-only log of finished calls, one JSON record per line
+CALL_LOG_FILE = os.getenv('CALL_LOG_FILE', 'call_log.jsonl')
+# SQLite index over the call log for paginated history queries
+CALL_HISTORY_INDEX = os.getenv('CALL_HISTORY_INDEX',
+                               os.path.splitext(CALL_LOG_FILE)[0] + '.index.sqlite3')
+# Largest history page a client can ask for
+CALL_HISTORY_MAX_PAGE = int(os.getenv('CALL_HISTORY_MAX_PAGE', '200'))
+
+INDEX_SCHEMA = """
+CREATE TABLE IF NOT EXISTS calls (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    call_sid TEXT NOT NULL UNIQUE,
+    caller TEXT,
+    callee TEXT,
+    status TEXT,
+    started_at REAL,
+    ended_at REAL,
+    turns INTEGER,
+    name TEXT,
+    summary TEXT,
+    log_offset INTEGER,
+    log_length INTEGER
+);
+CREATE INDEX IF NOT EXISTS calls_log_offset ON calls (log_offset);
+"""
+
+
+class CallHistoryIndex:
+    """Row per logged call with where its record sits in the call log.
+
+    Pages are read newest first by keyset on the log offset, so any page
+    costs the same however long the history is, and full records (with
+    transcripts) are read from the log only when asked for. Row ids are not
+    used for ordering: a summary can be indexed before its call's record.
+    """
+
+    def __init__(self, path=CALL_HISTORY_INDEX):
+        self.path = path
+        self._local = threading.local()
+        self._connection().executescript(INDEX_SCHEMA)
+
+    def _connection(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def add(self, record, offset, length):
+        # The summary may have been indexed first; keep it
+        self._connection().execute(
+            "INSERT INTO calls (call_sid, caller, callee, status, started_at, ended_at, turns,"
+            " log_offset, log_length) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)"
+            " ON CONFLICT (call_sid) DO UPDATE SET caller = excluded.caller,"
+            " callee = excluded.callee, status = excluded.status, started_at = excluded.started_at,"
+            " ended_at = excluded.ended_at, turns = excluded.turns,"
+            " log_offset = excluded.log_offset, log_length = excluded.log_length",
+            (record.get("CallSid"), record.get("From"), record.get("To"), record.get("status"),
+             record.get("started_at"), record.get("ended_at"), len(record.get("turns") or ()),
+             offset, length)
+        )
+
+    def set_summary(self, call_sid, name, summary):
+        self._connection().execute(
+            "INSERT INTO calls (call_sid, name, summary) VALUES (?, ?, ?)"
+            " ON CONFLICT (call_sid) DO UPDATE SET name = excluded.name, summary = excluded.summary",
+            (call_sid, name, summary)
+        )
+
+    def count(self):
+        return self._connection().execute(
+            "SELECT COUNT(*) FROM calls WHERE log_offset IS NOT NULL").fetchone()[0]
+
+    def page(self, cursor=None, limit=50):
+        """Calls older than `cursor`, newest first. Returns (calls, next cursor or None)."""
+        limit = max(1, min(int(limit), CALL_HISTORY_MAX_PAGE))
+        before = int(cursor) if cursor else 1 << 62
+        rows = self._connection().execute(
+            "SELECT call_sid, caller, callee, status, started_at, ended_at, turns, name, summary,"
+            " log_offset FROM calls WHERE log_offset < ? ORDER BY log_offset DESC LIMIT ?",
+            (before, limit + 1)
+        ).fetchall()
+        more = len(rows) > limit
+        rows = rows[:limit]
+        calls = [{
+            "CallSid": row["call_sid"],
+            "From": row["caller"],
+            "To": row["callee"],
+            "status": row["status"],
+            "started_at": row["started_at"],
+            "ended_at": row["ended_at"],
+            "turns": row["turns"],
+            "name": row["name"],
+            "summary": row["summary"],
+        } for row in rows]
+        return calls, (str(rows[-1]["log_offset"]) if more else None)
+
+    def locate(self, call_sid):
+        row = self._connection().execute(
+            "SELECT log_offset, log_length FROM calls WHERE call_sid = ?", (call_sid,)
+        ).fetchone()
+        if row is None or row["log_offset"] is None:
+            return None
+        return row["log_offset"], row["log_length"]
+
+    def rebuild(self, log_path):
+        """Index a call log written before the index existed."""
+        conn = self._connection()
+        offset = 0
+        conn.execute("BEGIN")
+        try:
+            with open(log_path, "rb") as f:
+                for line in f:
+                    try:
+                        record = loads(line)
+                    except ValueError:
+                        record = None
+                    if isinstance(record, dict) and record.get("CallSid"):
+                        self.add(record, offset, len(line))
+                    offset += len(line)
+        except FileNotFoundError:
+            pass
+        conn.execute("COMMIT")
+
+
+class CallLog:
+    """Persists finished call records without blocking the event loop.
+
+    Writes go through a single background thread so records are appended in
+    order and the file is never written concurrently. With an index, every
+    record's byte range is indexed as it is written, and history queries
+    read only the page or the record asked for.
+    """
+
+    def __init__(self, path=CALL_LOG_FILE, index=None):
+        self.path = path
+        self.index = index
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="call-log")
+        if index is not None:
+            self._writer.submit(self._catch_up)
+
+    def _catch_up(self):
+        if self.index.count() == 0 and os.path.exists(self.path) and os.path.getsize(self.path):
+            self.index.rebuild(self.path)
+
+    def _append(self, record):
+        data = dumpb(record) + b"\n"
+        # O_APPEND: other workers may append to the same log; after the write
+        # the descriptor's offset is the end of our own line
+        fd = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            os.write(fd, data)
+            end = os.lseek(fd, 0, os.SEEK_CUR)
+        finally:
+            os.close(fd)
+        if self.index is not None:
+            self.index.add(record, end - len(data), len(data))
+
+    async def append(self, record):
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self._writer, self._append, record)
+
+    async def set_summary(self, call_sid, name, summary):
+        if self.index is not None:
+            loop = asyncio.get_running_loop()
+            await loop.run_in_executor(self._writer, self.index.set_summary, call_sid, name, summary)
+
+    async def page(self, cursor=None, limit=50):
+        """One page of call history, newest first: (calls, next cursor)."""
+        return await asyncio.to_thread(self.index.page, cursor, limit)
+
+    def _read(self, call_sid):
+        location = self.index.locate(call_sid)
+        if location is None:
+            return None
+        offset, length = location
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            return loads(f.read(length))
+
+    async def read(self, call_sid):
+        """The full logged record of one call, or None."""
+        return await asyncio.to_thread(self._read, call_sid)
+
+    def close(self):
+        self._writer.shutdown(wait=True)
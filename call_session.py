@@ -0,0 +1,117 @@
+import asyncio
+import time
+from structured_log import log
+from transcript import Transcript
+
+
+class CallSession:
+    """State of one Twilio call, owned by its twilio_handler.
+
+    Created on the Twilio start event and torn down exactly once when the call
+    ends; after teardown it is handed to the post-call consumers and then
+    released.
+    """
+
+    __slots__ = ("call_sid", "stream_sid", "caller", "callee", "started_at",
+                 "started_monotonic", "ended_at", "status", "end_reason", "transcript", "trace",
+                 "summarizer")
+
+    def __init__(self, call_sid, stream_sid, caller="Customer", callee="AI Agent", trace=None):
+        self.call_sid = call_sid
+        self.stream_sid = stream_sid
+        self.caller = caller
+        self.callee = callee
+        self.started_at = time.time()
+        # For latency measurements; unaffected by wall-clock adjustments
+        self.started_monotonic = time.monotonic()
+        self.ended_at = None
+        self.status = "in_progress"
+        # Why the call ended: "stop", "caller_hangup", "agent_hangup", "idle", ...
+        self.end_reason = None
+        self.transcript = Transcript(call_sid)
+        # CallTrace when this call was sampled for tracing, else None
+        self.trace = trace
+        # RollingSummarizer over the transcript, when the call is summarized
+        self.summarizer = None
+
+    @property
+    def ended(self):
+        return self.ended_at is not None
+
+    def end(self, status="completed", reason=None):
+        """Mark the call finished. Returns False if it had already ended."""
+        if self.ended_at is not None:
+            return False
+        self.ended_at = time.time()
+        self.status = status
+        self.end_reason = reason
+        if self.trace is not None:
+            self.trace.event("end", status=status, reason=reason)
+        return True
+
+    def conversation(self):
+        return self.transcript.conversation()
+
+    def to_record(self):
+        """Plain-dict form of the session for persistence."""
+        return {
+            "CallSid": self.call_sid,
+            "From": self.caller,
+            "To": self.callee,
+            "status": self.status,
+            "end_reason": self.end_reason,
+            "started_at": self.started_at,
+            "ended_at": self.ended_at,
+            "turns": list(self.transcript.turns),
+        }
+
+
+class SessionHandoff:
+    """Queue that passes finished sessions to post-call consumers.
+
+    Consumers are called in order for every session; coroutine functions are
+    awaited. Teardown only enqueues, so the call's own tasks never wait on
+    summarization or disk writes.
+    """
+
+    def __init__(self, consumers=()):
+        self.consumers = list(consumers)
+        self._queue = asyncio.Queue()
+        self._task = None
+        self.handled = 0
+
+    def add_consumer(self, consumer):
+        self.consumers.append(consumer)
+
+    def put(self, session):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+        self._queue.put_nowait(session)
+
+    async def join(self):
+        await self._queue.join()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    async def _run(self):
+        while True:
+            session = await self._queue.get()
+            try:
+                for consumer in self.consumers:
+                    try:
+                        result = consumer(session)
+                        if asyncio.iscoroutine(result):
+                            await result
+                    except Exception as e:
+                        log.error("session_handoff_error", session.call_sid, error=str(e))
+                self.handled += 1
+            finally:
+                del session
+                self._queue.task_done()
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
@@ -0,0 +1,164 @@
+import asyncio
+import os
+import time
+from contextlib import contextmanager
+
+from structured_log import log
+
+# Seconds without a message from Twilio before a call is ended (0: never).
+# Twilio streams a media event every 20 ms, silence included, so a quiet
+# stream means a stalled or half-open connection.
+CALL_IDLE_TIMEOUT = float(os.getenv('CALL_IDLE_TIMEOUT', '30'))
+# Longest a call may last, in seconds (0: no limit)
+CALL_MAX_SECONDS = float(os.getenv('CALL_MAX_SECONDS', '3600'))
+# Seconds a call's remaining tasks get to finish once they are cancelled
+CALL_SHUTDOWN_TIMEOUT = float(os.getenv('CALL_SHUTDOWN_TIMEOUT', '5'))
+
+# Why a call ended, as returned by CallSupervisor.run()
+END_REASONS = ("stop", "caller_hangup", "agent_hangup", "idle", "max_duration", "error", "cancelled")
+
+
+class ResourceRegistry:
+    """Open per-call resources by kind: calls, tasks, sockets, recorders.
+
+    Every acquire() is paired with a release(), so once all calls have
+    ended each kind should be back to zero; anything left is a leak.
+    """
+
+    def __init__(self):
+        self.open = {}
+        self.opened = {}
+
+    def acquire(self, kind):
+        self.open[kind] = self.open.get(kind, 0) + 1
+        self.opened[kind] = self.opened.get(kind, 0) + 1
+
+    def release(self, kind):
+        self.open[kind] -= 1
+
+    @contextmanager
+    def holding(self, kind):
+        self.acquire(kind)
+        try:
+            yield
+        finally:
+            self.release(kind)
+
+    def leaked(self):
+        return {kind: count for kind, count in self.open.items() if count}
+
+    def snapshot(self):
+        return {kind: {"open": self.open[kind], "opened": self.opened[kind]} for kind in self.opened}
+
+
+# Resources of every call in this process
+resources = ResourceRegistry()
+
+
+class CallSupervisor:
+    """Runs one call's tasks and ends them together.
+
+    run() returns as soon as any task finishes, or when the call goes idle
+    or runs past its maximum duration, and cancels the rest. Each task
+    returns the reason the call ended ("stop", "agent_hangup", ...); that
+    of the first to finish is the call's. Tasks still running
+    `shutdown_timeout` seconds after cancellation are logged as stuck.
+    """
+
+    __slots__ = ("call_id", "idle_timeout", "max_duration", "shutdown_timeout", "resources",
+                 "started", "last_activity", "tasks", "stuck")
+
+    def __init__(self, call_id=None, idle_timeout=CALL_IDLE_TIMEOUT, max_duration=CALL_MAX_SECONDS,
+                 shutdown_timeout=CALL_SHUTDOWN_TIMEOUT, resources=resources):
+        self.call_id = call_id
+        self.idle_timeout = idle_timeout
+        self.max_duration = max_duration
+        self.shutdown_timeout = shutdown_timeout
+        self.resources = resources
+        self.started = self.last_activity = time.monotonic()
+        # task -> name
+        self.tasks = {}
+        self.stuck = 0
+
+    def touch(self):
+        """Record activity on the call, postponing the idle timeout."""
+        self.last_activity = time.monotonic()
+
+    def spawn(self, coro, name):
+        task = asyncio.ensure_future(coro)
+        self.tasks[task] = name
+        self.resources.acquire("call_task")
+        task.add_done_callback(self._task_done)
+        return task
+
+    def _task_done(self, task):
+        self.resources.release("call_task")
+
+    async def _watchdog(self):
+        while True:
+            now = time.monotonic()
+            deadline = float("inf")
+            if self.max_duration:
+                end_at = self.started + self.max_duration
+                if now >= end_at:
+                    return "max_duration"
+                deadline = end_at
+            if self.idle_timeout:
+                idle_at = self.last_activity + self.idle_timeout
+                if now >= idle_at:
+                    return "idle"
+                deadline = min(deadline, idle_at)
+            if deadline == float("inf"):
+                # Nothing to watch; wait to be cancelled with the call
+                await asyncio.Future()
+            await asyncio.sleep(deadline - now)
+
+    async def run(self):
+        """Wait for the first task to finish, end the others and return why."""
+        self.spawn(self._watchdog(), "watchdog")
+        reason = "cancelled"
+        try:
+            done, _ = await asyncio.wait(self.tasks, return_when=asyncio.FIRST_COMPLETED)
+            # Ties are rare; prefer a task that says why over the watchdog
+            first = min(done, key=lambda task: self.tasks[task] == "watchdog")
+            reason = self._reason(first)
+            for task in done:
+                if task is not first:
+                    self._reason(task)
+        finally:
+            await self.cancel()
+        return reason
+
+    def _reason(self, task):
+        if task.cancelled():
+            return "cancelled"
+        error = task.exception()
+        if error is not None:
+            log.error("call_task_failed", self.call_id, task=self.tasks[task],
+                      error=str(error) or type(error).__name__)
+            return "error"
+        result = task.result()
+        return result if result in END_REASONS else "error"
+
+    async def cancel(self):
+        """Cancel every task still running and wait for them to unwind."""
+        pending = [task for task in self.tasks if not task.done()]
+        for task in pending:
+            task.cancel()
+        if not pending:
+            return
+        # Not awaited directly, so being cancelled here does not skip the wait
+        done, still_running = await asyncio.wait(pending, timeout=self.shutdown_timeout)
+        for task in done:
+            if not task.cancelled() and task.exception() is not None:
+                log.warning("call_task_failed", self.call_id, task=self.tasks[task],
+                            error=str(task.exception()) or type(task.exception()).__name__)
+        if still_running:
+            self.stuck += len(still_running)
+            log.error("call_tasks_stuck", self.call_id,
+                      tasks=[self.tasks[task] for task in still_running])
+
+    def snapshot(self):
+        return {"tasks": {name: not task.done() for task, name in self.tasks.items()},
+                "age": time.monotonic() - self.started,
+                "idle": time.monotonic() - self.last_activity, "stuck": self.stuck}
@@ -0,0 +1,133 @@
+import asyncio
+import json
+import os
+import time
+
+from agent_tools import TOOLS
+from json_codec import dumps
+from structured_log import log
+
+# Agent Settings file and how often (seconds) to check it for edits
+CONFIG_FILE = os.getenv('CONFIG_FILE', 'config.json')
+CONFIG_POLL_INTERVAL = float(os.getenv('CONFIG_POLL_INTERVAL', '2'))
+
+
+class ConfigVersion:
+    """One parsed and validated Settings payload, ready to send."""
+
+    __slots__ = ("version", "settings", "message", "stamp", "loaded_at")
+
+    def __init__(self, version, settings, stamp):
+        self.version = version
+        self.settings = settings
+        # Serialized once; every call sends this exact text frame
+        self.message = dumps(settings)
+        self.stamp = stamp
+        self.loaded_at = time.time()
+
+
+def expand_functions(settings, tools=TOOLS):
+    """Replace tool names in agent.think.functions with the registry's schemas.
+
+    Entries that are already schema objects are kept as written.
+    """
+    think = (settings.get("agent") or {}).get("think") if isinstance(settings, dict) else None
+    functions = think.get("functions") if isinstance(think, dict) else None
+    if not isinstance(functions, list):
+        return settings
+    expanded = []
+    for function in functions:
+        if isinstance(function, str):
+            if function not in tools:
+                raise ValueError(f"config lists unknown tool '{function}'")
+            function = tools[function].schema()
+        expanded.append(function)
+    think["functions"] = expanded
+    return settings
+
+
+def validate_settings(settings):
+    """Raise ValueError if the Settings payload is obviously malformed."""
+    if not isinstance(settings, dict):
+        raise ValueError("config must be a JSON object")
+    if settings.get("type") != "Settings":
+        raise ValueError("config 'type' must be 'Settings'")
+    agent = settings.get("agent")
+    if not isinstance(agent, dict):
+        raise ValueError("config is missing the 'agent' object")
+    think = agent.get("think")
+    if not isinstance(think, dict) or not isinstance(think.get("provider"), dict):
+        raise ValueError("config 'agent.think.provider' is required")
+    functions = think.get("functions", [])
+    if not isinstance(functions, list):
+        raise ValueError("config 'agent.think.functions' must be a list")
+    for function in functions:
+        if not isinstance(function, dict) or not function.get("name"):
+            raise ValueError("every function schema needs a 'name'")
+        if not isinstance(function.get("parameters", {}), dict):
+            raise ValueError(f"function '{function['name']}' has invalid 'parameters'")
+
+
+class ConfigManager:
+    """Caches the agent Settings and reloads them when the file changes.
+
+    Callers take `current` once at call setup and keep that ConfigVersion for
+    the whole call, so a reload only affects calls that start afterwards. A
+    file that fails to parse or validate is reported and the previous version
+    stays active. Tools listed by name are expanded from the tool registry.
+    """
+
+    def __init__(self, path=CONFIG_FILE, poll_interval=CONFIG_POLL_INTERVAL, tools=TOOLS):
+        self.path = path
+        self.poll_interval = poll_interval
+        self.tools = tools
+        self.current = self._load(1)
+        self.reloads = 0
+        self.errors = 0
+        # Stamp of the last file contents that failed to load, so a broken
+        # edit is reported once rather than on every poll
+        self._failed_stamp = None
+
+    def _stamp(self):
+        st = os.stat(self.path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load(self, version, stamp=None):
+        if stamp is None:
+            stamp = self._stamp()
+        with open(self.path, "r") as f:
+            settings = json.load(f)
+        validate_settings(expand_functions(settings, self.tools))
+        return ConfigVersion(version, settings, stamp)
+
+    def reload(self):
+        """Re-read the file now. Returns True if a new version became active."""
+        stamp = None
+        try:
+            stamp = self._stamp()
+            new_version = self._load(self.current.version + 1, stamp)
+        except (OSError, ValueError) as e:
+            self._failed_stamp = stamp
+            self.errors += 1
+            log.error("config_reload_failed", path=self.path, version=self.current.version, error=str(e))
+            return False
+        # Single reference swap: readers see either the old or the new version
+        self.current = new_version
+        self.reloads += 1
+        log.info("config_loaded", path=self.path, version=new_version.version)
+        return True
+
+    def changed(self):
+        try:
+            stamp = self._stamp()
+        except OSError:
+            return False
+        return stamp != self.current.stamp and stamp != self._failed_stamp
+
+    async def watch(self):
+        """Poll the file for edits; file I/O runs off the event loop."""
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            if await loop.run_in_executor(None, self.changed):
+                await loop.run_in_executor(None, self.reload)
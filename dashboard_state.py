@@ -0,0 +1,128 @@
+import os
+from collections import OrderedDict, deque
+
+from json_codec import loads
+from transcript import CALL_MAX_TURNS
+
+# Completed calls kept in the dashboard snapshot; older ones are in the
+# paginated call history
+DASHBOARD_RECENT_CALLS = int(os.getenv('DASHBOARD_RECENT_CALLS', '50'))
+
+
+class CallView:
+    """What the dashboard shows for one call."""
+
+    __slots__ = ("call_sid", "caller", "callee", "status", "name", "summary", "turns", "last_seq")
+
+    def __init__(self, call_sid, caller=None, callee=None, status="in_progress",
+                 max_turns=CALL_MAX_TURNS):
+        self.call_sid = call_sid
+        self.caller = caller
+        self.callee = callee
+        self.status = status
+        self.name = None
+        self.summary = None
+        self.turns = deque(maxlen=max_turns)
+        self.last_seq = 0
+
+    def add_turn(self, turn):
+        # Deltas and snapshots can overlap; sequence numbers make it idempotent
+        if turn["seq"] > self.last_seq:
+            self.turns.append(turn)
+            self.last_seq = turn["seq"]
+
+    def to_dict(self):
+        return {
+            "CallSid": self.call_sid,
+            "From": self.caller,
+            "To": self.callee,
+            "status": self.status,
+            "name": self.name,
+            "summary": self.summary,
+            "last_seq": self.last_seq,
+            "turns": list(self.turns),
+        }
+
+
+class DashboardState:
+    """Active calls and the most recent completed ones, for late subscribers.
+
+    The store is fed the same events the dashboards receive (incoming_call,
+    transcript_delta/snapshot, call_status, call_summary, admission), so a dashboard
+    that connects mid-shift gets one dashboard_snapshot and then continues
+    with the live events. With several workers every worker applies every
+    event from the bus, so any worker can answer for all calls.
+    """
+
+    def __init__(self, recent_limit=DASHBOARD_RECENT_CALLS):
+        self.recent_limit = recent_limit
+        self.active = {}
+        self.recent = OrderedDict()
+        # Latest admission counters per worker
+        self.admission = {}
+        self.applied = 0
+
+    def _find(self, call_sid):
+        view = self.active.get(call_sid)
+        return view if view is not None else self.recent.get(call_sid)
+
+    def apply(self, event):
+        kind = event.get("type")
+        data = event.get("data") or {}
+        if kind == "incoming_call":
+            call_sid = data.get("CallSid")
+            if call_sid and self._find(call_sid) is None:
+                self.active[call_sid] = CallView(call_sid, data.get("From"), data.get("To"),
+                                                 data.get("status", "in_progress"))
+        elif kind == "transcript_delta":
+            view = self._find(data.get("call_sid"))
+            if view is not None:
+                view.add_turn({"seq": data["seq"], "role": data["role"], "text": data["text"]})
+        elif kind == "transcript_snapshot":
+            view = self._find(data.get("call_sid"))
+            if view is not None:
+                for turn in data.get("turns", ()):
+                    view.add_turn(turn)
+        elif kind == "call_status":
+            call_sid = data.get("CallSid")
+            view = self._find(call_sid)
+            if view is None:
+                return
+            view.status = data.get("CallStatus", view.status)
+            if view.status != "in_progress" and self.active.pop(call_sid, None) is not None:
+                self.recent[call_sid] = view
+                while len(self.recent) > self.recent_limit:
+                    self.recent.popitem(last=False)
+        elif kind == "call_summary":
+            view = self._find(data.get("CallSid"))
+            if view is not None:
+                view.summary = data.get("summary")
+                view.name = data.get("name")
+        elif kind == "admission":
+            self.admission[str(data.get("worker"))] = data
+        else:
+            return
+        self.applied += 1
+
+    def apply_raw(self, message, key=None):
+        """Event bus handler: apply a serialized dashboard event."""
+        try:
+            event = loads(message)
+        except ValueError:
+            return
+        if isinstance(event, dict):
+            self.apply(event)
+
+    def snapshot_message(self):
+        return {
+            "type": "dashboard_snapshot",
+            "data": {
+                "active": [view.to_dict() for view in self.active.values()],
+                # Newest first, like the call history
+                "recent": [view.to_dict() for view in reversed(self.recent.values())],
+                "admission": list(self.admission.values()),
+            }
+        }
+
+    def snapshot(self):
+        return {"active": len(self.active), "recent": len(self.recent), "applied": self.applied}
@@ -0,0 +1,191 @@
+import asyncio
+import os
+
+from structured_log import log
+
+# Unix socket of the event hub shared by worker processes; unset means the
+# bus is in-process only
+EVENT_BUS_SOCKET = os.getenv('EVENT_BUS_SOCKET')
+# Largest single message (bytes); transcript snapshots can be sizeable
+EVENT_BUS_MAX_MESSAGE = int(os.getenv('EVENT_BUS_MAX_MESSAGE', str(16 * 1024 * 1024)))
+# Unsent bytes allowed per connection before messages to it are dropped
+EVENT_BUS_MAX_BUFFER = int(os.getenv('EVENT_BUS_MAX_BUFFER', str(8 * 1024 * 1024)))
+
+
+def encode_line(channel, message, key=None):
+    # Messages are JSON text, which never contains a raw newline
+    return f"{channel}\t{key or ''}\t{message}\n".encode()
+
+
+def decode_line(line):
+    channel, key, message = line.decode().rstrip("\n").split("\t", 2)
+    return channel, message, key or None
+
+
+class LocalEventBus:
+    """Publish/subscribe on named channels within this process.
+
+    Messages are serialized JSON strings. Handlers are plain callables taking
+    (message, key) and must not block; they run on the event loop.
+    """
+
+    # True when messages also reach other processes
+    shared = False
+
+    def __init__(self):
+        self.handlers = {}
+        self.published = 0
+
+    def subscribe(self, channel, handler):
+        self.handlers.setdefault(channel, []).append(handler)
+
+    def publish(self, channel, message, key=None):
+        self.published += 1
+        self._dispatch(channel, message, key)
+
+    def _dispatch(self, channel, message, key):
+        for handler in self.handlers.get(channel, ()):
+            try:
+                handler(message, key)
+            except Exception as e:
+                log.error("event_bus_handler_error", channel=channel, error=str(e))
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    def snapshot(self):
+        return {"shared": self.shared, "published": self.published}
+
+
+class UnixSocketEventBus(LocalEventBus):
+    """Event bus shared by worker processes through an EventHub.
+
+    Every published message goes to the hub, which relays it to all workers,
+    this one included, so each process's handlers see the same stream. If the
+    hub is unreachable, messages are delivered locally while reconnecting.
+    """
+
+    shared = True
+
+    def __init__(self, path=EVENT_BUS_SOCKET, max_buffer=EVENT_BUS_MAX_BUFFER):
+        super().__init__()
+        self.path = path
+        self.max_buffer = max_buffer
+        self._writer = None
+        self._task = None
+        self.dropped = 0
+        self.reconnects = 0
+
+    async def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def publish(self, channel, message, key=None):
+        self.published += 1
+        writer = self._writer
+        if writer is None:
+            self._dispatch(channel, message, key)
+            return
+        if writer.transport.get_write_buffer_size() > self.max_buffer:
+            # The hub is not keeping up; shed load rather than buffer forever
+            self.dropped += 1
+            return
+        writer.write(encode_line(channel, message, key))
+
+    async def _run(self):
+        backoff = 0.1
+        while True:
+            try:
+                reader, writer = await asyncio.open_unix_connection(
+                    self.path, limit=EVENT_BUS_MAX_MESSAGE)
+            except OSError as e:
+                log.warning("event_hub_unavailable", path=self.path, error=str(e))
+                await asyncio.sleep(backoff)
+                backoff = min(backoff * 2, 5)
+                continue
+            backoff = 0.1
+            self._writer = writer
+            try:
+                while True:
+                    line = await reader.readline()
+                    if not line:
+                        break
+                    self._dispatch(*decode_line(line))
+            except (OSError, ValueError) as e:
+                log.warning("event_hub_connection_lost", error=str(e))
+            finally:
+                self._writer = None
+                writer.close()
+            self.reconnects += 1
+
+    def snapshot(self):
+        return {
+            "shared": self.shared,
+            "published": self.published,
+            "dropped": self.dropped,
+            "reconnects": self.reconnects,
+            "connected": self._writer is not None,
+        }
+
+
+class EventHub:
+    """Relays every message from one worker to all connected workers."""
+
+    def __init__(self, path, max_buffer=EVENT_BUS_MAX_BUFFER):
+        self.path = path
+        self.max_buffer = max_buffer
+        self.writers = set()
+        self.relayed = 0
+        self.dropped = 0
+        self._server = None
+
+    async def start(self):
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+        self._server = await asyncio.start_unix_server(
+            self._handle, self.path, limit=EVENT_BUS_MAX_MESSAGE)
+
+    async def stop(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        for writer in list(self.writers):
+            writer.close()
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    async def _handle(self, reader, writer):
+        self.writers.add(writer)
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                self.relayed += 1
+                for peer in self.writers:
+                    if peer.transport.get_write_buffer_size() > self.max_buffer:
+                        self.dropped += 1
+                        continue
+                    peer.write(line)
+        except (OSError, ValueError) as e:
+            log.warning("event_hub_client_error", error=str(e))
+        finally:
+            self.writers.discard(writer)
+            writer.close()
+
+
+def create_event_bus(path=EVENT_BUS_SOCKET):
+    """A bus shared through the hub at `path`, or an in-process one."""
+    if path:
+        return UnixSocketEventBus(path)
+    return LocalEventBus()
@@ -0,0 +1,162 @@
+import asyncio
+import os
+from collections import deque
+
+from json_codec import dumps
+
+# Frames buffered per dashboard client before the overflow policy kicks in
+FANOUT_QUEUE_SIZE = int(os.getenv('FANOUT_QUEUE_SIZE', '256'))
+# What to do when a client's queue is full: drop_oldest, coalesce or disconnect.
+# coalesce replaces a queued frame with a newer one of the same key (a call's
+# summary or status, admission counters) whether or not the queue is full, and
+# otherwise drops the oldest frame; unkeyed frames such as transcript deltas
+# are never merged, and the dashboard refetches turns it missed
+FANOUT_POLICY = os.getenv('FANOUT_POLICY', 'drop_oldest')
+
+POLICIES = ("drop_oldest", "coalesce", "disconnect")
+
+
+class Subscriber:
+    """One dashboard websocket with its own bounded outbound queue and sender task."""
+
+    __slots__ = ("ws", "policy", "max_queue", "pending", "keyed", "wakeup", "task",
+                 "closed", "sent", "dropped", "coalesced")
+
+    def __init__(self, ws, policy, max_queue):
+        self.ws = ws
+        self.policy = policy
+        self.max_queue = max_queue
+        # Each entry is [coalesce_key, message] so a newer frame with the same
+        # key can replace a queued one in place
+        self.pending = deque()
+        self.keyed = {}
+        self.wakeup = asyncio.Event()
+        self.task = None
+        self.closed = False
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+
+    def offer(self, message, key=None):
+        """Queue a serialized frame. Returns False if the client must be disconnected."""
+        if self.policy == "coalesce" and key is not None:
+            entry = self.keyed.get(key)
+            if entry is not None:
+                entry[1] = message
+                self.coalesced += 1
+                return True
+
+        if len(self.pending) >= self.max_queue:
+            if self.policy == "disconnect":
+                return False
+            oldest = self.pending.popleft()
+            if oldest[0] is not None and self.keyed.get(oldest[0]) is oldest:
+                del self.keyed[oldest[0]]
+            self.dropped += 1
+
+        entry = [key, message]
+        self.pending.append(entry)
+        if key is not None:
+            self.keyed[key] = entry
+        self.wakeup.set()
+        return True
+
+    async def drain(self, on_error):
+        try:
+            while not self.closed:
+                if not self.pending:
+                    self.wakeup.clear()
+                    await self.wakeup.wait()
+                    continue
+                entry = self.pending.popleft()
+                key, message = entry
+                if key is not None and self.keyed.get(key) is entry:
+                    del self.keyed[key]
+                try:
+                    await self.ws.send(message)
+                    self.sent += 1
+                except Exception:
+                    on_error(self)
+                    return
+        except asyncio.CancelledError:
+            pass
+
+
+class Broadcaster:
+    """Fan-out of dashboard events to /frontend-updates clients.
+
+    publish() serializes each event once and appends it to every client's
+    bounded queue without awaiting any socket, so a slow or stalled browser tab
+    can never hold up the call that produced the event.
+    """
+
+    def __init__(self, policy=FANOUT_POLICY, max_queue=FANOUT_QUEUE_SIZE):
+        if policy not in POLICIES:
+            raise ValueError(f"Unknown fan-out policy: {policy}")
+        self.policy = policy
+        self.max_queue = max_queue
+        self.subscribers = {}
+        self.published = 0
+        self.disconnected = 0
+
+    def subscribe(self, ws):
+        subscriber = Subscriber(ws, self.policy, self.max_queue)
+        subscriber.task = asyncio.ensure_future(subscriber.drain(self._drop))
+        self.subscribers[ws] = subscriber
+        return subscriber
+
+    def unsubscribe(self, ws):
+        subscriber = self.subscribers.pop(ws, None)
+        if subscriber is not None:
+            subscriber.closed = True
+            subscriber.wakeup.set()
+            if subscriber.task is not None:
+                subscriber.task.cancel()
+
+    def publish(self, data, key=None):
+        """Serialize once and enqueue for every client. Never awaits a client."""
+        if not self.subscribers:
+            return
+        message = dumps(data)
+        self.publish_raw(message, key)
+
+    def publish_raw(self, message, key=None):
+        self.published += 1
+        overflowed = []
+        for subscriber in self.subscribers.values():
+            if not subscriber.offer(message, key):
+                overflowed.append(subscriber)
+        for subscriber in overflowed:
+            self._drop(subscriber)
+
+    def send_to(self, ws, data):
+        """Queue an event for a single client (e.g. a reply to its request)."""
+        subscriber = self.subscribers.get(ws)
+        if subscriber is not None and not subscriber.offer(dumps(data)):
+            self._drop(subscriber)
+
+    def _drop(self, subscriber):
+        if self.subscribers.get(subscriber.ws) is not subscriber:
+            return
+        self.disconnected += 1
+        self.unsubscribe(subscriber.ws)
+        asyncio.ensure_future(self._close(subscriber.ws))
+
+    async def _close(self, ws):
+        try:
+            await asyncio.wait_for(ws.close(), 5)
+        except Exception:
+            pass
+
+    def __len__(self):
+        return len(self.subscribers)
+
+    def snapshot(self):
+        return {
+            "subscribers": len(self.subscribers),
+            "published": self.published,
+            "disconnected": self.disconnected,
+            "queued": sum(len(s.pending) for s in self.subscribers.values()),
+            "dropped": sum(s.dropped for s in self.subscribers.values()),
+            "coalesced": sum(s.coalesced for s in self.subscribers.values()),
+        }
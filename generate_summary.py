@@ -1,16 +1,29 @@
-from openai import OpenAI
+from openai import AsyncOpenAI
 import os
 import json
 import re
 
-async def generate_summary(conversation: list) -> dict:
-    """
-    Summarizes the entire conversation and retrieves customer name (via LLM).
-    Returns a JSON-like dictionary containing 'cust_name' and 'summary'.
-    """
-    if not conversation or len(conversation) == 0:
-        return {"cust_name": "Unknown", "summary": "No conversation to summarize."}
+from structured_log import log
+
+# One client (and connection pool) shared by every summary request.
+# OPENAI_BASE_URL can point it at a local stub of the chat-completions endpoint.
+_client = None
 
+def get_client() -> AsyncOpenAI:
+    global _client
+    if _client is None:
+        _client = AsyncOpenAI(
+            api_key=os.environ.get("OPENAI_API_KEY"),
+            base_url=os.environ.get("OPENAI_BASE_URL"),
+            max_retries=0,  # retries are handled by the summary worker
+        )
+        # The SDK imports its resource modules on first attribute access;
+        # resolve them here so that cost is not paid on the event loop later
+        _client.chat.completions
+    return _client
+
+def format_conversation(conversation: list) -> str:
+    """Render the user/assistant turns as a plain-text transcript."""
     # Format the conversation into a string format
     formatted_conversation = ""
     
@@ -22,55 +35,100 @@ async def generate_summary(conversation: list) -> dict:
             formatted_conversation += f"USER: {user_message}\n"
         if assistant_message:
             formatted_conversation += f"ASSISTANT: {assistant_message}\n"
+    return formatted_conversation
+
+async def request_summary(conversation: list) -> dict:
+    """
+    Summarizes the conversation via the LLM without swallowing errors,
+    so callers can retry on failures.
+    """
+    if not conversation or len(conversation) == 0:
+        return {"cust_name": "Unknown", "summary": "No conversation to summarize."}
 
-    # Initialize OpenAI API client
-    client = OpenAI(
-        api_key=os.environ.get("OPENAI_API_KEY"),
+    formatted_conversation = format_conversation(conversation)
+
+    response = await get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        temperature=0.2,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You are a helpful assistant that summarizes conversations. "
+                    "Your response must be valid JSON only with this exact structure: "
+                    '{ "cust_name": "customer name", "summary": "conversation summary" }'
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Please summarize this conversation and extract the customer's name:\n\n{formatted_conversation}"
+            }
+        ],
+        response_format={"type": "json_object"}
     )
 
-    try:
-        # Use the chat.completions endpoint instead of responses.create
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",
-            temperature=0.2,
-            messages=[
-                {
-                    "role": "system",
-                    "content": (
-                        "You are a helpful assistant that summarizes conversations. "
-                        "Your response must be valid JSON only with this exact structure: "
-                        '{ "cust_name": "customer name", "summary": "conversation summary" }'
-                    )
-                },
-                {
-                    "role": "user",
-                    "content": f"Please summarize this conversation and extract the customer's name:\n\n{formatted_conversation}"
-                }
-            ],
-            response_format={"type": "json_object"}
-        )
+    # Extract the JSON response
+    result = response.choices[0].message.content.strip()
+    return parse_summary(result)
+
+async def request_summary_update(previous: dict, conversation: str, max_tokens: int = 300) -> dict:
+    """
+    Folds the next part of a call into the running summary via the LLM.
+    `previous` holds the fields so far (None when unknown); errors propagate
+    so callers can fall back.
+    """
+    response = await get_client().chat.completions.create(
+        model="gpt-4o-mini",
+        temperature=0.2,
+        max_tokens=max_tokens,
+        messages=[
+            {
+                "role": "system",
+                "content": (
+                    "You keep a running summary of a phone call between a customer and a clinic's "
+                    "voice agent. Given the summary so far and the next part of the call, return "
+                    "the updated summary. Your response must be valid JSON only with this exact "
+                    'structure: { "cust_name": "customer name or null", "summary": "summary of the '
+                    'whole call so far, at most 80 words", "symptoms": "symptoms or null", '
+                    '"treatment": "requested treatment or null" }'
+                )
+            },
+            {
+                "role": "user",
+                "content": f"Summary so far:\n{json.dumps(previous)}\n\nNext part of the call:\n{conversation}"
+            }
+        ],
+        response_format={"type": "json_object"}
+    )
+    return parse_summary(response.choices[0].message.content.strip())
 
-        # Extract the JSON response
-        result = response.choices[0].message.content.strip()
+def parse_summary(result: str) -> dict:
+    """Parse the LLM reply into {'cust_name', 'summary'}, tolerating invalid JSON."""
+    # Try to parse as JSON
+    try:
+        summary_data = json.loads(result)
+        return summary_data
+    except json.JSONDecodeError:
+        # If it's not valid JSON, try to extract name and summary manually
+        cust_name_match = re.search(r'"cust_name":\s*"([^"]*)"', result)
+        summary_match = re.search(r'"summary":\s*"([^"]*)"', result)
         
-        # Try to parse as JSON
-        try:
-            summary_data = json.loads(result)
-            return summary_data
-        except json.JSONDecodeError:
-            # If it's not valid JSON, try to extract name and summary manually
-            cust_name_match = re.search(r'"cust_name":\s*"([^"]*)"', result)
-            summary_match = re.search(r'"summary":\s*"([^"]*)"', result)
-            
-            if cust_name_match and summary_match:
-                return {
-                    "cust_name": cust_name_match.group(1),
-                    "summary": summary_match.group(1)
-                }
-            else:
-                # Fallback if we can't extract the fields
-                return {"cust_name": "Unknown", "summary": result}
-            
+        if cust_name_match and summary_match:
+            return {
+                "cust_name": cust_name_match.group(1),
+                "summary": summary_match.group(1)
+            }
+        else:
+            # Fallback if we can't extract the fields
+            return {"cust_name": "Unknown", "summary": result}
+
+async def generate_summary(conversation: list) -> dict:
+    """
+    Summarizes the entire conversation and retrieves customer name (via LLM).
+    Returns a JSON-like dictionary containing 'cust_name' and 'summary'.
+    """
+    try:
+        return await request_summary(conversation)
     except Exception as e:
-        print(f"Error generating summary: {e}")
-        return {"cust_name": "Unknown", "summary": f"Summary unavailable due to an error: {str(e)}"}
\ No newline at end of file
+        log.error("summary_error", error=str(e))
+        return {"cust_name": "Unknown", "summary": f"Summary unavailable due to an error: {str(e)}"}
@@ -0,0 +1,268 @@
+"""JSON encoding and decoding for every message the server handles.
+
+The backend is picked once at import: orjson, then msgspec, then the
+standard library (JSON_CODEC forces one). All produce compact JSON and
+accept str or bytes. Websocket JSON goes out as str, because bytes would
+be sent as a binary frame, which the agent takes for audio. Files and
+sockets of our own get bytes straight from dumpb().
+
+Twilio and agent events are decoded into the typed messages below. Twilio
+media events normally skip JSON altogether (media_codec.inbound_media_payload).
+"""
+import json
+import os
+
+# JSON backend: auto (orjson, then msgspec, then json), orjson, msgspec or json
+JSON_CODEC = os.getenv('JSON_CODEC', 'auto')
+
+BACKENDS = ("orjson", "msgspec", "json")
+
+
+class Codec:
+    """dumps(obj) -> str, dumpb(obj) -> bytes and loads(str | bytes) for one backend.
+
+    `default` converts objects the backend cannot encode, as in json.dumps.
+    Decoding errors are ValueError whatever the backend.
+    """
+
+    __slots__ = ("name", "dumps", "dumpb", "loads")
+
+    def __init__(self, name, dumps, dumpb, loads):
+        self.name = name
+        self.dumps = dumps
+        self.dumpb = dumpb
+        self.loads = loads
+
+
+def _stdlib_codec():
+    encode = json.JSONEncoder(separators=(",", ":"), ensure_ascii=False).encode
+
+    def dumps(obj, default=None):
+        if default is None:
+            return encode(obj)
+        return json.dumps(obj, separators=(",", ":"), ensure_ascii=False, default=default)
+
+    def dumpb(obj, default=None):
+        return dumps(obj, default).encode()
+
+    return Codec("json", dumps, dumpb, json.loads)
+
+
+def _orjson_codec():
+    import orjson
+
+    stdlib = _stdlib_codec()
+    encode = orjson.dumps
+
+    def dumpb(obj, default=None):
+        try:
+            return encode(obj, default)
+        except TypeError:
+            # Non-string dict keys or integers past 64 bits, which json accepts
+            return stdlib.dumpb(obj, default)
+
+    def dumps(obj, default=None):
+        return dumpb(obj, default).decode()
+
+    return Codec("orjson", dumps, dumpb, orjson.loads)
+
+
+def _msgspec_codec():
+    import msgspec
+
+    stdlib = _stdlib_codec()
+    encode = msgspec.json.Encoder().encode
+    decode = msgspec.json.Decoder().decode
+
+    def dumpb(obj, default=None):
+        try:
+            if default is None:
+                return encode(obj)
+            return msgspec.json.encode(obj, enc_hook=default)
+        except TypeError:
+            return stdlib.dumpb(obj, default)
+
+    def dumps(obj, default=None):
+        return dumpb(obj, default).decode()
+
+    def loads(data):
+        try:
+            return decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None
+
+    return Codec("msgspec", dumps, dumpb, loads)
+
+
+_FACTORIES = {"orjson": _orjson_codec, "msgspec": _msgspec_codec, "json": _stdlib_codec}
+
+
+def get_codec(name):
+    """The codec for a backend; ImportError if it is not installed."""
+    return _FACTORIES[name]()
+
+
+def available_codecs():
+    codecs = []
+    for name in BACKENDS:
+        try:
+            codecs.append(get_codec(name))
+        except ImportError:
+            pass
+    return codecs
+
+
+def select_codec(preference=JSON_CODEC):
+    if preference != "auto":
+        return get_codec(preference)
+    return available_codecs()[0]
+
+
+codec = select_codec()
+dumps = codec.dumps
+dumpb = codec.dumpb
+loads = codec.loads
+
+
+# Twilio media-stream events
+
+class TwilioEvent:
+    """A Twilio event the server does not act on (e.g. "connected")."""
+
+    __slots__ = ("event",)
+
+    def __init__(self, event):
+        self.event = event
+
+
+class TwilioStart(TwilioEvent):
+    __slots__ = ("call_sid", "stream_sid", "custom_parameters")
+
+    def __init__(self, call_sid, stream_sid, custom_parameters):
+        self.event = "start"
+        self.call_sid = call_sid
+        self.stream_sid = stream_sid
+        self.custom_parameters = custom_parameters
+
+
+class TwilioMedia(TwilioEvent):
+    __slots__ = ("track", "payload")
+
+    def __init__(self, track, payload):
+        self.event = "media"
+        self.track = track
+        self.payload = payload
+
+
+class TwilioMark(TwilioEvent):
+    __slots__ = ("name",)
+
+    def __init__(self, name):
+        self.event = "mark"
+        self.name = name
+
+
+def _twilio_start(data):
+    start = data["start"]
+    return TwilioStart(start["callSid"], start["streamSid"], start.get("customParameters") or {})
+
+
+def _twilio_media(data):
+    media = data["media"]
+    return TwilioMedia(media.get("track"), media.get("payload"))
+
+
+def _twilio_mark(data):
+    return TwilioMark((data.get("mark") or {}).get("name"))
+
+
+_TWILIO_EVENTS = {"start": _twilio_start, "media": _twilio_media, "mark": _twilio_mark}
+
+
+def decode_twilio(message):
+    """Decode a Twilio websocket message; ValueError if it is malformed."""
+    return twilio_event(loads(message))
+
+
+def twilio_event(data):
+    """The typed event for a decoded Twilio message."""
+    try:
+        event = data["event"]
+        factory = _TWILIO_EVENTS.get(event)
+        return TwilioEvent(event) if factory is None else factory(data)
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"malformed Twilio event: missing {e}") from None
+
+
+# Deepgram agent events
+
+class AgentEvent:
+    """An agent event with no fields the server reads (e.g. "AgentAudioDone")."""
+
+    __slots__ = ("type",)
+
+    def __init__(self, type):
+        self.type = type
+
+
+class ConversationText(AgentEvent):
+    __slots__ = ("role", "content")
+
+    def __init__(self, role, content):
+        self.type = "ConversationText"
+        self.role = role
+        self.content = content
+
+
+class FunctionCall:
+    __slots__ = ("id", "name", "arguments")
+
+    def __init__(self, id, name, arguments):
+        self.id = id
+        self.name = name
+        # JSON text, as the agent sends it
+        self.arguments = arguments
+
+
+class FunctionCallRequest(AgentEvent):
+    __slots__ = ("functions",)
+
+    def __init__(self, functions):
+        self.type = "FunctionCallRequest"
+        self.functions = functions
+
+
+def _conversation_text(data):
+    return ConversationText(data.get("role"), (data.get("content") or "").strip())
+
+
+def _function_call_request(data):
+    return FunctionCallRequest([
+        FunctionCall(call.get("id", "unknown"), call.get("name", "unknown"), call.get("arguments"))
+        for call in data.get("functions") or ()
+    ])
+
+
+_AGENT_EVENTS = {"ConversationText": _conversation_text, "FunctionCallRequest": _function_call_request}
+
+
+def decode_agent(message):
+    """Decode an agent text message; ValueError if it is malformed."""
+    return agent_event(loads(message))
+
+
+def agent_event(data):
+    """The typed event for a decoded agent message."""
+    try:
+        kind = data["type"]
+        factory = _AGENT_EVENTS.get(kind)
+        return AgentEvent(kind) if factory is None else factory(data)
+    except (KeyError, TypeError, AttributeError) as e:
+        raise ValueError(f"malformed agent event: {e}") from None
+
+
+def function_call_response(func_id, func_name, result):
+    """FunctionCallResponse text. The agent takes `content` as a JSON string,
+    so the result is encoded and then embedded as a string."""
+    return dumps({"type": "FunctionCallResponse", "id": func_id, "name": func_name,
+                  "content": dumps(result)})
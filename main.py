@@ -1,33 +1,223 @@
 import asyncio
-import base64
-import json
+import binascii
 import sys
 import websockets
+import sqlite3
 import ssl
 import os
+import time
+from http import HTTPStatus
 from dotenv import load_dotenv
-from agent_function import FUNCTION_MAP
-from generate_summary import generate_summary
+# Load .env before importing modules that read settings at import time
 load_dotenv()
-
-# Store connected frontend clients
-frontend_clients = set()
-full_transcript = {}
-all_conversation = {}
-
-async def broadcast_to_frontend(data):
-    if not frontend_clients:
+from agent_tools import TOOLS
+from tool_executor import ToolExecutor, ToolTimeoutError, UnknownToolError
+from tool_registry import ToolArgumentError
+from summary_worker import SummaryWorker
+from rolling_summary import RollingSummarizer
+from generate_summary import get_client
+from fanout import Broadcaster
+from call_session import CallSession, SessionHandoff
+from call_supervisor import CALL_IDLE_TIMEOUT, CallSupervisor, resources
+from admission import (ADMISSION_HOLD_AUDIO, ADMISSION_REJECT_AUDIO, AdmissionController, hold,
+                       load_prompt, reject, wait_for_start)
+from call_log import CallHistoryIndex, CallLog
+from dashboard_state import DashboardState
+from config_manager import ConfigManager
+from agent_pool import AgentConnectionPool
+from media_codec import MediaFrameEncoder, inbound_media_payload
+from json_codec import codec as json_codec, decode_agent, decode_twilio, dumps, function_call_response, loads
+from outbound_audio import OutboundAudio
+from vad import InboundAudio
+from recorder import CHANNEL_INBOUND, CHANNEL_OUTBOUND, RECORDING_DIR, CallRecorder
+from event_bus import create_event_bus
+from workers import WORKERS, run_workers
+from structured_log import log
+from metrics import (CONTENT_TYPE, DEPTH_BUCKETS, FAST_BUCKETS, TRACE_FILE, LoopLagMonitor,
+                     Registry, Tracer)
+
+# Fan-out to connected frontend clients
+frontend_clients = Broadcaster()
+# Dashboard events go through the bus so that, with several worker processes,
+# every dashboard sees every call whichever worker handles it
+event_bus = create_event_bus()
+# Active and recently completed calls, sent to each dashboard as it connects
+dashboard_state = DashboardState()
+if event_bus.shared:
+    # Every worker sees every event, so any worker can answer for all calls
+    event_bus.subscribe("frontend", dashboard_state.apply_raw)
+event_bus.subscribe("frontend", frontend_clients.publish_raw)
+# Live calls by callSid; sessions leave this registry when they are torn down
+active_sessions = {}
+tool_executor = ToolExecutor(TOOLS)
+
+# Hot-path metrics, served as Prometheus text on /metrics
+registry = Registry()
+first_audio_seconds = registry.histogram(
+    "voice_first_audio_seconds", "Twilio start event to the first agent audio sent to the caller")
+barge_in_seconds = registry.histogram(
+    "voice_barge_in_clear_seconds", "UserStartedSpeaking received to clear sent to Twilio",
+    FAST_BUCKETS)
+function_call_seconds = registry.histogram(
+    "voice_function_call_seconds", "FunctionCallRequest received to response sent",
+    labelnames=("function",))
+audio_queue_depth = registry.histogram(
+    "voice_audio_queue_depth", "Frames waiting in a call's agent-bound audio queue",
+    DEPTH_BUCKETS)
+loop_lag_seconds = registry.histogram(
+    "voice_event_loop_lag_seconds", "Delay in waking a sleeping task on the event loop",
+    FAST_BUCKETS)
+barge_in_discarded_seconds = registry.histogram(
+    "voice_barge_in_discarded_audio_seconds",
+    "Agent audio thrown away on barge-in, held locally or unplayed at Twilio",
+    (0.02, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0))
+speech_detect_seconds = registry.histogram(
+    "voice_agent_speech_detect_seconds",
+    "Local VAD speech start to the agent's UserStartedSpeaking")
+speech_starts_total = registry.counter("voice_speech_starts_total", "Caller speech onsets from the local VAD")
+inbound_audio_bytes = registry.counter(
+    "voice_inbound_audio_bytes_total", "Caller audio bytes sent to the agent or suppressed as silence",
+    ("result",))
+fanout_seconds = registry.histogram(
+    "voice_fanout_publish_seconds", "Time to serialize and queue one dashboard broadcast",
+    FAST_BUCKETS)
+calls_total = registry.counter("voice_calls_total", "Calls started")
+calls_ended_total = registry.counter("voice_calls_ended_total", "Calls ended, by reason", ("reason",))
+call_tasks_stuck_total = registry.counter(
+    "voice_call_tasks_stuck_total", "Call tasks still running after cancellation and the shutdown timeout")
+registry.gauge("voice_open_resources", "Open call resources: calls, call tasks, agent sockets, recorders",
+               ("kind",), fn=lambda: {(kind,): count for kind, count in resources.open.items()})
+registry.gauge("voice_active_calls", "Calls in progress", fn=lambda: len(active_sessions))
+registry.gauge("voice_dashboard_clients", "Connected dashboard clients",
+               fn=lambda: len(frontend_clients))
+registry.counter(
+    "voice_tool_cache_lookups_total", "Cached tool lookups: hit, miss, or joined an identical call in flight",
+    ("function", "result"),
+    fn=lambda: {(name, result): stats[key]
+                for name, stats in tool_executor.cache.snapshot().items()
+                for result, key in (("hit", "hits"), ("miss", "misses"), ("coalesced", "coalesced"))})
+registry.gauge("voice_tool_queue_depth", "Sync tool calls waiting for a worker thread",
+               fn=lambda: tool_executor.queue_depth)
+registry.gauge("voice_tool_in_flight", "Tool calls executing", fn=lambda: tool_executor.in_flight)
+registry.counter(
+    "voice_tool_executions_total", "Finished tool executions: ok, error or timeout",
+    ("function", "result"),
+    fn=lambda: {(name, result): count
+                for name, stats in tool_executor.stats.items()
+                for result, count in (("ok", stats.calls - stats.errors - stats.timeouts),
+                                      ("error", stats.errors), ("timeout", stats.timeouts))})
+registry.counter(
+    "voice_tool_execution_seconds_total", "Time spent executing each tool (divide by executions for the mean)",
+    ("function",), fn=lambda: {(name,): stats.total_time for name, stats in tool_executor.stats.items()})
+registry.gauge(
+    "voice_tool_execution_max_seconds", "Slowest execution of each tool since start",
+    ("function",), fn=lambda: {(name,): stats.max_time for name, stats in tool_executor.stats.items()})
+registry.counter(
+    "voice_log_records_total", "Log records written, dropped on a full queue, or suppressed by the rate limit",
+    ("result",),
+    fn=lambda: {(result,): log.snapshot()[result] for result in ("written", "dropped", "suppressed")})
+loop_lag = LoopLagMonitor(loop_lag_seconds)
+admission_wait_seconds = registry.histogram(
+    "voice_admission_wait_seconds", "Time a queued call spent on hold before it was admitted or gave up")
+# Sampled per-call event traces (TRACE_SAMPLE_RATE), written when a call ends
+tracer = Tracer()
+trace_log = CallLog(TRACE_FILE)
+
+async def broadcast_to_frontend(data, key=None):
+    # Frames are queued per client and sent by each client's own task, so this
+    # never waits on a slow dashboard. `key` marks frames that supersede each
+    # other (a call's latest summary or status, a worker's admission counters);
+    # under FANOUT_POLICY=coalesce a queued frame is replaced by a newer one
+    # with the same key. Transcript deltas have no key: each turn is needed.
+    if not event_bus.shared:
+        # Single process: update the state store directly, not via the bus
+        dashboard_state.apply(data)
+        if not frontend_clients:
+            return
+    started = time.perf_counter()
+    event_bus.publish("frontend", dumps(data), key)
+    fanout_seconds.observe(time.perf_counter() - started)
+
+def publish_admission(snapshot):
+    # Live admission counters for the dashboard; each worker reports its own
+    data = dict(snapshot, worker=os.getenv('WORKER_ID', '0'))
+    asyncio.ensure_future(broadcast_to_frontend({"type": "admission", "data": data},
+                                                key=f"admission:{data['worker']}"))
+
+# Caps concurrent calls; the limit follows event-loop lag and CPU, and calls
+# over it are held or turned away per ADMISSION_POLICY
+admission = AdmissionController(lag_monitor=loop_lag, on_change=publish_admission)
+registry.counter(
+    "voice_admission_total",
+    "Calls by admission result: admitted, admitted_after_wait, rejected_full, rejected_timeout, evicted, abandoned",
+    ("result",), fn=lambda: {(result,): count for result, count in admission.results.items()})
+registry.gauge("voice_admission_limit", "Concurrent calls admitted, after lag and CPU scaling",
+               fn=lambda: admission.limit)
+registry.gauge("voice_admission_queued", "Calls on hold waiting for admission", fn=lambda: admission.queued())
+hold_audio = load_prompt(ADMISSION_HOLD_AUDIO)
+reject_audio = load_prompt(ADMISSION_REJECT_AUDIO)
+
+async def publish_summary(callsid, summary, partial=False):
+    # Extract customer name and conversation summary
+    cust_name = summary.get("cust_name", "Unknown")
+    conversation_summary = summary.get("summary", "Summary unavailable")
+
+    if not partial:
+        log.info("call_summary", callsid, cust_name=cust_name, summary=conversation_summary)
+        await call_log.set_summary(callsid, cust_name, conversation_summary)
+    await broadcast_to_frontend({
+        "type": "call_summary",
+        "data": {
+            "CallSid": callsid,
+            "summary": conversation_summary,
+            "name": cust_name,
+            "symptoms": summary.get("symptoms"),
+            "treatment": summary.get("treatment"),
+            # Rolling summary of a call still in progress
+            "partial": partial
+        }
+    }, key=f"summary:{callsid}")
+
+async def publish_partial_summary(callsid, summary):
+    await publish_summary(callsid, summary, partial=True)
+
+# Calls are summarized as they go; at hang-up only the last few turns are
+# left to fold in, locally if the LLM stays unavailable
+summary_worker = SummaryWorker(publish_summary, summarize=RollingSummarizer.finish,
+                               fallback=RollingSummarizer.fallback)
+# Finished calls, indexed on disk for the dashboard's paginated history
+call_log = CallLog(index=CallHistoryIndex())
+registry.gauge("voice_summary_queue_depth", "Calls waiting for a summary",
+               fn=summary_worker.queue_depth)
+
+def summarize_session(session):
+    summary_worker.enqueue(session.call_sid, session.summarizer)
+
+async def persist_session(session):
+    await call_log.append(session.to_record())
+    if session.trace is not None:
+        await trace_log.append(session.trace.to_record())
+
+# Finished sessions are passed on to summarization and persistence
+finished_sessions = SessionHandoff([summarize_session, persist_session])
+
+async def end_session(session, status="completed", reason=None):
+    """Tear down a call session exactly once and hand it off."""
+    if not session.end(status, reason):
         return
-    message = json.dumps(data)
-    disconnected = []
-    for ws in list(frontend_clients):
-        try:
-            await ws.send(message)
-        except Exception:
-            disconnected.append(ws)
-    for ws in disconnected:
-        frontend_clients.remove(ws)
-
+    log.info("call_end", session.call_sid, status=status, reason=reason,
+             seconds=round(time.monotonic() - session.started_monotonic, 3))
+    active_sessions.pop(session.call_sid, None)
+    finished_sessions.put(session)
+
+    # Broadcast the call completion status
+    await broadcast_to_frontend({
+        "type": "call_status",
+        "data": {
+            "CallSid": session.call_sid,
+            "CallStatus": status
+        }
+    }, key=f"status:{session.call_sid}")
 
 def sts_connect():
     api_key = os.getenv('DEEPGRAM_API_KEY')
@@ -35,277 +225,477 @@ def sts_connect():
         raise ValueError("DEEPGRAM_API_KEY environment variable is not set")
 
     sts_ws = websockets.connect(
-        "wss://agent.deepgram.com/v1/agent/converse",
-        subprotocols=["token", api_key]
+        os.getenv('AGENT_URL', "wss://agent.deepgram.com/v1/agent/converse"),
+        subprotocols=["token", api_key],
+        # Warm connections buffer the greeting until a call picks them up
+        max_queue=1024,
+        # Bounds the closing handshake when a call ends
+        close_timeout=float(os.getenv('AGENT_CLOSE_TIMEOUT', '2'))
     )
     return sts_ws
 
-def load_config():
-    with open("config.json", "r") as f:
-        return json.load(f)
-
-def execute_function_call(func_name, arguments):
-    if func_name in FUNCTION_MAP:
-        result = FUNCTION_MAP[func_name](**arguments)
-        print(f"Function call result: {result}")
-        return result
-    else:
-        result = {"error": f"Unknown function: {func_name}"}
-        print(result)
-        return result
-
-def create_function_call_response(func_id, func_name, result):
-    return {
-        "type": "FunctionCallResponse",
-        "id": func_id,
-        "name": func_name,
-        "content": json.dumps(result)
-    }
-
-async def handle_function_call_request(decoded, sts_ws):
-    try:
-        for function_call in decoded["functions"]:
-            func_name = function_call["name"]
-            func_id = function_call["id"]
-            arguments = json.loads(function_call["arguments"])
-            print(f"Function call: {func_name} (ID: {func_id}), arguments: {arguments}")
+# Parsed once, reloaded in the background when config.json changes
+config_manager = ConfigManager()
+# Agent connections that are already connected and configured
+agent_pool = AgentConnectionPool(sts_connect, lambda: config_manager.current, resources=resources)
+registry.gauge("voice_agent_pool_idle", "Warm agent connections ready for a call",
+               fn=lambda: agent_pool.snapshot()["idle"])
 
-            result = execute_function_call(func_name, arguments)
+def load_config():
+    return config_manager.current.settings
 
-            function_result = create_function_call_response(func_id, func_name, result)
-            await sts_ws.send(json.dumps(function_result))
-            print(f"Sent function result: {function_result}")
+async def execute_function_call(func_name, arguments):
+    try:
+        return await tool_executor.execute(func_name, arguments)
+    except UnknownToolError:
+        return {"error": f"Unknown function: {func_name}"}
+    except ToolTimeoutError as e:
+        return {"error": str(e), "timeout": True}
+    except ToolArgumentError as e:
+        # Nothing ran; the agent can correct the arguments and call again
+        return {"error": str(e), "invalid_arguments": True}
+
+async def run_function_call(function_call, sts_ws, trace=None, call_sid=None):
+    started = time.monotonic()
+    func_name = function_call.name
+    func_id = function_call.id
+    try:
+        arguments = loads(function_call.arguments)
+        log.info("function_call", call_sid, function=func_name, id=func_id, arguments=arguments)
 
+        result = await execute_function_call(func_name, arguments)
     except Exception as e:
-        print(f"Error calling function: {e}")
-        error_result = create_function_call_response(
-            func_id if "func_id" in locals() else "unknown",
-            func_name if "func_name" in locals() else "unknown",
-            {"error": f"Function call failed with: {str(e)}"}
-        )
-        await sts_ws.send(json.dumps(error_result))
-
-async def handle_barge_in(decoded, twilio_ws, streamsid):
-    if decoded["type"] == "UserStartedSpeaking":
-        clear_message = {
-            "event": "clear",
-            "streamSid": streamsid
-        }
-        await twilio_ws.send(json.dumps(clear_message))
-
-async def handle_full_transcript(decoded, twilio_ws, streamsid, callsid):
-    if decoded['type'] == 'ConversationText':
-        role = decoded.get('role')
-        content = decoded.get('content', '').strip()
-        global full_transcript
-        global all_conversation
-        if role == 'user' and content:
-            print(f"\033[92mUser:\033[0m {content}")  # Green
-            # Update the full transcription
-            
-            if callsid not in full_transcript:
-                full_transcript[callsid] = ""
-            
-            full_transcript[callsid] += content
-            # print(full_transcript)
-
-            await broadcast_to_frontend({
-                "type": "transcription",
-                "data": {
-                    "call_sid": callsid,
-                    "message": full_transcript[callsid]
-                }
-            })
-
-        elif role == 'assistant' and content:
-            print(f"\033[94mAssistant:\033[0m {content}")  # Blue
-            if callsid not in all_conversation:
-                all_conversation[callsid] = []
-            
-            all_conversation[callsid].append({
-                "user_message": full_transcript.get(callsid, ""),
-                "assistant_message": content
-            })
-            await broadcast_to_frontend({
-                "type": "ai_response",
-                "data": {
-                    "call_sid": callsid,
-                    "message": content
-                }
-            })
-
-async def handle_text_message(decoded, twilio_ws, sts_ws, streamsid, callsid):
-    await handle_barge_in(decoded, twilio_ws, streamsid)
-    await handle_full_transcript(decoded, twilio_ws, streamsid, callsid)
+        log.error("function_call_error", call_sid, function=func_name, id=func_id, error=str(e))
+        result = {"error": f"Function call failed with: {str(e)}"}
+    await sts_ws.send(function_call_response(func_id, func_name, result))
+    elapsed = time.monotonic() - started
+    # Names come from the agent; keep the label set bounded
+    function_call_seconds.observe(elapsed, func_name if func_name in TOOLS else "unknown")
+    if trace is not None:
+        trace.event("function_call", name=func_name, seconds=round(elapsed, 6))
+    # The result itself (names, booking details) is redacted unless LOG_TRANSCRIPTS
+    log.info("function_result", call_sid, function=func_name, id=func_id,
+             seconds=round(elapsed, 6), ok=not (isinstance(result, dict) and "error" in result),
+             result=result)
+
+async def handle_function_call_request(event, sts_ws, trace=None, call_sid=None):
+    # All functions in one request run concurrently; each sends its own response
+    await asyncio.gather(*[
+        run_function_call(function_call, sts_ws, trace, call_sid)
+        for function_call in event.functions
+    ])
+
+async def handle_barge_in(event, outbound, trace=None):
+    if event.type == "UserStartedSpeaking":
+        started = time.monotonic()
+        # Drops the audio still queued here and sends Twilio a clear
+        dropped, unplayed = await outbound.clear()
+        barge_in_seconds.observe(time.monotonic() - started)
+        barge_in_discarded_seconds.observe(dropped + unplayed)
+        if trace is not None:
+            trace.event("barge_in", heard_frames=outbound.played_frames,
+                        dropped=round(dropped, 3), unplayed=round(unplayed, 3))
+
+async def handle_full_transcript(event, session):
+    if event.type == 'ConversationText':
+        role = event.role
+        content = event.content
+        if role not in ('user', 'assistant') or not content:
+            return
+        # Append the turn and send only the new text to the dashboard
+        transcript = session.transcript
+        turn = transcript.append(role, content)
+        log.info("transcript", session.call_sid, role=role, seq=turn["seq"], text=content)
+        if session.trace is not None:
+            session.trace.event("transcript", role=role, seq=turn["seq"])
+        await broadcast_to_frontend(transcript.delta_message(turn))
+        if session.summarizer is not None:
+            session.summarizer.on_turn()
+
+async def handle_text_message(event, outbound, sts_ws, session):
+    await handle_barge_in(event, outbound, session.trace)
+    if event.type == "AgentAudioDone":
+        outbound.finish()
+    await handle_full_transcript(event, session)
+
+    if event.type == "FunctionCallRequest":
+        await handle_function_call_request(event, sts_ws, session.trace, session.call_sid)
+
+async def until_closed(coro, reason):
+    """Run a call task; its socket closing abnormally ends the call with `reason`."""
+    try:
+        return await coro
+    except websockets.ConnectionClosed:
+        return reason
 
-    if decoded["type"] == "FunctionCallRequest":
-        await handle_function_call_request(decoded, sts_ws)
+async def replay(messages, ws):
+    """`messages` already read from `ws`, then the rest of `ws`."""
+    for message in messages:
+        yield message
+    async for message in ws:
+        yield message
 
 async def twilio_handler(twilio_ws):
+    # Calls are admitted on the start event, which carries the dialed
+    # number, and before an agent connection is taken
+    messages, start = await wait_for_start(twilio_ws, CALL_IDLE_TIMEOUT)
+    if start is None:
+        await twilio_ws.close()
+        return
+    ticket = admission.request(start.custom_parameters.get("to"))
+    try:
+        if ticket.state == "queued":
+            log.info("call_queued", start.call_sid, queued=admission.queued(), limit=admission.limit)
+            await hold(twilio_ws, MediaFrameEncoder(start.stream_sid), admission, ticket, hold_audio)
+            admission_wait_seconds.observe(time.monotonic() - ticket.queued_at)
+            if ticket.state == "queued":
+                # The caller hung up on hold
+                await twilio_ws.close()
+                return
+        if ticket.state != "admitted":
+            log.warning("call_rejected", start.call_sid, outcome=ticket.result, active=admission.active,
+                        limit=admission.limit, queued=admission.queued())
+            await reject(twilio_ws, MediaFrameEncoder(start.stream_sid), reject_audio)
+            return
+        await run_call(twilio_ws, messages)
+    finally:
+        admission.release(ticket)
+
+async def run_call(twilio_ws, first_messages):
     audio_queue = asyncio.Queue()
     streamsid_queue = asyncio.Queue()
-
-    async with sts_connect() as sts_ws:
-        config_message = load_config()
-
-        await sts_ws.send(json.dumps(config_message))
+    # The call's session; created on the Twilio start event
+    session = None
+    # Paced agent audio to Twilio; created once the stream is known
+    outbound = None
+    # Runs the call's tasks and ends them all when one finishes, the call
+    # goes idle or it runs too long
+    supervisor = CallSupervisor()
+
+    def on_speech_start():
+        speech_starts_total.inc()
+        if session is not None and session.trace is not None:
+            session.trace.event("speech_start")
+
+    # Caller audio framing, VAD and optional silence suppression
+    inbound = InboundAudio(on_speech_start=on_speech_start)
+    # Both audio channels to disk when RECORDING_DIR is set
+    recorder = None
+
+    async def forward_caller_audio(payload):
+        raw = binascii.a2b_base64(payload)
+        if recorder is not None:
+            recorder.write(CHANNEL_INBOUND, raw)
+        for frame in inbound.write(raw):
+            await audio_queue.put(frame)
+            audio_queue_depth.observe(audio_queue.qsize())
+            log.sample("caller_audio", session and session.call_sid, bytes=len(frame),
+                       queued=audio_queue.qsize())
+
+    # The connection comes with Settings already sent; the call keeps that
+    # config version even if config.json is reloaded meanwhile. Leaving the
+    # block closes the agent socket.
+    async with agent_pool.connection() as agent:
+        sts_ws = agent.ws
         async def sts_sender(sts_ws):
             while True:
                 chunk = await audio_queue.get()
                 if isinstance(chunk, bytes):  # Ensure we're sending bytes
                     await sts_ws.send(chunk)
                 else:
-                    print(f"Unexpected data type in queue: {type(chunk)}")
-                    break
+                    log.error("unexpected_audio_chunk", type=type(chunk).__name__)
+                    return "error"
 
         async def sts_receiver(sts_ws):
-            start_info = await streamsid_queue.get()  # First get the start_info
-            streamsid = start_info["streamSid"]
-            callsid = start_info["callSid"]
-            caller = start_info.get("from", "Customer")
-            callee = start_info.get("to", "AI Agent")
-            
+            nonlocal outbound
+            session = await streamsid_queue.get()  # First get the call session
+
             # Notify frontend about new call with all details
             await broadcast_to_frontend({
                 "type": "incoming_call",
                 "data": {
-                    "CallSid": callsid,
-                    "From": caller,  # Include caller number
-                    "To": callee,   # Include callee number
+                    "CallSid": session.call_sid,
+                    "From": session.caller,  # Include caller number
+                    "To": session.callee,   # Include callee number
                     "status": "in_progress",
                     "messages": []
                 }
             })
 
+            # Outbound media frames are built from a per-stream template and
+            # sent in 20 ms frames paced to real time
+            tap = None
+            if recorder is not None:
+                tap = lambda frame: recorder.write(CHANNEL_OUTBOUND, frame)
+            outbound = OutboundAudio(twilio_ws.send, MediaFrameEncoder(session.stream_sid), tap=tap)
+            outbound.start()
+
             async for message in sts_ws:
                 if isinstance(message, str):
-                    decoded = json.loads(message)
-                    await handle_text_message(decoded, twilio_ws, sts_ws, streamsid, callsid)
+                    event = decode_agent(message)
+                    if event.type == "UserStartedSpeaking" and inbound.speech_started_at is not None:
+                        speech_detect_seconds.observe(time.monotonic() - inbound.speech_started_at)
+                        inbound.speech_started_at = None
+                    await handle_text_message(event, outbound, sts_ws, session)
                     continue
-                raw_mulaw = message
 
-                media_message = {
-                    "event": "media",
-                    "streamSid": streamsid,
-                    "media": {"payload": base64.b64encode(raw_mulaw).decode("ascii")},
-                }
-
-                await twilio_ws.send(json.dumps(media_message))
-                global full_transcript
-                full_transcript[callsid] = ""
+                if agent.first_audio_at is None:
+                    agent_pool.record_first_audio(agent)
+                    first_audio_seconds.observe(agent.first_audio_at - session.started_monotonic)
+                    if session.trace is not None:
+                        session.trace.event("first_audio", pooled=agent.pooled)
+                    log.info("first_audio", session.call_sid,
+                             seconds=round(agent.first_audio_at - agent.acquired_at, 3), pooled=agent.pooled)
+                log.sample("agent_audio", session.call_sid, bytes=len(message))
+                outbound.write(message)
+            # The agent closed the connection
+            return "agent_hangup"
 
         async def twilio_receiver(twilio_ws):
-            BUFFER_SIZE = 20 * 160
-
-            inbuffer = bytearray(b"")
-            async for message in twilio_ws:
+            nonlocal session, recorder
+            async for message in replay(first_messages, twilio_ws):
+                supervisor.touch()
                 try:
-                    data = json.loads(message)
-                    event_type = data["event"]
+                    # Fast path for the 50-per-second media events
+                    payload = inbound_media_payload(message) if isinstance(message, str) else None
+                    if payload is not None:
+                        if payload:
+                            await forward_caller_audio(payload)
+                        continue
+
+                    event = decode_twilio(message)
+                    event_type = event.event
 
                     if event_type == "start":
                         # Extract custom parameters from the start event
-                        custom_params = data["start"].get("customParameters", {})
+                        custom_params = event.custom_parameters
                         from_number = custom_params.get("from", "Unknown")
                         to_number = custom_params.get("to", "Unknown")
 
-                        print("from_number:", from_number)
-                        print("to_number:", to_number)
-
-                        streamsid_queue.put_nowait({
-                            "streamSid": data["start"]["streamSid"],
-                            "callSid": data["start"]["callSid"],
-                            "from": from_number,  # Now includes the actual caller number
-                            "to": to_number      # Now includes the called number
-                        })
-
-                    elif event_type == "media" and "payload" in data["media"]:
+                        # A "trace" custom parameter forces tracing for this call
+                        call_sid = event.call_sid
+                        log.info("call_start", call_sid, stream_sid=event.stream_sid,
+                                 caller=from_number, callee=to_number)
+                        supervisor.call_id = call_sid
+                        trace = tracer.start(call_sid, force=custom_params.get("trace") in ("1", "true"))
+                        if trace is not None:
+                            trace.event("start")
+                        session = CallSession(
+                            call_sid,
+                            event.stream_sid,
+                            caller=from_number,  # Now includes the actual caller number
+                            callee=to_number,    # Now includes the called number
+                            trace=trace
+                        )
+                        session.summarizer = RollingSummarizer(
+                            call_sid, session.transcript, on_update=publish_partial_summary,
+                            limiter=summary_worker.limiter)
+                        calls_total.inc()
+                        if RECORDING_DIR:
+                            try:
+                                recorder = await CallRecorder.open(
+                                    os.path.join(RECORDING_DIR, f"{call_sid}.vrec"), call_sid)
+                                resources.acquire("recorder")
+                            except OSError as e:
+                                log.warning("recording_disabled", call_sid, error=str(e))
+                        active_sessions[session.call_sid] = session
+                        streamsid_queue.put_nowait(session)
+
+                    elif event_type == "media" and event.payload is not None:
                         # Process inbound audio only
-                        if data["media"].get("track") == "inbound":
-                            chunk = base64.b64decode(data["media"]["payload"])
-                            inbuffer.extend(chunk)
-                            
-                            # Process complete chunks
-                            while len(inbuffer) >= BUFFER_SIZE:
-                                await audio_queue.put(bytes(inbuffer[:BUFFER_SIZE]))
-                                del inbuffer[:BUFFER_SIZE]
+                        if event.track == "inbound":
+                            await forward_caller_audio(event.payload)
+
+                    elif event_type == "mark":
+                        # Twilio has played the audio sent before this mark
+                        if outbound is not None:
+                            outbound.on_mark(event.name)
 
                     elif event_type == "stop":
-                        callsid = data["stop"]["callSid"]
-                        global all_conversation
-                        
-                        try:
-                            # Get the summary and customer name from the async function
-                            summary = await generate_summary(all_conversation.get(callsid, []))
-                            
-                            # Extract customer name and conversation summary
-                            cust_name = summary.get("cust_name", "Unknown")
-                            conversation_summary = summary.get("summary", "Summary unavailable")
-                            
-                            # Print for debugging (optional)
-                            print(f"Customer Name: {cust_name}")
-                            print(f"Conversation Summary: {conversation_summary}")
-                            
-                        except Exception as e:
-                            # Handle any errors that occurred during summary generation
-                            print(f"Error during summary generation: {e}")
-                            cust_name = "Unknown"
-                            conversation_summary = "Summary unavailable"
-
-                        # Sending the summary and status to the frontend
-                        await broadcast_to_frontend({
-                            "type": "call_summary",
-                            "data": {
-                                "CallSid": callsid,
-                                "summary": conversation_summary,
-                                "name": cust_name
-                            }
-                        })
-
-                        # Broadcast the call completion status
-                        await broadcast_to_frontend({
-                            "type": "call_status",
-                            "data": {
-                                "CallSid": callsid,
-                                "CallStatus": "completed"
-                            }
-                        })
-
-                        break
+                        # Summary and persistence happen in the background;
+                        # the summary is pushed to the dashboard when ready
+                        if session is not None:
+                            await end_session(session, reason="stop")
+                        return "stop"
 
                 except Exception as e:
-                    print(f"Error in twilio_receiver: {e}")
-                    break
-        await asyncio.wait(
-            [
-                asyncio.ensure_future(sts_sender(sts_ws)),
-                asyncio.ensure_future(sts_receiver(sts_ws)),
-                asyncio.ensure_future(twilio_receiver(twilio_ws)),
-            ]
-        )
-        await twilio_ws.close()
+                    log.error("twilio_receiver_error", session and session.call_sid, error=str(e))
+                    return "error"
+            # Twilio closed the stream without a stop event
+            return "caller_hangup"
+
+        resources.acquire("call")
+        supervisor.spawn(until_closed(sts_sender(sts_ws), "agent_hangup"), "sts_sender")
+        supervisor.spawn(until_closed(sts_receiver(sts_ws), "agent_hangup"), "sts_receiver")
+        supervisor.spawn(until_closed(twilio_receiver(twilio_ws), "caller_hangup"), "twilio_receiver")
+        reason = "cancelled"
+        try:
+            # Returns when the first task ends, with the others cancelled
+            reason = await supervisor.run()
+        finally:
+            calls_ended_total.inc(reason)
+            if supervisor.stuck:
+                call_tasks_stuck_total.inc(amount=supervisor.stuck)
+            if outbound is not None:
+                await outbound.stop()
+            if recorder is not None:
+                await recorder.aclose()
+                resources.release("recorder")
+            inbound_audio_bytes.inc("sent", amount=inbound.bytes_sent)
+            inbound_audio_bytes.inc("suppressed", amount=inbound.bytes_suppressed)
+            # Covers calls that drop without a stop event
+            if session is not None:
+                failed = reason in ("error", "idle")
+                await end_session(session, "failed" if failed else "completed", reason)
+            resources.release("call")
+    await twilio_ws.close()
+
+
+async def send_call_history(websocket, request):
+    # Shared on-disk index: any worker can answer, no bus round trip needed
+    try:
+        calls, next_cursor = await call_log.page(request.get("cursor"), request.get("limit") or 50)
+    except (TypeError, ValueError):
+        return
+    frontend_clients.send_to(websocket, {
+        "type": "call_history_page",
+        "data": {"cursor": request.get("cursor"), "calls": calls, "next_cursor": next_cursor}
+    })
 
+async def send_call_detail(websocket, call_sid):
+    data = {"CallSid": call_sid, "record": None}
+    try:
+        data["record"] = await call_log.read(call_sid)
+    except (OSError, ValueError, sqlite3.Error) as e:
+        # Unreadable log or index, or a corrupt line: the dashboard still gets
+        # an answer instead of waiting on one that never comes
+        log.error("call_detail_failed", call_sid, error=str(e))
+        data["error"] = "Call record unavailable"
+    frontend_clients.send_to(websocket, {"type": "call_detail", "data": data})
+
+def decode_request(message):
+    """A dashboard or control message as a dict, or None if it is not a JSON object."""
+    try:
+        decoded = loads(message)
+    except (TypeError, ValueError):
+        return None
+    return decoded if isinstance(decoded, dict) else None
+
+def snapshot_request(decoded):
+    """(session, from_seq) for a transcript_snapshot_request, session None if
+    the call is not on this worker; None if the request is malformed."""
+    call_sid = decoded.get("call_sid")
+    if not isinstance(call_sid, str):
+        return None
+    try:
+        from_seq = int(decoded.get("from_seq") or 0)
+    except (TypeError, ValueError):
+        return None
+    return active_sessions.get(call_sid), from_seq
+
+def handle_frontend_message(websocket, message):
+    decoded = decode_request(message)
+    if decoded is None:
+        return
+    if decoded.get("type") == "call_history_request":
+        asyncio.ensure_future(send_call_history(websocket, decoded))
+        return
+    if decoded.get("type") == "call_detail_request":
+        if isinstance(decoded.get("call_sid"), str):
+            asyncio.ensure_future(send_call_detail(websocket, decoded["call_sid"]))
+        return
+    if decoded.get("type") == "transcript_snapshot_request":
+        # A dashboard that connected late or missed deltas asks for the
+        # turns after the last sequence number it applied
+        request = snapshot_request(decoded)
+        if request is None:
+            return
+        session, from_seq = request
+        if session is not None:
+            frontend_clients.send_to(websocket, session.transcript.snapshot_message(from_seq))
+        elif event_bus.shared:
+            # The call may belong to another worker; it answers on the bus
+            event_bus.publish("control", message)
+
+def handle_control_message(message, key=None):
+    decoded = decode_request(message)
+    if decoded is not None and decoded.get("type") == "transcript_snapshot_request":
+        request = snapshot_request(decoded)
+        if request is not None and request[0] is not None:
+            session, from_seq = request
+            # The requesting dashboard is on another worker, so the snapshot
+            # goes to all dashboards; clients ignore turns they already have
+            event_bus.publish("frontend", dumps(session.transcript.snapshot_message(from_seq)))
+
+event_bus.subscribe("control", handle_control_message)
 
 # WebSocket router
 async def router(websocket, path):
     if path == "/twilio":
-        print("\033[93mIncoming call on /twilio — starting Twilio handler\033[0m")
+        log.info("twilio_connected")
         await twilio_handler(websocket)
     elif path == "/frontend-updates":
-        print("\033[96mFrontend client connected\033[0m")
-        frontend_clients.add(websocket)
+        log.info("dashboard_connected")
+        frontend_clients.subscribe(websocket)
+        # Queued before any live event, with no await in between, so the
+        # client sees the state first and then every event after it
+        frontend_clients.send_to(websocket, dashboard_state.snapshot_message())
         try:
-            async for _ in websocket:
-                pass
+            async for message in websocket:
+                handle_frontend_message(websocket, message)
         finally:
-            frontend_clients.remove(websocket)
+            frontend_clients.unsubscribe(websocket)
+
+async def process_http(path, request_headers):
+    # Plain HTTP requests on the websocket port; None continues the handshake
+    if path == "/metrics":
+        return HTTPStatus.OK, [("Content-Type", CONTENT_TYPE)], registry.render().encode()
+    return None
+
+def warm_booking_tools():
+    """Open the booking store and index booked slots, when the agent can book.
+
+    Tool modules otherwise load on their first call; the slot index is built
+    here so the first caller to ask for a time does not wait for it.
+    """
+    think = (config_manager.current.settings.get("agent") or {}).get("think") or {}
+    names = {f.get("name") for f in think.get("functions") or () if isinstance(f, dict)}
+    if not any(name in TOOLS and TOOLS[name].target.startswith("agent_function:") for name in names):
+        return
+    from agent_function import get_slot_index
+    get_slot_index()
+
+async def serve(host="0.0.0.0", port=5000, reuse_port=False):
+    """Start the websocket server and its background tasks.
+
+    With reuse_port, several worker processes can listen on the same port.
+    """
+    await event_bus.start()
+    server = await websockets.serve(router, host, port, process_request=process_http,
+                                    reuse_port=reuse_port)
+    try:
+        # Build the shared OpenAI client now rather than on the first hang-up
+        get_client()
+    except Exception as e:
+        log.warning("openai_client_unavailable", error=str(e))
+    await asyncio.to_thread(warm_booking_tools)
+    asyncio.ensure_future(config_manager.watch())
+    asyncio.ensure_future(loop_lag.run())
+    asyncio.ensure_future(admission.run())
+    agent_pool.start()
+    return server
 
 # Entry point
 def main():
-    server = websockets.serve(router, "0.0.0.0", 5000)
-    print(f"Server starting on {os.getenv('BACKEND_URL')}")
-    asyncio.get_event_loop().run_until_complete(server)
-    asyncio.get_event_loop().run_forever()
+    worker_id = os.getenv('WORKER_ID')
+    if WORKERS > 1 and worker_id is None:
+        # Supervisor: runs the event hub and restarts workers that exit
+        return run_workers(os.path.abspath(__file__), WORKERS)
+    log.info("server_start", backend_url=os.getenv('BACKEND_URL'), worker=worker_id, pid=os.getpid(),
+             json_codec=json_codec.name)
+    loop = asyncio.get_event_loop()
+    loop.run_until_complete(serve(port=int(os.getenv('PORT', '5000')), reuse_port=worker_id is not None))
+    loop.run_forever()
 
 if __name__ == "__main__":
-    sys.exit(main() or 0)
\ No newline at end of file
+    sys.exit(main() or 0)
@@ -0,0 +1,129 @@
+import binascii
+import json
+
+# Twilio sends 20 ms of 8 kHz mulaw (160 bytes) per media event
+TWILIO_FRAME_BYTES = 160
+
+_MEDIA_PREFIX = '{"event":"media"'
+_PAYLOAD_KEY = '"payload":"'
+_INBOUND_TRACK = '"track":"inbound"'
+
+
+def inbound_media_payload(message):
+    """Extract the base64 payload of a Twilio media event without json.loads.
+
+    Returns the payload string for inbound media, "" for media on another
+    track, and None when the message is not a media event in Twilio's usual
+    key order (the caller should fall back to full JSON decoding).
+    """
+    if not message.startswith(_MEDIA_PREFIX):
+        return None
+    start = message.find(_PAYLOAD_KEY)
+    if start < 0:
+        return None
+    start += len(_PAYLOAD_KEY)
+    end = message.find('"', start)
+    if end < 0:
+        return None
+    if message.find(_INBOUND_TRACK) < 0:
+        return ""
+    return message[start:end]
+
+
+class FrameAssembler:
+    """Reassembles Twilio's 20 ms chunks into fixed-size upstream frames.
+
+    Audio is written into a preallocated ring buffer through a memoryview, so
+    there is no per-chunk bytearray growth or front-of-buffer memmove. Each
+    completed frame is copied out once into an immutable bytes object, which
+    is what the audio queue and the websocket need to own.
+    """
+
+    __slots__ = ("frame_size", "capacity", "_ring", "_view", "_read", "_size")
+
+    def __init__(self, frame_size, slots=4):
+        self.frame_size = frame_size
+        self.capacity = frame_size * slots
+        self._ring = bytearray(self.capacity)
+        self._view = memoryview(self._ring)
+        self._read = 0
+        self._size = 0
+
+    def __len__(self):
+        return self._size
+
+    def write(self, chunk):
+        """Copy raw audio into the ring. Returns the list of completed frames."""
+        frames = []
+        n = len(chunk)
+        offset = 0
+        while offset < n:
+            free = self.capacity - self._size
+            if free == 0:
+                frames.extend(self._take_frames())
+                continue
+            write_pos = (self._read + self._size) % self.capacity
+            count = min(n - offset, free, self.capacity - write_pos)
+            self._view[write_pos:write_pos + count] = chunk[offset:offset + count]
+            self._size += count
+            offset += count
+        frames.extend(self._take_frames())
+        return frames
+
+    def feed(self, payload):
+        """Decode a base64 media payload and return any completed frames."""
+        return self.write(binascii.a2b_base64(payload))
+
+    def _take_frames(self):
+        frames = []
+        frame_size = self.frame_size
+        while self._size >= frame_size:
+            read = self._read
+            end = read + frame_size
+            if end <= self.capacity:
+                frames.append(bytes(self._view[read:end]))
+            else:
+                first = self._view[read:]
+                frames.append(b"".join((first, self._view[:end - self.capacity])))
+            self._read = end % self.capacity
+            self._size -= frame_size
+        return frames
+
+    def flush(self):
+        """Return whatever partial frame is buffered and reset."""
+        if not self._size:
+            return b""
+        read = self._read
+        end = read + self._size
+        if end <= self.capacity:
+            data = bytes(self._view[read:end])
+        else:
+            data = b"".join((self._view[read:], self._view[:end - self.capacity]))
+        self._read = 0
+        self._size = 0
+        return data
+
+
+class MediaFrameEncoder:
+    """Builds outbound Twilio media/clear/mark messages from a per-stream template."""
+
+    __slots__ = ("stream_sid", "_prefix", "_suffix", "_clear", "_mark_prefix")
+
+    def __init__(self, stream_sid):
+        self.stream_sid = stream_sid
+        sid = json.dumps(stream_sid)
+        self._prefix = '{"event":"media","streamSid":' + sid + ',"media":{"payload":"'
+        self._suffix = '"}}'
+        self._clear = '{"event":"clear","streamSid":' + sid + '}'
+        self._mark_prefix = '{"event":"mark","streamSid":' + sid + ',"mark":{"name":'
+
+    def media(self, raw_mulaw):
+        """JSON text of a media event carrying raw_mulaw."""
+        return self._prefix + binascii.b2a_base64(raw_mulaw, newline=False).decode("ascii") + self._suffix
+
+    def clear(self):
+        return self._clear
+
+    def mark(self, name):
+        return self._mark_prefix + json.dumps(name) + '}}'
+
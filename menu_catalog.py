@@ -0,0 +1,396 @@
+import importlib.util
+import os
+import re
+import threading
+from difflib import SequenceMatcher
+
+# Restaurant menu the menu tools answer from: a .py file defining `menu`, or
+# a plain-text file in the same format
+MENU_SOURCE_FILE = os.getenv(
+    'MENU_SOURCE_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                     'ai-voice-dashboard', 'rest_menu.py'))
+# Lowest fuzzy score (0-1) accepted as a match for a dish or category name
+MENU_MATCH_THRESHOLD = float(os.getenv('MENU_MATCH_THRESHOLD', '0.75'))
+
+# Dietary tags the menu's 'Dietary:' lines may carry. A dish without the line
+# has no tags: they are never guessed from the ingredients
+DIETARY_TAGS = ("vegetarian", "vegan", "gluten-free", "non-vegetarian")
+# Words that say nothing about what is in a dish
+_FILLER = frozenset(("a", "an", "and", "or", "of", "the", "with", "mix", "blend", "fresh",
+                     "marinated", "boneless", "ground", "mashed", "long", "grain", "whole",
+                     "indian", "aromatic", "spices", "spice", "water", "salt", "sugar"))
+
+# What callers say for a category -> the word menus usually use
+CATEGORY_SYNONYMS = {"drink": "beverage", "sweet": "dessert", "starter": "appetizer",
+                     "main": "curry", "rice": "biryani"}
+
+_DISH_LINE = re.compile(r"^\s*(\d+)\.\s+(.+?)\s+-\s+\D*?([\d,]+(?:\.\d+)?)\s*$")
+_DESCRIPTION = re.compile(r"^\s*(\d+)\.\s+(.+?)\s*$")
+_FIELD = re.compile(r"^\s+([A-Za-z ]+):\s*(.+?)\s*$")
+_WORD = re.compile(r"[a-z0-9]+")
+
+
+def _stem(word):
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith("ss") and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def normalize(text):
+    """Lowercase words with simple plural stemming: 'Curries' -> 'curry'."""
+    return " ".join(_stem(w) for w in _WORD.findall(text.lower()))
+
+
+def phonetic(word):
+    """Rough sound-alike key for one word, for speech-recognition slips.
+
+    'biryani', 'biriyani' and 'briyani' share a key, as do 'jamun' and
+    'jaman'. Vowels after the first letter are dropped, common spelling
+    pairs are folded and doubled letters collapsed.
+    """
+    word = word.lower()
+    for a, b in (("ph", "f"), ("kh", "k"), ("gh", "g"), ("bh", "b"), ("dh", "d"), ("th", "t"),
+                 ("sh", "s"), ("ck", "k"), ("q", "k"), ("z", "s"), ("v", "w"), ("c", "k")):
+        word = word.replace(a, b)
+    if not word:
+        return word
+    key = [word[0]]
+    for ch in word[1:]:
+        if ch in "aeiouyh":
+            continue
+        if ch != key[-1]:
+            key.append(ch)
+    return "".join(key)
+
+
+def _trigrams(text):
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class FuzzyIndex:
+    """Name lookup that tolerates misheard or partial names.
+
+    Names are indexed by character trigram and by the phonetic key of each
+    word, so only the names sharing most with the query are scored. The
+    score is the better of whole-name similarity and the average per-word
+    similarity of the query words (spelled or phonetic) against the name's
+    words, which lets 'biryani' find 'Hyderabadi Dum Biryani'.
+    """
+
+    def __init__(self, names):
+        self.names = list(names)
+        self.normalized = [normalize(name) for name in self.names]
+        self.words = [name.split() for name in self.normalized]
+        self.keys = [[phonetic(w) for w in words] for words in self.words]
+        self.exact = {name: i for i, name in enumerate(self.normalized)}
+        self.by_trigram = {}
+        self.by_key = {}
+        for i, name in enumerate(self.normalized):
+            for gram in _trigrams(name):
+                self.by_trigram.setdefault(gram, set()).add(i)
+            for key in self.keys[i]:
+                self.by_key.setdefault(key, set()).add(i)
+
+    def _candidates(self, query, keys, limit=40):
+        counts = {}
+        for gram in _trigrams(query):
+            for i in self.by_trigram.get(gram, ()):
+                counts[i] = counts.get(i, 0) + 1
+        # A sound-alike word counts like several shared trigrams
+        for key in keys:
+            for i in self.by_key.get(key, ()):
+                counts[i] = counts.get(i, 0) + 3
+        if len(counts) <= limit:
+            return counts
+        return sorted(counts, key=counts.get, reverse=True)[:limit]
+
+    def match(self, text, limit=3):
+        """[(score, index)] of the best matches, best first."""
+        query = normalize(text)
+        if not query:
+            return []
+        exact = self.exact.get(query)
+        if exact is not None:
+            return [(1.0, exact)]
+        words = query.split()
+        keys = [phonetic(w) for w in words]
+        candidates = self._candidates(query, keys)
+        # Names share words; score each (query word, name word) pair once
+        pair_scores = [{} for _ in words]
+        whole_matcher = SequenceMatcher(None)
+        whole_matcher.set_seq2(query)
+        word_matchers = []
+        for word in words:
+            matcher = SequenceMatcher(None)
+            matcher.set_seq2(word)
+            word_matchers.append(matcher)
+        scored = []
+        for i in candidates:
+            whole_matcher.set_seq1(self.normalized[i])
+            whole = whole_matcher.ratio()
+            per_word = 0.0
+            for n, (matcher, key) in enumerate(zip(word_matchers, keys)):
+                seen = pair_scores[n]
+                best = 0.0
+                for other, other_key in zip(self.words[i], self.keys[i]):
+                    pair = seen.get(other)
+                    if pair is None:
+                        matcher.set_seq1(other)
+                        pair = matcher.ratio()
+                        if key == other_key and len(key) > 1 and pair < 0.9:
+                            pair = 0.9
+                        seen[other] = pair
+                    if pair > best:
+                        best = pair
+                per_word += best
+            # Matching only part of a long name counts for a little less
+            coverage = min(1.0, len(words) / len(self.words[i]))
+            score = max(whole, per_word / len(words) * (0.9 + 0.1 * coverage))
+            # Small whole-name term: breaks ties between names with the same
+            # words in a different order
+            scored.append((min(1.0, score + 0.05 * whole) if score < 1.0 else score, i))
+        scored.sort(reverse=True)
+        return scored[:limit]
+
+
+class Dish:
+    __slots__ = ("number", "name", "price", "category", "taste", "origin", "ingredients",
+                 "flavour", "dietary")
+
+    def __init__(self, number, name, price):
+        self.number = number
+        self.name = name
+        self.price = price
+        self.category = "Other"
+        self.taste = self.origin = self.flavour = None
+        self.ingredients = ()
+        self.dietary = ()
+
+    def summary(self):
+        return {"name": self.name, "price": self.price}
+
+    def details(self):
+        return {
+            "name": self.name,
+            "category": self.category,
+            "price": self.price,
+            "taste": self.taste,
+            "origin": self.origin,
+            "ingredients": list(self.ingredients),
+            "dietary": list(self.dietary),
+            "description": self.flavour,
+        }
+
+
+def _split_ingredients(text):
+    text = re.sub(r"\([^)]*\)", "", text)
+    parts = re.split(r",|\band\b", text.rstrip("."))
+    return tuple(p.strip() for p in parts if p.strip())
+
+
+def _ingredient_words(ingredients):
+    return {_stem(w) for phrase in ingredients for w in _WORD.findall(phrase.lower())} - _FILLER
+
+
+def _split_dietary(text):
+    return tuple(tag.strip().lower().replace(" ", "-") for tag in text.rstrip(".").split(",")
+                 if tag.strip())
+
+
+def parse_menu(text):
+    """Free-text menu -> (list of Dish, {detail name: value}).
+
+    The text has a 'Menu' list of 'N. Name - <price>' lines, a 'Menu
+    Descriptions' section of 'N. Name' headings with indented 'Field: value'
+    lines (dietary tags come only from a 'Dietary: a, b' line), and a closing 'Basic Details' section of 'Field: value' lines.
+    """
+    dishes = {}
+    details = {}
+    section = None
+    current = None
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped:
+            continue
+        lowered = stripped.lower()
+        if lowered == "menu":
+            section = "menu"
+            continue
+        if lowered == "menu descriptions":
+            section = "descriptions"
+            continue
+        if lowered.startswith("basic details"):
+            section = "details"
+            continue
+        if section == "menu":
+            match = _DISH_LINE.match(line)
+            if match:
+                number = int(match.group(1))
+                dishes[number] = Dish(number, match.group(2).strip(),
+                                      float(match.group(3).replace(",", "")))
+        elif section == "descriptions":
+            heading = _DESCRIPTION.match(line)
+            if heading and not line[0].isspace():
+                current = dishes.get(int(heading.group(1)))
+                continue
+            field = _FIELD.match(line)
+            if field and current is not None:
+                name, value = field.group(1).strip().lower(), field.group(2)
+                if name == "category":
+                    current.category = value
+                elif name == "dietary":
+                    current.dietary = _split_dietary(value)
+                elif name == "taste":
+                    current.taste = value
+                elif name == "origin":
+                    current.origin = value
+                elif name == "main ingredients":
+                    current.ingredients = _split_ingredients(value)
+                elif name in ("flavour", "flavor"):
+                    current.flavour = value
+        elif section == "details" and ":" in stripped:
+            name, value = stripped.split(":", 1)
+            if value.strip():
+                details[name.strip()] = value.strip()
+    for dish in dishes.values():
+        if dish.price.is_integer():
+            dish.price = int(dish.price)
+    return [dishes[n] for n in sorted(dishes)], details
+
+
+class MenuCatalog:
+    """The parsed menu with its lookup indexes, built once."""
+
+    def __init__(self, text):
+        self.dishes, self.details = parse_menu(text)
+        self.categories = {}
+        self.by_ingredient = {}
+        self.by_dietary = {}
+        for i, dish in enumerate(self.dishes):
+            self.categories.setdefault(dish.category, []).append(i)
+            for word in _ingredient_words(dish.ingredients):
+                self.by_ingredient.setdefault(word, []).append(i)
+            for tag in dish.dietary:
+                self.by_dietary.setdefault(tag, []).append(i)
+        self.dish_names = FuzzyIndex(dish.name for dish in self.dishes)
+        self.category_names = FuzzyIndex(self.categories)
+        self.ingredient_names = FuzzyIndex(self.by_ingredient)
+
+    @classmethod
+    def from_file(cls, path=MENU_SOURCE_FILE):
+        if path.endswith(".py"):
+            spec = importlib.util.spec_from_file_location("rest_menu", path)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            return cls(module.menu)
+        with open(path, encoding="utf-8") as f:
+            return cls(f.read())
+
+    def _best(self, index, text):
+        """(name, None) for a confident match, else (None, close names)."""
+        matches = index.match(text)
+        if not matches:
+            return None, []
+        best, i = matches[0]
+        if best >= MENU_MATCH_THRESHOLD:
+            # A near-tie (e.g. 'chicken') is ambiguous; let the caller ask
+            if len(matches) == 1 or best - matches[1][0] >= 0.05 or best == 1.0:
+                return index.names[i], None
+        return None, [index.names[i] for score, i in matches
+                      if score >= max(MENU_MATCH_THRESHOLD * 0.6, best - 0.15)]
+
+    def category_list(self):
+        return [{"name": name, "dishes": len(ids)} for name, ids in self.categories.items()]
+
+    def dishes_in(self, class_name):
+        query = " ".join(CATEGORY_SYNONYMS.get(w, w) for w in normalize(class_name).split())
+        name, suggestions = self._best(self.category_names, query)
+        if name is None:
+            return {"error": f"No menu category called '{class_name}'.",
+                    "categories": list(self.categories)}
+        return {"category": name,
+                "dishes": [self.dishes[i].summary() for i in self.categories[name]]}
+
+    def dish(self, dish_name):
+        name, suggestions = self._best(self.dish_names, dish_name)
+        if name is None:
+            if suggestions:
+                return {"error": f"'{dish_name}' is not clear.", "did_you_mean": suggestions}
+            return {"error": f"No dish called '{dish_name}' on the menu."}
+        return self.dishes[self.dish_names.exact[normalize(name)]].details()
+
+    def find(self, ingredient=None, dietary=None):
+        ids = None
+        result = {}
+        if ingredient:
+            matched = []
+            for word in normalize(ingredient).split():
+                if word in self.by_ingredient:
+                    matched.append(word)
+                    continue
+                name, _ = self._best(self.ingredient_names, word)
+                if name is not None:
+                    matched.append(name)
+            if not matched:
+                return {"error": f"No dish lists '{ingredient}' as a main ingredient.", "dishes": []}
+            for word in matched:
+                found = set(self.by_ingredient[word])
+                ids = found if ids is None else ids & found
+            result["ingredient"] = " ".join(matched)
+        if dietary:
+            tag = normalize(dietary).replace(" ", "-").replace("veg-", "vegetarian-")
+            tag = {"veg": "vegetarian", "non-veg": "non-vegetarian", "gluten-free": "gluten-free"}.get(tag, tag)
+            if tag not in self.by_dietary and tag not in DIETARY_TAGS:
+                return {"error": f"Unknown dietary option '{dietary}'.",
+                        "options": list(dict.fromkeys((*DIETARY_TAGS, *self.by_dietary)))}
+            found = set(self.by_dietary.get(tag, ()))
+            ids = found if ids is None else ids & found
+            result["dietary"] = tag
+            result["note"] = ("Only dishes the menu marks with this tag; "
+                              "guests with allergies should tell the staff.")
+        if ids is None:
+            ids = range(len(self.dishes))
+        result["dishes"] = [self.dishes[i].summary() for i in sorted(ids)]
+        return result
+
+    def prompt_details(self):
+        """The restaurant's basic details: all a prompt needs when the menu tools are used."""
+        return "\n".join(f"{name}: {value}" for name, value in self.details.items())
+
+
+_catalog = None
+_catalog_lock = threading.Lock()
+
+
+def get_menu_catalog():
+    """Parse the menu on first use."""
+    global _catalog
+    with _catalog_lock:
+        if _catalog is None:
+            _catalog = MenuCatalog.from_file()
+    return _catalog
+
+
+def get_menu_classes():
+    """Menu categories and how many dishes each has."""
+    return {"categories": get_menu_catalog().category_list()}
+
+
+def get_dishes_in_class(class_name):
+    """Dishes and prices in one menu category (name matched loosely)."""
+    return get_menu_catalog().dishes_in(class_name)
+
+
+def get_dish_details(dish_name):
+    """Everything the menu says about one dish, matched loosely by name."""
+    return get_menu_catalog().dish(dish_name)
+
+
+def find_dishes(ingredient=None, dietary=None):
+    """Dishes containing an ingredient and/or carrying a dietary tag."""
+    return get_menu_catalog().find(ingredient, dietary)
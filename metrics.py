@@ -0,0 +1,218 @@
+import asyncio
+import os
+import random
+import time
+from bisect import bisect_left
+
+# Fraction of calls that record a per-call event trace (0 disables tracing)
+TRACE_SAMPLE_RATE = float(os.getenv('TRACE_SAMPLE_RATE', '0'))
+# Where finished call traces are appended, one JSON record per line
+TRACE_FILE = os.getenv('TRACE_FILE', 'call_traces.jsonl')
+# Seconds between event-loop lag samples
+LOOP_LAG_INTERVAL = float(os.getenv('LOOP_LAG_INTERVAL', '0.25'))
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Bucket bounds in seconds
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+FAST_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25)
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100, 250)
+
+
+def _format_labels(names, values, extra=""):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    """A count that is incremented, or read from `fn` at scrape time.
+
+    `fn` returns {label values tuple: count}, for counts kept elsewhere.
+    """
+
+    __slots__ = ("name", "help", "labelnames", "values", "fn")
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.fn = fn
+
+    def inc(self, *labels, amount=1):
+        self.values[labels] = self.values.get(labels, 0) + amount
+
+    def samples(self):
+        values = self.values if self.fn is None else self.fn()
+        for labels, value in values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Gauge:
+    """A value that is set directly, or read from `fn` at scrape time.
+
+    With labelnames, `fn` returns {label values tuple: value}.
+    """
+
+    __slots__ = ("name", "help", "labelnames", "values", "fn")
+    kind = "gauge"
+
+    def __init__(self, name, help, labelnames=(), fn=None):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.values = {}
+        self.fn = fn
+
+    def set(self, value, *labels):
+        self.values[labels] = value
+
+    def samples(self):
+        if self.fn is not None and self.labelnames:
+            for labels, value in self.fn().items():
+                yield self.name, _format_labels(self.labelnames, labels), value
+        elif self.fn is not None:
+            yield self.name, "", self.fn()
+        for labels, value in self.values.items():
+            yield self.name, _format_labels(self.labelnames, labels), value
+
+
+class Histogram:
+    """Cumulative-bucket histogram; observe() is a bisect and two adds."""
+
+    __slots__ = ("name", "help", "labelnames", "buckets", "series")
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts (+Inf last), sum]
+        self.series = {}
+
+    def observe(self, value, *labels):
+        series = self.series.get(labels)
+        if series is None:
+            series = self.series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1] += value
+
+    def samples(self):
+        bounds = self.buckets + (float("inf"),)
+        for labels, (counts, total) in self.series.items():
+            cumulative = 0
+            for bound, count in zip(bounds, counts):
+                cumulative += count
+                le = f'le="{_format_value(bound)}"'
+                yield (f"{self.name}_bucket",
+                       _format_labels(self.labelnames, labels, le), cumulative)
+            yield f"{self.name}_sum", _format_labels(self.labelnames, labels), total
+            yield f"{self.name}_count", _format_labels(self.labelnames, labels), cumulative
+
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labelnames=(), fn=None):
+        return self.register(Counter(name, help, labelnames, fn))
+
+    def gauge(self, name, help, labelnames=(), fn=None):
+        return self.register(Gauge(name, help, labelnames, fn))
+
+    def histogram(self, name, help, buckets=LATENCY_BUCKETS, labelnames=()):
+        return self.register(Histogram(name, help, buckets, labelnames))
+
+    def render(self):
+        """Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                lines.append(f"{name}{labels} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping task."""
+
+    def __init__(self, histogram, interval=LOOP_LAG_INTERVAL):
+        self.histogram = histogram
+        self.interval = interval
+        self.last = 0.0
+        self.max = 0.0
+        # Largest lag since the last take_recent()
+        self.recent = 0.0
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - start - self.interval)
+            self.last = lag
+            if lag > self.max:
+                self.max = lag
+            if lag > self.recent:
+                self.recent = lag
+            self.histogram.observe(lag)
+
+    def take_recent(self):
+        """The largest lag since the previous call."""
+        recent, self.recent = self.recent, 0.0
+        return recent
+
+
+class CallTrace:
+    """Timestamped events for one sampled call, relative to the trace start."""
+
+    __slots__ = ("call_sid", "started_at", "_start", "events")
+
+    def __init__(self, call_sid):
+        self.call_sid = call_sid
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self.events = []
+
+    def event(self, event, **fields):
+        self.events.append([round(time.monotonic() - self._start, 6), event, fields or None])
+
+    def to_record(self):
+        return {"CallSid": self.call_sid, "started_at": self.started_at, "events": self.events}
+
+
+class Tracer:
+    """Decides per call whether to record a CallTrace.
+
+    A call is traced with probability `sample_rate`, or always when `force`
+    is set (e.g. from a Twilio custom parameter).
+    """
+
+    def __init__(self, sample_rate=TRACE_SAMPLE_RATE):
+        self.sample_rate = sample_rate
+        self.started = 0
+
+    def start(self, call_sid, force=False):
+        if not force and (self.sample_rate <= 0 or random.random() >= self.sample_rate):
+            return None
+        self.started += 1
+        return CallTrace(call_sid)
@@ -0,0 +1,184 @@
+import asyncio
+import os
+from collections import deque
+
+from media_codec import TWILIO_FRAME_BYTES
+
+# Seconds of agent audio allowed to sit in Twilio's playback buffer ahead of
+# what the caller is hearing; everything beyond that is held locally
+OUTBOUND_AUDIO_LEAD = float(os.getenv('OUTBOUND_AUDIO_LEAD', '0.1'))
+# Seconds of audio between Twilio mark events
+OUTBOUND_MARK_INTERVAL = float(os.getenv('OUTBOUND_MARK_INTERVAL', '0.2'))
+
+FRAME_SECONDS = 0.02
+# mulaw silence, used to pad the last partial frame of an utterance
+SILENCE_BYTE = b"\xff"
+
+
+class OutboundAudio:
+    """Paces agent audio to a Twilio stream in real time.
+
+    Agent audio arrives in bursts of arbitrary size. It is appended to one
+    buffer and sent as 20 ms media frames, staying at most `lead` seconds
+    ahead of playback, so a barge-in only has to discard what is still held
+    here. A mark is sent every `mark_interval` seconds and at the end of each
+    utterance; Twilio echoes a mark once the audio before it has played,
+    which tells us how far the caller actually got.
+
+    `tap`, if given, is called with each frame (a memoryview valid only for
+    the duration of the call) as it is sent, e.g. to record the call.
+    """
+
+    def __init__(self, send, encoder, lead=OUTBOUND_AUDIO_LEAD,
+                 mark_interval=OUTBOUND_MARK_INTERVAL, frame_bytes=TWILIO_FRAME_BYTES, tap=None):
+        self.send = send
+        self.encoder = encoder
+        self.tap = tap
+        self.lead = lead
+        self.frame_bytes = frame_bytes
+        self.mark_every = max(1, round(mark_interval / FRAME_SECONDS))
+        self._buffer = bytearray()
+        # Absolute byte positions: _base is the position of _buffer[0]
+        self._base = 0
+        self._read = 0
+        # Positions where an utterance ended and a mark is due
+        self._utterance_ends = deque()
+        # Loop time at which the next frame sent will start playing
+        self._play_at = 0.0
+        self._since_mark = 0
+        self._mark_seq = 0
+        # Outstanding mark name -> frames sent before it
+        self._marks = {}
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self.sent_frames = 0
+        self.played_frames = 0
+        self.dropped_frames = 0
+        self.clears = 0
+        self.peak_buffered = 0
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    @property
+    def buffered(self):
+        """Bytes received from the agent and not yet sent to Twilio."""
+        return self._base + len(self._buffer) - self._read
+
+    def write(self, chunk):
+        """Queue agent audio (raw mulaw) for paced sending."""
+        self._buffer += chunk
+        buffered = self.buffered
+        if buffered > self.peak_buffered:
+            self.peak_buffered = buffered
+        self._wakeup.set()
+
+    def finish(self):
+        """End of an utterance: pad the last frame and mark the end."""
+        partial = self.buffered % self.frame_bytes
+        if partial:
+            self._buffer += SILENCE_BYTE * (self.frame_bytes - partial)
+        self._utterance_ends.append(self._base + len(self._buffer))
+        self._wakeup.set()
+
+    async def clear(self):
+        """Barge-in: drop queued audio and tell Twilio to drop its buffer.
+
+        Returns (dropped, unplayed): seconds of audio discarded locally, and
+        the estimated seconds already sent but not yet heard by the caller.
+        """
+        loop = asyncio.get_running_loop()
+        dropped = -(-self.buffered // self.frame_bytes)
+        unplayed = min(self.sent_frames - self.played_frames,
+                       max(0, round((self._play_at - loop.time()) / FRAME_SECONDS)))
+        self.dropped_frames += dropped
+        self.played_frames = self.sent_frames - unplayed
+        self.clears += 1
+        self._buffer = bytearray()
+        self._base = self._read = 0
+        self._utterance_ends.clear()
+        # Twilio returns pending marks on clear; they do not mean "played"
+        self._marks.clear()
+        self._play_at = 0.0
+        self._since_mark = 0
+        await self.send(self.encoder.clear())
+        return dropped * FRAME_SECONDS, unplayed * FRAME_SECONDS
+
+    def on_mark(self, name):
+        """Twilio played everything sent before mark `name`."""
+        played = self._marks.pop(name, None)
+        if played is None:
+            return
+        # Marks are echoed in order, so any older ones are implied
+        for older in [n for n, frames in self._marks.items() if frames <= played]:
+            del self._marks[older]
+        if played > self.played_frames:
+            self.played_frames = played
+
+    async def _send_mark(self):
+        self._mark_seq += 1
+        name = str(self._mark_seq)
+        self._marks[name] = self.sent_frames
+        self._since_mark = 0
+        await self.send(self.encoder.mark(name))
+
+    def _compact(self):
+        # Release sent bytes once they make up most of the buffer
+        offset = self._read - self._base
+        if offset > 65536 and offset * 2 > len(self._buffer):
+            del self._buffer[:offset]
+            self._base = self._read
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        frame_bytes = self.frame_bytes
+        while True:
+            if self._utterance_ends and self._read >= self._utterance_ends[0]:
+                self._utterance_ends.popleft()
+                await self._send_mark()
+                continue
+            if self.buffered < frame_bytes:
+                self._wakeup.clear()
+                await self._wakeup.wait()
+                continue
+
+            now = loop.time()
+            if self._play_at < now:
+                # Playback has caught up with us; the caller hears silence
+                self._play_at = now
+            ahead = self._play_at - now - self.lead
+            if ahead > 0:
+                await asyncio.sleep(ahead)
+                continue
+
+            start = self._read - self._base
+            frame = memoryview(self._buffer)[start:start + frame_bytes]
+            message = self.encoder.media(frame)
+            if self.tap is not None:
+                self.tap(frame)
+            frame.release()
+            self._read += frame_bytes
+            self._play_at += FRAME_SECONDS
+            self.sent_frames += 1
+            self._since_mark += 1
+            self._compact()
+            await self.send(message)
+            if self._since_mark >= self.mark_every:
+                await self._send_mark()
+
+    def snapshot(self):
+        return {
+            "buffered": self.buffered,
+            "peak_buffered": self.peak_buffered,
+            "sent_frames": self.sent_frames,
+            "played_frames": self.played_frames,
+            "dropped_frames": self.dropped_frames,
+            "clears": self.clears,
+        }
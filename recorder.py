@@ -0,0 +1,250 @@
+"""Per-call dual-channel recordings and their export to stereo WAV.
+
+Usage:
+    python recorder.py export recordings/CA123.vrec CA123.wav
+
+A recording file is a 128-byte header followed by fixed-size segments of
+records. Each record is an 8-byte header (channel, flags, payload length,
+milliseconds since the call started) and the raw mulaw payload. Records never
+straddle a segment; a zero channel byte marks the unused end of a segment.
+"""
+import argparse
+import asyncio
+import errno
+import mmap
+import os
+import struct
+import time
+import wave
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+
+from structured_log import log
+from vad import MULAW_DECODE
+
+# Directory for call recordings; recording is off when unset
+RECORDING_DIR = os.getenv('RECORDING_DIR')
+# Bytes mapped per call at any time; about 30 s of two-channel audio
+RECORDING_SEGMENT_BYTES = int(os.getenv('RECORDING_SEGMENT_BYTES', str(512 * 1024)))
+
+MAGIC = b"VREC"
+VERSION = 1
+HEADER = struct.Struct("<4sHHIdQ64s")
+HEADER_BYTES = 128
+RECORD = struct.Struct("<BBHI")
+
+CHANNEL_INBOUND = 1   # caller, as received from Twilio
+CHANNEL_OUTBOUND = 2  # agent, as sent to Twilio
+
+SAMPLE_RATE = 8000
+# Arrival jitter tolerated before a gap is treated as real silence (samples)
+JITTER_SAMPLES = 480
+MULAW_SILENCE = b"\xff"
+
+# Reserves and maps upcoming segments so rollover never waits on the disk
+_reserver = ThreadPoolExecutor(max_workers=2, thread_name_prefix="recorder")
+
+
+def _reserve(fd, offset, length):
+    """Allocate the disk blocks of [offset, offset + length) of the file.
+
+    Without posix_fallocate (macOS) or on a filesystem that does not support
+    it, the file is only extended, so a full disk shows up on write-back
+    rather than here.
+    """
+    if hasattr(os, "posix_fallocate"):
+        try:
+            os.posix_fallocate(fd, offset, length)
+            return
+        except OSError as e:
+            if e.errno != errno.EOPNOTSUPP:
+                raise
+    if os.fstat(fd).st_size < offset + length:
+        os.ftruncate(fd, offset + length)
+
+
+def _map_segment(fd, offset, length):
+    _reserve(fd, offset, length)
+    return mmap.mmap(fd, length, offset=offset)
+
+
+class CallRecorder:
+    """Writes both audio channels of one call into a memory-mapped file.
+
+    One segment is written at a time and each segment's disk blocks are
+    reserved up front, so memory per call stays constant however long the
+    call runs, and a full disk turns into an OSError on rollover (recording
+    stops) instead of a SIGBUS on write. The next segment is reserved and
+    mapped by a background thread while the current one fills, so rollover
+    only swaps mappings. write() is a struct pack and a memcpy into the
+    mapping; the kernel writes the pages back. Create recorders with
+    open() and end them with aclose() from the event loop: file setup and
+    teardown touch the disk.
+    """
+
+    def __init__(self, path, call_sid, segment_bytes=RECORDING_SEGMENT_BYTES):
+        if segment_bytes % mmap.ALLOCATIONGRANULARITY:
+            raise ValueError("segment_bytes must be a multiple of the mmap allocation granularity")
+        self.path = path
+        self.segment_bytes = segment_bytes
+        self.started_at = time.time()
+        self._start = time.monotonic()
+        self._fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        self._segment = 0
+        self._next = None
+        self.bytes_written = 0
+        self.failed = False
+        try:
+            self._map = _map_segment(self._fd, 0, segment_bytes)
+        except OSError:
+            os.close(self._fd)
+            raise
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, 2, segment_bytes, self.started_at, 0,
+                         call_sid.encode()[:64])
+        self._pos = HEADER_BYTES
+        self._reserve_next()
+
+    @classmethod
+    async def open(cls, path, call_sid, segment_bytes=RECORDING_SEGMENT_BYTES):
+        """A new recorder, with the file created and mapped off the event loop."""
+        return await asyncio.to_thread(cls, path, call_sid, segment_bytes)
+
+    def _reserve_next(self):
+        offset = (self._segment + 1) * self.segment_bytes
+        self._next = _reserver.submit(_map_segment, self._fd, offset, self.segment_bytes)
+
+    def _map_next_segment(self):
+        self._map.close()
+        self._map = None
+        # Mapped in the background long ago unless the disk is slower than
+        # a segment of audio; raises the reservation's OSError, if any
+        next_map, self._next = self._next.result(), None
+        self._map = next_map
+        self._segment += 1
+        self._pos = 0
+        self._reserve_next()
+
+    def write(self, channel, data):
+        """Append one chunk of raw mulaw for `channel`."""
+        if self._map is None:
+            return
+        size = len(data)
+        end = self._pos + RECORD.size + size
+        if end > self.segment_bytes:
+            if RECORD.size + size > self.segment_bytes:
+                half = size // 2
+                self.write(channel, data[:half])
+                self.write(channel, data[half:])
+                return
+            try:
+                self._map_next_segment()
+            except OSError as e:
+                log.error("recording_stopped", path=self.path, error=str(e))
+                self.failed = True
+                self._map = None
+                return
+            end = RECORD.size + size
+        RECORD.pack_into(self._map, self._pos, channel, 0, size,
+                         int((time.monotonic() - self._start) * 1000))
+        self._map[self._pos + RECORD.size:end] = data
+        self._pos = end
+        self.bytes_written += RECORD.size + size
+
+    def close(self):
+        """Unmap and trim the file to the bytes actually used."""
+        if self._fd is None:
+            return
+        if self._next is not None:
+            try:
+                self._next.result().close()
+            except OSError:
+                pass
+            self._next = None
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+            os.ftruncate(self._fd, self._segment * self.segment_bytes + self._pos)
+        os.close(self._fd)
+        self._fd = None
+
+    async def aclose(self):
+        """close() off the event loop."""
+        await asyncio.to_thread(self.close)
+
+
+def read_recording(path):
+    """Return (header dict, iterator of (channel, ms, payload) records)."""
+    with open(path, "rb") as f:
+        data = f.read()
+    magic, version, _, segment_bytes, started_at, _, call_sid = HEADER.unpack_from(data, 0)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError(f"{path} is not a call recording")
+    header = {"call_sid": call_sid.rstrip(b"\0").decode(), "started_at": started_at,
+              "segment_bytes": segment_bytes}
+
+    def records():
+        pos = HEADER_BYTES
+        while pos + RECORD.size <= len(data):
+            channel, _, size, ms = RECORD.unpack_from(data, pos)
+            if channel == 0:
+                # Unused end of a segment; continue at the next one
+                pos = (pos // segment_bytes + 1) * segment_bytes
+                continue
+            start = pos + RECORD.size
+            yield channel, ms, data[start:start + size]
+            pos = start + size
+
+    return header, records()
+
+
+def _place(track, cursor, ms, payload):
+    # Chunks normally follow each other; only a gap longer than the arrival
+    # jitter is kept as silence, so the track stays aligned to the call clock
+    at = ms * SAMPLE_RATE // 1000
+    if at - cursor > JITTER_SAMPLES:
+        track.extend(MULAW_SILENCE * (at - cursor))
+        cursor = at
+    track.extend(payload)
+    return cursor + len(payload)
+
+
+def export_wav(path, wav_path):
+    """Write a 16-bit stereo WAV (left: caller, right: agent). Returns seconds."""
+    header, records = read_recording(path)
+    tracks = {CHANNEL_INBOUND: bytearray(), CHANNEL_OUTBOUND: bytearray()}
+    cursors = {CHANNEL_INBOUND: 0, CHANNEL_OUTBOUND: 0}
+    for channel, ms, payload in records:
+        if channel in tracks:
+            cursors[channel] = _place(tracks[channel], cursors[channel], ms, payload)
+
+    length = max(len(track) for track in tracks.values())
+    decode = MULAW_DECODE
+    frames = array("h", [0]) * (length * 2)
+    for offset, channel in ((0, CHANNEL_INBOUND), (1, CHANNEL_OUTBOUND)):
+        track = tracks[channel]
+        samples = array("h", map(decode.__getitem__, track))
+        samples.extend([0] * (length - len(samples)))
+        frames[offset::2] = samples
+
+    with wave.open(wav_path, "wb") as wav:
+        wav.setnchannels(2)
+        wav.setsampwidth(2)
+        wav.setframerate(SAMPLE_RATE)
+        wav.writeframes(frames.tobytes())
+    return length / SAMPLE_RATE
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+    export = commands.add_parser("export", help="convert a recording to stereo WAV")
+    export.add_argument("recording")
+    export.add_argument("wav")
+    args = parser.parse_args()
+
+    seconds = export_wav(args.recording, args.wav)
+    print(f"Wrote {args.wav} ({seconds:.1f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,266 @@
+import asyncio
+import os
+import re
+
+from generate_summary import request_summary_update
+from structured_log import log
+
+# Fold new turns into the running summary every this many turns during the
+# call (0: only at hang-up)
+SUMMARY_ROLLING_TURNS = int(os.getenv('SUMMARY_ROLLING_TURNS', '6'))
+# Prompt budget per update in estimated tokens (summary so far + new turns);
+# a longer backlog is folded in several updates
+SUMMARY_UPDATE_TOKENS = int(os.getenv('SUMMARY_UPDATE_TOKENS', '800'))
+# Reply budget per update
+SUMMARY_UPDATE_MAX_TOKENS = int(os.getenv('SUMMARY_UPDATE_MAX_TOKENS', '300'))
+# Seconds a mid-call update may take before its turns are folded locally
+SUMMARY_UPDATE_TIMEOUT = float(os.getenv('SUMMARY_UPDATE_TIMEOUT', '10'))
+# Key sentences kept per fold by the local extractive fallback
+SUMMARY_FALLBACK_SENTENCES = int(os.getenv('SUMMARY_FALLBACK_SENTENCES', '4'))
+
+FIELDS = ("cust_name", "summary", "symptoms", "treatment")
+
+_NAME = re.compile(r"\b(?i:my name is|my name's|this is|i am|i'm|call me)\s+([A-Z][a-z]+(?: [A-Z][a-z]+)?)")
+# Capitalized words that follow "I'm"/"this is" without being names
+_NOT_NAMES = frozenset(("Calling", "Looking", "Interested", "Having", "Trying", "Just", "Not",
+                        "Good", "Fine", "Sorry", "Here", "Still", "Really", "The", "A"))
+_SYMPTOM = re.compile(r"\b(?:pain\w*|hurts?|hurting|aches?|aching|sore\w*|stiff\w*|swell\w*|swollen|"
+                      r"injur\w*|sprain\w*|arthritis|tendon\w*|numb\w*|discomfort|tear|torn)\b", re.I)
+_KEY = re.compile(r"\b(?:book\w*|appointment|schedul\w*|email\w*|guide|address|cancel\w*|"
+                  r"monday|tuesday|wednesday|thursday|friday|saturday|tomorrow|\d{1,2}(?::\d\d)? ?[ap]\.?m)\b", re.I)
+_SENTENCES = re.compile(r"(?<=[.!?])\s+")
+TREATMENT_ALIASES = (
+    ("PRP", re.compile(r"\bprp\b|platelet", re.I)),
+    ("Lasers", re.compile(r"\blasers?\b", re.I)),
+    ("Non-Operative Orthopedics", re.compile(r"non[- ]?operative", re.I)),
+)
+
+
+def estimate_tokens(text):
+    return len(text) // 4 + 1
+
+
+def format_turns(turns):
+    return "".join(f"{'USER' if turn['role'] == 'user' else 'ASSISTANT'}: {turn['text']}\n"
+                   for turn in turns)
+
+
+def _clip(text, limit):
+    return text if len(text) <= limit else text[:limit - 3].rstrip() + "..."
+
+
+class SummaryState:
+    """The running summary of one call and the fields extracted so far."""
+
+    __slots__ = ("cust_name", "summary", "symptoms", "treatment", "notes", "folded_seq",
+                 "updates", "fallbacks")
+
+    def __init__(self):
+        self.cust_name = None
+        # The LLM's summary; empty until an LLM update succeeds
+        self.summary = ""
+        self.symptoms = None
+        self.treatment = None
+        # Key sentences from folds done without the LLM, newest last
+        self.notes = []
+        # Last transcript sequence number folded into the summary
+        self.folded_seq = 0
+        self.updates = 0
+        self.fallbacks = 0
+
+    def text(self):
+        summary = self.summary
+        if not summary and (self.notes or self.symptoms or self.treatment or self.cust_name):
+            summary = f"{self.cust_name or 'The customer'} called"
+            if self.symptoms:
+                summary += f" about {_clip(self.symptoms, 120)}"
+            if self.treatment:
+                summary += f" (treatment discussed: {self.treatment})"
+            summary += "."
+        if self.notes:
+            summary = f"{summary} Customer said: {' '.join(self.notes)}"
+        return summary
+
+    def fields(self):
+        return {"cust_name": self.cust_name, "summary": self.text(), "symptoms": self.symptoms,
+                "treatment": self.treatment}
+
+    def merge(self, result):
+        """Take the LLM's updated fields; a field it left out keeps its value."""
+        for name in FIELDS:
+            value = result.get(name)
+            if isinstance(value, str) and value.strip() and value.strip().lower() not in ("null", "unknown"):
+                setattr(self, name, value.strip())
+        if self.summary:
+            # The LLM was given the notes as part of the summary so far
+            self.notes = []
+
+    def result(self):
+        """The {'cust_name', 'summary', ...} dict published for the call."""
+        summary = self.text()
+        if not summary:
+            summary = "No conversation to summarize." if not self.folded_seq else "No details captured."
+        return {
+            "cust_name": self.cust_name or "Unknown",
+            "summary": summary,
+            "symptoms": self.symptoms,
+            "treatment": self.treatment,
+        }
+
+
+def extractive_fold(state, turns, max_sentences=SUMMARY_FALLBACK_SENTENCES):
+    """Fold turns into the state without the LLM: regex fields and key sentences."""
+    key_sentences = []
+    for turn in turns:
+        text = turn["text"]
+        for name, pattern in TREATMENT_ALIASES:
+            if pattern.search(text):
+                state.treatment = name
+        if turn["role"] != "user":
+            continue
+        match = _NAME.search(text)
+        if match is not None and match.group(1).split()[0] not in _NOT_NAMES:
+            state.cust_name = match.group(1)
+        for sentence in _SENTENCES.split(text):
+            sentence = sentence.strip()
+            if _SYMPTOM.search(sentence):
+                symptom = _clip(sentence, 100)
+                if state.symptoms is None:
+                    state.symptoms = symptom
+                elif symptom not in state.symptoms and len(state.symptoms) < 200:
+                    state.symptoms = f"{state.symptoms}; {symptom}"
+                key_sentences.append(sentence)
+            elif _KEY.search(sentence):
+                key_sentences.append(sentence)
+    notes = state.notes
+    for sentence in key_sentences:
+        sentence = _clip(sentence, 160)
+        if sentence not in notes:
+            notes.append(sentence)
+    # The latest key sentences say the most about where the call ended up
+    del notes[:-max_sentences]
+    state.fallbacks += 1
+
+
+class RollingSummarizer:
+    """Summarizes a call while it is in progress.
+
+    `on_turn()` is called after each transcript turn; every `every` turns
+    the new turns are folded into the running summary in the background,
+    in updates that fit `budget` tokens. A mid-call update that fails is
+    folded with the extractive fallback so the summary keeps up. At
+    hang-up `finish()` folds only the remaining tail; `fallback()` does
+    that locally when the LLM is unavailable.
+    """
+
+    def __init__(self, call_sid, transcript, update=request_summary_update, on_update=None,
+                 every=SUMMARY_ROLLING_TURNS, budget=SUMMARY_UPDATE_TOKENS,
+                 max_tokens=SUMMARY_UPDATE_MAX_TOKENS, timeout=SUMMARY_UPDATE_TIMEOUT, limiter=None):
+        self.call_sid = call_sid
+        self.transcript = transcript
+        self.update = update
+        self.on_update = on_update
+        self.every = every
+        self.budget = budget
+        self.max_tokens = max_tokens
+        self.timeout = timeout
+        # Shared semaphore capping LLM requests across calls
+        self.limiter = limiter
+        self.state = SummaryState()
+        self._task = None
+        # True while the background update has an LLM request in flight
+        self._requesting = False
+        self._finishing = False
+
+    def on_turn(self):
+        """Start a background update when enough new turns have arrived."""
+        if (self.every and self._task is None and not self._finishing
+                and self.transcript.last_seq - self.state.folded_seq >= self.every):
+            self._task = asyncio.ensure_future(self._rolling_update())
+
+    async def _rolling_update(self):
+        try:
+            try:
+                await asyncio.wait_for(self._fold(self.transcript.last_seq), self.timeout)
+            except Exception as e:
+                log.warning("rolling_summary_failed", self.call_sid, error=str(e) or type(e).__name__)
+                self._fold_locally(self.transcript.last_seq)
+            # Once the call has ended only the final summary is published
+            if self.on_update is not None and not self._finishing:
+                try:
+                    await self.on_update(self.call_sid, self.state.result())
+                except Exception as e:
+                    log.error("rolling_summary_publish_error", self.call_sid, error=str(e))
+        finally:
+            self._task = None
+        # Turns that arrived during the update
+        self.on_turn()
+
+    def _pending(self, up_to):
+        return [turn for turn in self.transcript.since(self.state.folded_seq) if turn["seq"] <= up_to]
+
+    def _next_chunk(self, turns):
+        """Leading turns that fit the budget next to the summary so far (at least one)."""
+        room = self.budget - estimate_tokens(str(self.state.fields()))
+        chunk, text = [], ""
+        for turn in turns:
+            line = format_turns([turn])
+            if chunk and estimate_tokens(text + line) > room:
+                break
+            chunk.append(turn)
+            text += line
+        # One oversized turn is cut to the budget
+        limit = max(room, 64) * 4
+        return chunk, (text if len(text) <= limit else text[:limit])
+
+    async def _fold(self, up_to, limited=True):
+        turns = self._pending(up_to)
+        while turns:
+            chunk, text = self._next_chunk(turns)
+            if limited and self.limiter is not None:
+                async with self.limiter:
+                    self._requesting = True
+                    try:
+                        result = await self.update(self.state.fields(), text, self.max_tokens)
+                    finally:
+                        self._requesting = False
+            else:
+                result = await self.update(self.state.fields(), text, self.max_tokens)
+            self.state.merge(result)
+            self.state.folded_seq = chunk[-1]["seq"]
+            self.state.updates += 1
+            turns = turns[len(chunk):]
+
+    def _fold_locally(self, up_to):
+        turns = self._pending(up_to)
+        if turns:
+            extractive_fold(self.state, turns)
+            self.state.folded_seq = turns[-1]["seq"]
+
+    async def finish(self):
+        """Fold the tail left at hang-up and return the final summary.
+
+        LLM errors propagate so the summary worker can retry. The worker
+        already holds a slot of the shared limiter while this runs.
+        """
+        self._finishing = True
+        task = self._task
+        if task is not None:
+            if not self._requesting:
+                # Still waiting for a limiter slot, which this caller holds;
+                # the tail fold below covers its turns
+                task.cancel()
+            # Not awaited directly: a retry timeout must not cancel it
+            await asyncio.wait([task])
+        await self._fold(self.transcript.last_seq, limited=False)
+        return self.state.result()
+
+    def fallback(self):
+        """Final summary without the LLM, for when finish() keeps failing."""
+        self._finishing = True
+        self._fold_locally(self.transcript.last_seq)
+        return self.state.result()
+
+    def snapshot(self):
+        return {"folded_seq": self.state.folded_seq, "updates": self.state.updates,
+                "fallbacks": self.state.fallbacks, "updating": self._task is not None}
@@ -0,0 +1,221 @@
+import os
+import threading
+from bisect import bisect_left, insort
+from datetime import date, datetime, timedelta
+
+# Length of one appointment slot in minutes
+BOOKING_SLOT_MINUTES = int(os.getenv('BOOKING_SLOT_MINUTES', '30'))
+# Bookable hours (24h 'HH:MM') and weekdays (0 = Monday)
+BOOKING_OPEN_TIME = os.getenv('BOOKING_OPEN_TIME', '08:00')
+BOOKING_CLOSE_TIME = os.getenv('BOOKING_CLOSE_TIME', '17:00')
+BOOKING_DAYS = os.getenv('BOOKING_DAYS', '0,1,2,3,4')
+# Bookings allowed per treatment in one slot
+BOOKING_SLOT_CAPACITY = int(os.getenv('BOOKING_SLOT_CAPACITY', '1'))
+# How many days ahead next_free_slots looks before giving up
+BOOKING_HORIZON_DAYS = int(os.getenv('BOOKING_HORIZON_DAYS', '90'))
+
+
+def _minutes(hhmm):
+    hours, minutes = hhmm.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+def _hhmm(minutes):
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+def spoken_time(hhmm):
+    """24h 'HH:MM' -> 'H:MM AM/PM', the format create_booking takes."""
+    return datetime.strptime(hhmm, '%H:%M').strftime('%I:%M %p').lstrip("0")
+
+
+def normalize_treatment(treatment):
+    return " ".join(str(treatment).split()).casefold()
+
+
+class SlotCalendar:
+    """The grid of bookable slots: opening hours, weekdays and slot length."""
+
+    __slots__ = ("slot_minutes", "open_minutes", "close_minutes", "days", "capacity")
+
+    def __init__(self, slot_minutes=BOOKING_SLOT_MINUTES, open_time=BOOKING_OPEN_TIME,
+                 close_time=BOOKING_CLOSE_TIME, days=BOOKING_DAYS, capacity=BOOKING_SLOT_CAPACITY):
+        self.slot_minutes = slot_minutes
+        self.open_minutes = _minutes(open_time)
+        self.close_minutes = _minutes(close_time)
+        self.days = frozenset(int(day) for day in days.split(",") if day.strip())
+        self.capacity = capacity
+
+    def slot_of(self, hhmm):
+        """Start of the grid slot containing 24h time `hhmm`."""
+        minutes = _minutes(hhmm)
+        return _hhmm(minutes - (minutes - self.open_minutes) % self.slot_minutes)
+
+    def bounds(self, hhmm):
+        """(start, end, capacity) of the slot containing `hhmm`, for BookingStore.add."""
+        start = self.slot_of(hhmm)
+        return start, _hhmm(_minutes(start) + self.slot_minutes), self.capacity
+
+    def is_open(self, day, hhmm):
+        """Whether 24h time `hhmm` on `day` (a date) falls in a bookable slot."""
+        return (self.open_minutes <= _minutes(hhmm) < self.close_minutes
+                and self.slot_of(hhmm) in self.day_slots(day))
+
+    def day_slots(self, day):
+        """Slot start times on `day` (a date), empty when closed."""
+        if day.weekday() not in self.days:
+            return []
+        return [_hhmm(m) for m in range(self.open_minutes,
+                                        self.close_minutes - self.slot_minutes + 1,
+                                        self.slot_minutes)]
+
+
+class _Schedule:
+    """Booking counts per slot with the occupied slots kept sorted.
+
+    Keys are 'YYYY-MM-DD HH:MM', which sort chronologically, so the booked
+    slots of one day are a bisect away however many bookings there are.
+    """
+
+    __slots__ = ("counts", "keys")
+
+    def __init__(self):
+        self.counts = {}
+        self.keys = []
+
+    def add_many(self, keys):
+        counts = self.counts
+        new = []
+        for key in keys:
+            count = counts.get(key, 0)
+            if not count:
+                new.append(key)
+            counts[key] = count + 1
+        if len(new) > 64:
+            # Bulk load (startup, rebuild): one merge instead of many inserts
+            new.sort()
+            self.keys = sorted(self.keys + new) if self.keys else new
+        else:
+            for key in new:
+                insort(self.keys, key)
+
+    def booked_on(self, day):
+        """{slot time: count} for one 'YYYY-MM-DD' day."""
+        keys = self.keys
+        start = bisect_left(keys, day)
+        end = bisect_left(keys, day + "~", start)
+        return {key[11:]: self.counts[key] for key in keys[start:end]}
+
+
+class SlotIndex:
+    """In-memory index of booked slots, kept in step with the booking store.
+
+    Built from the store on first use and brought up to date before every
+    lookup by reading only the rows added since the last one (rows from
+    other worker processes included); a replace_all in any process bumps the
+    store's generation and triggers a rebuild. The store itself rejects
+    double bookings inside its write transaction, so a stale index can at
+    worst offer a slot that create_booking then refuses.
+    """
+
+    def __init__(self, store, calendar=None):
+        self.store = store
+        self.calendar = calendar or SlotCalendar()
+        self._lock = threading.Lock()
+        self._schedules = {}
+        self._last_id = 0
+        self._generation = None
+        self.rebuilds = 0
+
+    def sync(self):
+        with self._lock:
+            self._sync()
+
+    def _sync(self):
+        generation = self.store.generation()
+        if generation != self._generation:
+            self._schedules = {}
+            self._last_id = 0
+            self._generation = generation
+            self.rebuilds += 1
+        rows = self.store.slots_since(self._last_id)
+        if not rows:
+            return
+        slot_of = self.calendar.slot_of
+        # Few distinct treatments and times: normalize each once per batch
+        grid, names, added = {}, {}, {}
+        for _, treatment, appointment_date, slot in rows:
+            start = grid.get(slot)
+            if start is None:
+                start = grid[slot] = slot_of(slot)
+            name = names.get(treatment)
+            if name is None:
+                name = names[treatment] = normalize_treatment(treatment)
+            keys = added.get(name)
+            if keys is None:
+                keys = added[name] = []
+            keys.append(f"{appointment_date} {start}")
+        self._last_id = rows[-1][0]
+        schedules = self._schedules
+        for name, keys in added.items():
+            schedule = schedules.get(name)
+            if schedule is None:
+                schedule = schedules[name] = _Schedule()
+            schedule.add_many(keys)
+        every = schedules.get(None)
+        if every is None:
+            every = schedules[None] = _Schedule()
+        every.add_many([key for keys in added.values() for key in keys])
+
+    def _free_on(self, day, treatment, after=None):
+        slots = self.calendar.day_slots(day)
+        if not slots:
+            return slots
+        if treatment is None:
+            # Any treatment: only slots with nothing booked at all
+            schedule, capacity = self._schedules.get(None), 1
+        else:
+            schedule = self._schedules.get(normalize_treatment(treatment))
+            capacity = self.calendar.capacity
+        booked = schedule.booked_on(day.isoformat()) if schedule is not None else {}
+        return [slot for slot in slots
+                if (after is None or slot > after) and booked.get(slot, 0) < capacity]
+
+    def free_slots(self, appointment_date, treatment, now=None):
+        """Free slot start times (24h) for `treatment` on a 'YYYY-MM-DD' date.
+
+        With treatment None, only slots with no booking of any kind count.
+        """
+        day = date.fromisoformat(appointment_date)
+        now = now or datetime.now()
+        if day < now.date():
+            return []
+        after = now.strftime('%H:%M') if day == now.date() else None
+        with self._lock:
+            self._sync()
+            return self._free_on(day, treatment, after)
+
+    def next_free(self, n, treatment, now=None):
+        """The next `n` free (date, slot time) pairs for `treatment`."""
+        now = now or datetime.now()
+        day = now.date()
+        after = now.strftime('%H:%M')
+        found = []
+        with self._lock:
+            self._sync()
+            for _ in range(BOOKING_HORIZON_DAYS):
+                for slot in self._free_on(day, treatment, after):
+                    found.append((day.isoformat(), slot))
+                    if len(found) >= n:
+                        return found
+                day += timedelta(days=1)
+                after = None
+        return found
+
+    def snapshot(self):
+        return {
+            "treatments": {name: len(schedule.keys)
+                           for name, schedule in self._schedules.items() if name is not None},
+            "last_id": self._last_id,
+            "rebuilds": self.rebuilds,
+        }
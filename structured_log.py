@@ -0,0 +1,269 @@
+import atexit
+import collections
+import os
+import re
+import select
+import sys
+import threading
+import time
+from random import random
+
+from json_codec import dumpb
+
+# Where log records go: "-" for stdout, otherwise a file path (appended to)
+LOG_FILE = os.getenv('LOG_FILE', '-')
+# Lowest level written: debug, info, warning or error
+LOG_LEVEL = os.getenv('LOG_LEVEL', 'info')
+# Records waiting for the writer; beyond this new records are dropped and
+# counted rather than blocking the caller
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+# Records serialized and written together
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '256'))
+# Seconds the writer waits for a batch to fill before writing what it has
+LOG_FLUSH_INTERVAL = float(os.getenv('LOG_FLUSH_INTERVAL', '0.2'))
+# Records per second kept for each event type; the rest are counted in a
+# log_suppressed record (0: no limit)
+LOG_RATE_LIMIT = int(os.getenv('LOG_RATE_LIMIT', '200'))
+# Fraction of per-frame events written when LOG_LEVEL is debug
+LOG_SAMPLE_RATE = float(os.getenv('LOG_SAMPLE_RATE', '0.01'))
+# Replace PII with "[redacted]" before records are written
+LOG_REDACT = os.getenv('LOG_REDACT', '1').lower() not in ('0', 'false', 'no')
+# Field names whose values are always redacted, at any depth
+LOG_REDACT_FIELDS = os.getenv(
+    'LOG_REDACT_FIELDS',
+    'email,email_address,phone,from,to,caller,callee,name,cust_name,age,symptoms,summary,text,result')
+# Keep what was said and what tools returned (the `text` and `result` fields)
+# for debugging; emails and phone numbers in them are still scrubbed
+LOG_TRANSCRIPTS = os.getenv('LOG_TRANSCRIPTS', '0').lower() in ('1', 'true', 'yes')
+# Longest string kept in a record; longer ones are cut
+LOG_MAX_FIELD = int(os.getenv('LOG_MAX_FIELD', '1000'))
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVELS = {"debug": DEBUG, "info": INFO, "warning": WARNING, "error": ERROR}
+LEVEL_NAMES = {value: name for name, value in LEVELS.items()}
+
+REDACTED = "[redacted]"
+_EMAIL = re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+")
+# Addresses as a caller spells them out: "sam dot patel at example dot com"
+_SPOKEN_EMAIL = re.compile(r"\b[\w.-]+(?: dot [\w-]+)* at [\w-]+(?: dot [\w-]+)* dot "
+                           r"(?:com|net|org|edu|gov|io|co|uk)\b", re.I)
+_PHONE = re.compile(r"\+?\(?\d[\d ().-]{8,}\d")
+
+
+def _scrub_phone(match):
+    # Dates and times have fewer digits than a phone number
+    text = match.group(0)
+    return REDACTED if sum(c.isdigit() for c in text) >= 10 else text
+
+
+class StructuredLogger:
+    """JSON-lines logger whose calls only queue a record.
+
+    `info(event, call_sid, **fields)` and friends check the level and the
+    per-event rate limit and append a tuple to a deque; a background thread
+    redacts, serializes and writes queued records in batches, so a slow
+    stdout pipe or disk never stalls the event loop. Each write is whole
+    lines of at most PIPE_BUF bytes, so worker processes sharing a pipe do
+    not interleave within a record. Field values are serialized on the
+    writer thread and must not be mutated after they are logged.
+    """
+
+    def __init__(self, path=LOG_FILE, level=LOG_LEVEL, max_pending=LOG_QUEUE_SIZE,
+                 batch_size=LOG_BATCH_SIZE, flush_interval=LOG_FLUSH_INTERVAL,
+                 rate_limit=LOG_RATE_LIMIT, sample_rate=LOG_SAMPLE_RATE, redact=LOG_REDACT,
+                 redact_fields=LOG_REDACT_FIELDS, keep_text=LOG_TRANSCRIPTS,
+                 max_field=LOG_MAX_FIELD, fd=None):
+        self.path = path
+        self.level = LEVELS[level.lower()] if isinstance(level, str) else level
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rate_limit = rate_limit
+        self.sample_rate = sample_rate
+        self.redact = redact
+        if isinstance(redact_fields, str):
+            redact_fields = redact_fields.split(",")
+        self.redact_fields = frozenset(name.strip().lower() for name in redact_fields if name.strip())
+        if keep_text:
+            self.redact_fields -= {"text", "result"}
+        self.max_field = max_field
+        # Descriptor written to; opened by the writer thread unless given
+        self._fd = fd
+        # (time, level, event, call_sid, fields) tuples; deque appends and
+        # pops are atomic, so no lock is taken on either side
+        self._pending = collections.deque()
+        self._wake = threading.Event()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._closing = False
+        # Current rate-limit window (whole seconds) and records per event in it
+        self._window = 0
+        self._counts = {}
+        self.written = 0
+        self.dropped = 0
+        self.suppressed = 0
+        self.write_errors = 0
+
+    def debug(self, event, call_sid=None, **fields):
+        if self.level <= DEBUG:
+            self.log(DEBUG, event, call_sid, fields)
+
+    def info(self, event, call_sid=None, **fields):
+        if self.level <= INFO:
+            self.log(INFO, event, call_sid, fields)
+
+    def warning(self, event, call_sid=None, **fields):
+        if self.level <= WARNING:
+            self.log(WARNING, event, call_sid, fields)
+
+    def error(self, event, call_sid=None, **fields):
+        self.log(ERROR, event, call_sid, fields)
+
+    def sample(self, event, call_sid=None, **fields):
+        """Per-frame debug event; each one is written with probability `sample_rate`."""
+        if self.level <= DEBUG and random() < self.sample_rate:
+            fields["sampled"] = self.sample_rate
+            self.log(DEBUG, event, call_sid, fields)
+
+    def log(self, level, event, call_sid=None, fields=None):
+        if level < self.level:
+            return
+        now = time.time()
+        if self.rate_limit:
+            window = int(now)
+            if window != self._window:
+                self._roll_window(window, now)
+            # May be called from tool threads too; a lost increment only
+            # lets one extra record through
+            count = self._counts.get(event, 0) + 1
+            self._counts[event] = count
+            if count > self.rate_limit:
+                return
+        self._append((now, level, event, call_sid, fields))
+
+    def _append(self, record):
+        pending = self._pending
+        if len(pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        pending.append(record)
+        if len(pending) >= self.batch_size:
+            self._wake.set()
+        if self._thread is None:
+            self._start()
+
+    def _roll_window(self, window, now):
+        over = {event: count - self.rate_limit for event, count in self._counts.items()
+                if count > self.rate_limit}
+        self._window = window
+        self._counts = {}
+        if over:
+            self.suppressed += sum(over.values())
+            self._append((now, WARNING, "log_suppressed", None, {"events": over, "seconds": 1}))
+
+    def _start(self):
+        with self._start_lock:
+            if self._thread is None and not self._closing:
+                thread = threading.Thread(target=self._run, name="structured-log", daemon=True)
+                thread.start()
+                self._thread = thread
+
+    def _run(self):
+        if self._fd is None:
+            try:
+                self._fd = (sys.stdout.fileno() if self.path == "-" else
+                            os.open(self.path, os.O_WRONLY | os.O_CREAT | os.O_APPEND, 0o644))
+            except (OSError, ValueError) as e:
+                # Nowhere to write; keep draining so memory stays bounded
+                print(f"Log output {self.path} unavailable: {e}", file=sys.stderr)
+                self._fd = -1
+        while not self._closing:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def flush(self):
+        """Write everything queued so far (called by the writer thread)."""
+        pending = self._pending
+        while pending:
+            lines = []
+            try:
+                for _ in range(self.batch_size):
+                    lines.append(self._format(*pending.popleft()))
+            except IndexError:
+                pass
+            self._write(lines)
+
+    def _format(self, ts, level, event, call_sid, fields):
+        record = {"ts": round(ts, 3), "level": LEVEL_NAMES.get(level, level), "event": event}
+        if call_sid is not None:
+            record["call_sid"] = call_sid
+        if fields:
+            for key, value in fields.items():
+                record[key] = self._clean(key, value, 0)
+        try:
+            return dumpb(record, default=str)
+        except (TypeError, ValueError) as e:
+            return dumpb({"ts": record["ts"], "level": "error", "event": "log_format_error",
+                          "for_event": str(event), "error": str(e)})
+
+    def _clean(self, key, value, depth):
+        """Redact and bound one field value."""
+        if self.redact and value is not None and str(key).lower() in self.redact_fields:
+            return REDACTED
+        if isinstance(value, str):
+            if self.redact:
+                value = _EMAIL.sub(REDACTED, value)
+                value = _SPOKEN_EMAIL.sub(REDACTED, value)
+                value = _PHONE.sub(_scrub_phone, value)
+            return value if len(value) <= self.max_field else value[:self.max_field] + "..."
+        if depth >= 4:
+            return value if isinstance(value, (int, float, bool)) else "..."
+        if isinstance(value, dict):
+            return {k: self._clean(k, v, depth + 1) for k, v in value.items()}
+        if isinstance(value, (list, tuple)):
+            # Items inherit the list's field name: a list of emails is redacted
+            return [self._clean(key, v, depth + 1) for v in value[:50]]
+        return value
+
+    def _write(self, lines):
+        if self._fd < 0 or not lines:
+            self.written += len(lines)
+            return
+        # Writes of at most PIPE_BUF bytes to a pipe are atomic
+        chunk, size = [], 0
+        for line in lines:
+            data = line + b"\n"
+            if chunk and size + len(data) > select.PIPE_BUF:
+                self._write_all(b"".join(chunk))
+                chunk, size = [], 0
+            chunk.append(data)
+            size += len(data)
+        if chunk:
+            self._write_all(b"".join(chunk))
+        self.written += len(lines)
+
+    def _write_all(self, data):
+        try:
+            while data:
+                data = data[os.write(self._fd, data):]
+        except OSError:
+            self.write_errors += 1
+
+    def close(self, timeout=2.0):
+        """Write what is queued and stop the writer thread."""
+        with self._start_lock:
+            self._closing = True
+            thread = self._thread
+        if thread is not None:
+            self._wake.set()
+            thread.join(timeout)
+
+    def snapshot(self):
+        return {"queued": len(self._pending), "written": self.written, "dropped": self.dropped,
+                "suppressed": self.suppressed, "write_errors": self.write_errors}
+
+
+log = StructuredLogger()
+atexit.register(log.close)
@@ -0,0 +1,139 @@
+import asyncio
+import os
+import random
+import time
+from generate_summary import request_summary
+from structured_log import log
+
+# Number of worker tasks draining the summary queue
+SUMMARY_WORKERS = int(os.getenv('SUMMARY_WORKERS', '4'))
+# Maximum LLM requests in flight across all workers
+SUMMARY_CONCURRENCY = int(os.getenv('SUMMARY_CONCURRENCY', '4'))
+# Attempts per job (first try included) and base backoff in seconds
+SUMMARY_MAX_ATTEMPTS = int(os.getenv('SUMMARY_MAX_ATTEMPTS', '3'))
+SUMMARY_BACKOFF = float(os.getenv('SUMMARY_BACKOFF', '0.5'))
+# Overall deadline per job in seconds, including retries
+SUMMARY_DEADLINE = float(os.getenv('SUMMARY_DEADLINE', '30'))
+# Jobs waiting beyond this are rejected instead of growing memory without bound
+SUMMARY_QUEUE_SIZE = int(os.getenv('SUMMARY_QUEUE_SIZE', '1000'))
+
+
+class SummaryWorker:
+    """Background post-call summarization.
+
+    enqueue() returns immediately; a pool of worker tasks calls the LLM with a
+    concurrency cap, retries with exponential backoff and a per-job deadline,
+    then hands the result to the publish callback (e.g. the dashboard broadcast).
+    A job is whatever `summarize` takes (by default the conversation); when
+    every attempt fails, `fallback(job)` gives the summary if set.
+    """
+
+    def __init__(self, publish, summarize=request_summary, workers=SUMMARY_WORKERS,
+                 concurrency=SUMMARY_CONCURRENCY, max_attempts=SUMMARY_MAX_ATTEMPTS,
+                 backoff=SUMMARY_BACKOFF, deadline=SUMMARY_DEADLINE,
+                 queue_size=SUMMARY_QUEUE_SIZE, fallback=None):
+        self.publish = publish
+        self.summarize = summarize
+        self.fallback = fallback
+        self.workers = workers
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.deadline = deadline
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        # Also shared with mid-call summary updates, so they count against the cap
+        self.limiter = asyncio.Semaphore(concurrency)
+        self._tasks = []
+        self.completed = 0
+        self.failed = 0
+        self.retries = 0
+        self.dropped = 0
+        self.fallbacks = 0
+
+    def start(self):
+        if not self._tasks:
+            self._tasks = [asyncio.ensure_future(self._run()) for _ in range(self.workers)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def enqueue(self, callsid, job):
+        """Queue a finished call for summarization. Never blocks."""
+        self.start()
+        try:
+            self._queue.put_nowait((callsid, job, time.monotonic()))
+            return True
+        except asyncio.QueueFull:
+            self.dropped += 1
+            log.error("summary_dropped", callsid, reason="queue full")
+            return False
+
+    async def join(self):
+        """Wait until every queued job has been processed."""
+        await self._queue.join()
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    async def _run(self):
+        while True:
+            callsid, job, queued_at = await self._queue.get()
+            try:
+                summary = await self._summarize_with_retries(callsid, job, queued_at)
+                await self.publish(callsid, summary)
+            except Exception as e:
+                log.error("summary_publish_error", callsid, error=str(e))
+            finally:
+                self._queue.task_done()
+
+    async def _summarize_with_retries(self, callsid, job, queued_at):
+        deadline = queued_at + self.deadline
+        last_error = None
+        for attempt in range(self.max_attempts):
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                async with self.limiter:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    summary = await asyncio.wait_for(self.summarize(job), remaining)
+                self.completed += 1
+                return summary
+            except asyncio.TimeoutError:
+                last_error = "deadline exceeded"
+                break
+            except Exception as e:
+                last_error = str(e)
+                log.warning("summary_attempt_failed", callsid, attempt=attempt + 1, error=str(e))
+            if attempt + 1 < self.max_attempts:
+                self.retries += 1
+                delay = self.backoff * (2 ** attempt) * (0.5 + random.random())
+                await asyncio.sleep(min(delay, max(0.0, deadline - time.monotonic())))
+
+        if self.fallback is not None:
+            try:
+                summary = self.fallback(job)
+                self.fallbacks += 1
+                log.warning("summary_fallback", callsid, error=last_error or 'deadline exceeded')
+                return summary
+            except Exception as e:
+                log.error("summary_fallback_error", callsid, error=str(e))
+        self.failed += 1
+        return {
+            "cust_name": "Unknown",
+            "summary": f"Summary unavailable due to an error: {last_error or 'deadline exceeded'}"
+        }
+
+    def snapshot(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "completed": self.completed,
+            "failed": self.failed,
+            "retries": self.retries,
+            "dropped": self.dropped,
+            "fallbacks": self.fallbacks,
+        }
@@ -0,0 +1,164 @@
+import asyncio
+import inspect
+import json
+import time
+from collections import OrderedDict
+
+
+class CachePolicy:
+    """How results of one tool are cached.
+
+    Only idempotent tools are cached. Entries expire after `ttl` seconds
+    (None: until invalidated) and the least recently used entry is evicted
+    past `max_entries`. `tags` name the data the result depends on; calling
+    a tool registered with `invalidates` for one of those tags drops them.
+    """
+
+    __slots__ = ("idempotent", "ttl", "max_entries", "tags")
+
+    def __init__(self, idempotent=True, ttl=None, max_entries=256, tags=()):
+        self.idempotent = idempotent
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.tags = tuple(tags)
+
+
+class CacheStats:
+    __slots__ = ("hits", "misses", "coalesced", "evictions", "expirations", "invalidations")
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class _FunctionCache:
+    __slots__ = ("policy", "signature", "entries", "pending", "stats", "generation")
+
+    def __init__(self, func, policy):
+        self.policy = policy
+        try:
+            self.signature = inspect.signature(func)
+        except (TypeError, ValueError):
+            self.signature = None
+        # key -> (expires_at, result), most recently used last
+        self.entries = OrderedDict()
+        # key -> future of a call in progress, so concurrent misses share it
+        self.pending = {}
+        self.stats = CacheStats()
+        # Bumped on invalidation; results of calls started before are not stored
+        self.generation = 0
+
+
+class ToolCache:
+    """Memoized results of idempotent tool calls, shared by all calls.
+
+    Arguments are canonicalized (defaults applied, keys sorted) so the same
+    lookup phrased differently by the agent hits the same entry. Everything
+    runs on the event loop thread; no locking is needed.
+    """
+
+    def __init__(self, function_map):
+        self._caches = {}
+        self._by_tag = {}
+        for name, func in function_map.items():
+            policy = getattr(func, "cache_policy", None)
+            if policy is None or not policy.idempotent:
+                continue
+            cache = self._caches[name] = _FunctionCache(func, policy)
+            for tag in policy.tags:
+                self._by_tag.setdefault(tag, []).append(cache)
+
+    def __contains__(self, func_name):
+        return func_name in self._caches
+
+    def key(self, func_name, arguments):
+        signature = self._caches[func_name].signature
+        if signature is not None:
+            try:
+                bound = signature.bind(**arguments)
+                bound.apply_defaults()
+                arguments = bound.arguments
+            except TypeError:
+                # Let the call itself report the bad arguments
+                pass
+        return json.dumps(arguments, sort_keys=True, separators=(",", ":"), default=str)
+
+    async def get_or_run(self, func_name, arguments, run):
+        """Return the cached result for these arguments, or await run() and cache it."""
+        cache = self._caches[func_name]
+        key = self.key(func_name, arguments)
+        stats = cache.stats
+        entry = cache.entries.get(key)
+        if entry is not None:
+            expires_at, result = entry
+            if expires_at is None or expires_at > time.monotonic():
+                cache.entries.move_to_end(key)
+                stats.hits += 1
+                return result
+            del cache.entries[key]
+            stats.expirations += 1
+
+        pending = cache.pending.get(key)
+        if pending is not None:
+            stats.coalesced += 1
+            await asyncio.wait([pending])
+            if pending.cancelled():
+                # The caller that was running it went away; run it ourselves
+                return await self.get_or_run(func_name, arguments, run)
+            return pending.result()
+
+        stats.misses += 1
+        generation = cache.generation
+        future = asyncio.get_running_loop().create_future()
+        cache.pending[key] = future
+        try:
+            result = await run()
+        except BaseException as e:
+            if not isinstance(e, asyncio.CancelledError):
+                future.set_exception(e)
+                # Nobody may be waiting; don't log "exception never retrieved"
+                future.exception()
+            else:
+                future.cancel()
+            raise
+        finally:
+            cache.pending.pop(key, None)
+        future.set_result(result)
+        if generation == cache.generation:
+            self._store(cache, key, result)
+        return result
+
+    def _store(self, cache, key, result):
+        ttl = cache.policy.ttl
+        cache.entries[key] = (None if ttl is None else time.monotonic() + ttl, result)
+        cache.entries.move_to_end(key)
+        while len(cache.entries) > cache.policy.max_entries:
+            cache.entries.popitem(last=False)
+            cache.stats.evictions += 1
+
+    def invalidate(self, *tags):
+        """Drop every cached result that depends on any of `tags`."""
+        for tag in tags:
+            for cache in self._by_tag.get(tag, ()):
+                cache.generation += 1
+                if cache.entries:
+                    cache.entries.clear()
+                    cache.stats.invalidations += 1
+
+    def clear(self):
+        for cache in self._caches.values():
+            cache.generation += 1
+            cache.entries.clear()
+
+    def snapshot(self):
+        return {
+            name: dict(cache.stats.as_dict(), entries=len(cache.entries))
+            for name, cache in self._caches.items()
+        }
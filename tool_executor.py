@@ -0,0 +1,187 @@
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tool_cache import ToolCache
+from tool_registry import ToolSpec
+
+# Upper bound on sync tools running at once; extra calls wait in the pool queue
+TOOL_MAX_WORKERS = int(os.getenv('TOOL_MAX_WORKERS', '8'))
+# Default per-function timeout in seconds
+TOOL_DEFAULT_TIMEOUT = float(os.getenv('TOOL_DEFAULT_TIMEOUT', '10'))
+
+# Per-function timeout overrides (seconds), over the tool's declared timeout.
+# Can also be set from the environment as TOOL_TIMEOUT_<FUNCTION_NAME>,
+# e.g. TOOL_TIMEOUT_CREATE_BOOKING=5
+TOOL_TIMEOUTS = {}
+
+
+class ToolTimeoutError(Exception):
+    pass
+
+
+class UnknownToolError(LookupError):
+    """The agent called a function that is not registered."""
+
+
+class FunctionStats:
+    __slots__ = ("calls", "errors", "timeouts", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def as_dict(self):
+        return {
+            "calls": self.calls,
+            "errors": self.errors,
+            "timeouts": self.timeouts,
+            "total_time": self.total_time,
+            "avg_time": self.total_time / self.calls if self.calls else 0.0,
+            "max_time": self.max_time,
+        }
+
+
+class ToolExecutor:
+    """Runs agent tool calls without blocking the event loop.
+
+    Coroutine functions are awaited directly; plain functions run on a bounded
+    thread pool. Every call is subject to a per-function timeout. Functions
+    registered with a cache policy are answered from the shared ToolCache
+    when possible; functions registered with `invalidates` drop the cached
+    results that depend on what they write. Tools from a ToolRegistry have
+    their arguments validated and coerced before anything runs.
+    """
+
+    def __init__(self, function_map, max_workers=TOOL_MAX_WORKERS, timeouts=None,
+                 default_timeout=TOOL_DEFAULT_TIMEOUT):
+        self.function_map = function_map
+        self.max_workers = max_workers
+        self.timeouts = dict(TOOL_TIMEOUTS if timeouts is None else timeouts)
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="tool")
+        self.cache = ToolCache(function_map)
+        self.queue_depth = 0   # sync calls submitted but not yet started
+        self.in_flight = 0     # calls currently executing
+        self.stats = {}
+
+    def timeout_for(self, func_name):
+        env_value = os.getenv(f"TOOL_TIMEOUT_{func_name.upper()}")
+        if env_value:
+            return float(env_value)
+        if func_name in self.timeouts:
+            return self.timeouts[func_name]
+        timeout = getattr(self.function_map.get(func_name), "timeout", None)
+        return self.default_timeout if timeout is None else timeout
+
+    async def execute(self, func_name, arguments):
+        """Run one function call and return its result.
+
+        Raises UnknownToolError for unknown functions, ToolArgumentError for
+        arguments that fail validation and ToolTimeoutError when the function
+        exceeds its timeout; other exceptions propagate unchanged.
+        """
+        func = self.function_map.get(func_name)
+        if func is None:
+            raise UnknownToolError(func_name)
+        invalidates = getattr(func, "invalidates", ())
+        if isinstance(func, ToolSpec):
+            arguments = func.validate(arguments)
+            # The tool's module is imported on its first call, off the loop
+            func = func.load() if func.loaded else await asyncio.to_thread(func.load)
+        if func_name in self.cache:
+            return await self.cache.get_or_run(
+                func_name, arguments, lambda: self._call(func_name, func, arguments))
+        if not invalidates:
+            return await self._call(func_name, func, arguments)
+        try:
+            return await self._call(func_name, func, arguments,
+                                    on_finish=lambda: self.cache.invalidate(*invalidates))
+        finally:
+            # Even a failed write (e.g. a slot taken meanwhile) may mean the
+            # cached view was stale
+            self.cache.invalidate(*invalidates)
+
+    async def _call(self, func_name, func, arguments, on_finish=None):
+        stats = self.stats.get(func_name)
+        if stats is None:
+            stats = self.stats[func_name] = FunctionStats()
+
+        timeout = self.timeout_for(func_name)
+        start = time.perf_counter()
+        try:
+            if asyncio.iscoroutinefunction(func):
+                self.in_flight += 1
+                try:
+                    return await asyncio.wait_for(func(**arguments), timeout)
+                finally:
+                    self.in_flight -= 1
+            return await asyncio.wait_for(self._run_sync(func, arguments, on_finish), timeout)
+        except asyncio.TimeoutError:
+            stats.timeouts += 1
+            raise ToolTimeoutError(f"{func_name} timed out after {timeout:g}s")
+        except Exception:
+            stats.errors += 1
+            raise
+        finally:
+            # Counted once finished, so calls and total_time cover the same calls
+            elapsed = time.perf_counter() - start
+            stats.calls += 1
+            stats.total_time += elapsed
+            if elapsed > stats.max_time:
+                stats.max_time = elapsed
+
+    async def _run_sync(self, func, arguments, on_finish=None):
+        """Run `func` on the pool. `on_finish` is called on the loop when the
+        thread is done, which after a timeout is later than this returns."""
+        loop = asyncio.get_running_loop()
+        # Counters are only touched on the loop thread; state is one of
+        # "queued", "running" or "done"
+        state = ["queued"]
+        self.queue_depth += 1
+
+        def mark_started():
+            if state[0] == "queued":
+                state[0] = "running"
+                self.queue_depth -= 1
+                self.in_flight += 1
+
+        def run():
+            loop.call_soon_threadsafe(mark_started)
+            return func(**arguments)
+
+        def finished(_):
+            try:
+                loop.call_soon_threadsafe(on_finish)
+            except RuntimeError:
+                pass  # loop already closed
+
+        future = self._pool.submit(run)
+        if on_finish is not None:
+            # A timed-out call keeps running in its thread, and what it
+            # writes then must invalidate the cache again
+            future.add_done_callback(finished)
+        try:
+            return await asyncio.wrap_future(future, loop=loop)
+        finally:
+            if state[0] == "queued":
+                self.queue_depth -= 1
+            elif state[0] == "running":
+                self.in_flight -= 1
+            state[0] = "done"
+
+    def snapshot(self):
+        """Counters for monitoring: queue depth, in-flight calls, per-function timings."""
+        return {
+            "queue_depth": self.queue_depth,
+            "in_flight": self.in_flight,
+            "functions": {name: stats.as_dict() for name, stats in self.stats.items()},
+            "cache": self.cache.snapshot(),
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
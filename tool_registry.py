@@ -0,0 +1,284 @@
+import importlib
+import inspect
+import re
+import threading
+from collections.abc import Mapping
+
+_MISSING = object()
+
+# "34", " 34 ", "34.0", "+34"
+_INTEGER = re.compile(r"\s*([+-]?\d+)(?:\.0*)?\s*")
+_TRUE = frozenset(("true", "yes", "y", "1"))
+_FALSE = frozenset(("false", "no", "n", "0"))
+
+
+class ToolArgumentError(ValueError):
+    """The agent's arguments do not match the tool's declared parameters."""
+
+
+def _enum_key(value):
+    return re.sub(r"[^0-9a-z]", "", value.casefold())
+
+
+class Param:
+    """One declared tool parameter: its JSON schema and how to coerce it.
+
+    `type` is a JSON schema type ("string", "integer", "number" or
+    "boolean"). A parameter that is not required and has no `default` is
+    left out of the call when missing, so the function's own default
+    applies.
+    """
+
+    __slots__ = ("type", "description", "required", "default", "enum", "minimum", "maximum")
+
+    def __init__(self, type, description, required=True, default=_MISSING, enum=None,
+                 minimum=None, maximum=None):
+        if type not in _COERCERS:
+            raise ValueError(f"unsupported parameter type '{type}'")
+        self.type = type
+        self.description = description
+        self.required = required
+        self.default = default
+        self.enum = tuple(enum) if enum else None
+        self.minimum = minimum
+        self.maximum = maximum
+
+    def schema(self):
+        schema = {"type": self.type, "description": self.description}
+        if self.enum:
+            schema["enum"] = list(self.enum)
+        if self.minimum is not None:
+            schema["minimum"] = self.minimum
+        if self.maximum is not None:
+            schema["maximum"] = self.maximum
+        return schema
+
+    def coercer(self, name):
+        """A function value -> coerced value, raising ValueError with a message for the agent."""
+        coerce = _COERCERS[self.type](name)
+        if self.enum:
+            exact = {choice: choice for choice in self.enum}
+            choices = {_enum_key(str(choice)): choice for choice in self.enum}
+            options = ", ".join(f"'{choice}'" for choice in self.enum)
+
+            def coerce_enum(value, coerce=coerce):
+                value = coerce(value)
+                # Spelled as declared (the common case), else loosely
+                choice = exact.get(value)
+                if choice is None:
+                    choice = choices.get(_enum_key(str(value)))
+                    if choice is None:
+                        raise ValueError(f"{name} must be one of {options}")
+                return choice
+            return coerce_enum
+        if self.minimum is None and self.maximum is None:
+            return coerce
+        low, high = self.minimum, self.maximum
+
+        def coerce_range(value, coerce=coerce):
+            value = coerce(value)
+            if (low is not None and value < low) or (high is not None and value > high):
+                bounds = (f"between {low} and {high}" if low is not None and high is not None
+                          else f"at least {low}" if low is not None else f"at most {high}")
+                raise ValueError(f"{name} must be {bounds}")
+            return value
+        return coerce_range
+
+
+def _string(name):
+    def coerce(value):
+        if isinstance(value, str):
+            return value.strip()
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return str(value)
+        raise ValueError(f"{name} must be a string")
+    return coerce
+
+
+def _integer(name):
+    def coerce(value):
+        if isinstance(value, int) and not isinstance(value, bool):
+            return value
+        if isinstance(value, float) and value.is_integer():
+            return int(value)
+        if isinstance(value, str):
+            match = _INTEGER.fullmatch(value)
+            if match is not None:
+                return int(match.group(1))
+        raise ValueError(f"{name} must be a whole number")
+    return coerce
+
+
+def _number(name):
+    def coerce(value):
+        if isinstance(value, (int, float)) and not isinstance(value, bool):
+            return value
+        if isinstance(value, str):
+            try:
+                return float(value)
+            except ValueError:
+                pass
+        raise ValueError(f"{name} must be a number")
+    return coerce
+
+
+def _boolean(name):
+    def coerce(value):
+        if isinstance(value, bool):
+            return value
+        key = str(value).strip().casefold()
+        if key in _TRUE:
+            return True
+        if key in _FALSE:
+            return False
+        raise ValueError(f"{name} must be true or false")
+    return coerce
+
+
+_COERCERS = {"string": _string, "integer": _integer, "number": _number, "boolean": _boolean}
+
+
+class ToolSpec:
+    """One agent tool, declared once: schema, validation, caching and where it lives.
+
+    `target` is "module:function"; the module is imported the first time
+    the tool is called, not when the registry is built. Calling the spec
+    calls the function.
+    """
+
+    __slots__ = ("name", "target", "description", "params", "group", "cache_policy",
+                 "invalidates", "timeout", "validate", "_func", "_lock")
+
+    def __init__(self, name, target, description, params=None, group=None, cache=None,
+                 invalidates=(), timeout=None):
+        if ":" not in target:
+            raise ValueError(f"tool '{name}': target must be 'module:function'")
+        self.name = name
+        self.target = target
+        self.description = description
+        self.params = dict(params or {})
+        self.group = group
+        self.cache_policy = cache
+        self.invalidates = tuple(invalidates)
+        self.timeout = timeout
+        self.validate = self._compile()
+        self._func = None
+        self._lock = threading.Lock()
+
+    def _compile(self):
+        """Build the validator once; per call it is one pass over the parameters."""
+        tool = self.name
+        fields = tuple((name, param.coercer(name), param.required, param.default)
+                       for name, param in self.params.items())
+        known = frozenset(self.params)
+        accepted = ", ".join(self.params) or "none"
+
+        def validate(arguments):
+            if not isinstance(arguments, dict):
+                raise ToolArgumentError(f"{tool}: arguments must be a JSON object")
+            problems = []
+            if not known.issuperset(arguments):
+                unknown = ", ".join(sorted(set(arguments) - known))
+                problems.append(f"unknown argument(s) {unknown} (accepted: {accepted})")
+            result = {}
+            missing = []
+            for name, coerce, required, default in fields:
+                value = arguments.get(name)
+                if value is None or value == "":
+                    if required:
+                        missing.append(name)
+                    elif default is not _MISSING:
+                        result[name] = default
+                    continue
+                try:
+                    result[name] = coerce(value)
+                except ValueError as e:
+                    problems.append(str(e))
+            if missing:
+                problems.insert(0, f"missing {', '.join(missing)}")
+            if problems:
+                raise ToolArgumentError(f"{tool}: {'; '.join(problems)}")
+            return result
+        return validate
+
+    def load(self):
+        """Import the implementing module (first call only) and return the function."""
+        func = self._func
+        if func is None:
+            with self._lock:
+                if self._func is None:
+                    module_name, _, attr = self.target.partition(":")
+                    self._func = getattr(importlib.import_module(module_name), attr)
+                func = self._func
+        return func
+
+    @property
+    def loaded(self):
+        return self._func is not None
+
+    def __call__(self, **arguments):
+        return self.load()(**arguments)
+
+    @property
+    def __signature__(self):
+        # For the result cache's argument canonicalization, without importing.
+        # Optional parameters the validator leaves out are keyed as None.
+        empty = inspect.Parameter.empty
+        parameters = [
+            inspect.Parameter(name, inspect.Parameter.KEYWORD_ONLY,
+                              default=param.default if param.default is not _MISSING
+                              else None if not param.required else empty)
+            for name, param in self.params.items()
+        ]
+        return inspect.Signature(parameters)
+
+    def schema(self):
+        """The function schema for agent.think.functions."""
+        return {
+            "name": self.name,
+            "description": self.description,
+            "parameters": {
+                "type": "object",
+                "properties": {name: param.schema() for name, param in self.params.items()},
+                "required": [name for name, param in self.params.items() if param.required],
+            },
+        }
+
+
+class ToolRegistry(Mapping):
+    """Name -> ToolSpec, in declaration order. Usable wherever a function map is."""
+
+    def __init__(self):
+        self._tools = {}
+
+    def add(self, name, target, description, params=None, **options):
+        if name in self._tools:
+            raise ValueError(f"tool '{name}' is already registered")
+        spec = self._tools[name] = ToolSpec(name, target, description, params, **options)
+        return spec
+
+    def __getitem__(self, name):
+        return self._tools[name]
+
+    def __iter__(self):
+        return iter(self._tools)
+
+    def __len__(self):
+        return len(self._tools)
+
+    def groups(self):
+        return sorted({spec.group for spec in self._tools.values() if spec.group})
+
+    def schemas(self, names=None, group=None):
+        """Function schemas for the named tools (or one group, or all), in that order."""
+        if names is None:
+            names = [name for name, spec in self._tools.items()
+                     if group is None or spec.group == group]
+        schemas = []
+        for name in names:
+            spec = self._tools.get(name)
+            if spec is None:
+                raise ValueError(f"unknown tool '{name}'")
+            schemas.append(spec.schema())
+        return schemas
+
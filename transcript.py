@@ -0,0 +1,81 @@
+import os
+from collections import deque
+from itertools import islice
+
+# Turns kept in memory per call; older turns are dropped from the buffer
+CALL_MAX_TURNS = int(os.getenv('CALL_MAX_TURNS', '200'))
+
+
+class Transcript:
+    """Append-only transcript of one call.
+
+    Every ConversationText turn gets a sequence number starting at 1. The
+    dashboard receives each turn once as a transcript_delta and can ask for
+    the turns after a given sequence number to fill gaps or catch up. Only
+    the most recent max_turns turns are kept.
+    """
+
+    __slots__ = ("call_sid", "turns", "next_seq")
+
+    def __init__(self, call_sid, max_turns=CALL_MAX_TURNS):
+        self.call_sid = call_sid
+        self.turns = deque(maxlen=max_turns)
+        self.next_seq = 1
+
+    def append(self, role, text):
+        """Record a turn and return it as {'seq', 'role', 'text'}."""
+        turn = {"seq": self.next_seq, "role": role, "text": text}
+        self.next_seq += 1
+        self.turns.append(turn)
+        return turn
+
+    @property
+    def last_seq(self):
+        return self.next_seq - 1
+
+    def since(self, from_seq):
+        """Turns with a sequence number greater than from_seq."""
+        if not self.turns:
+            return []
+        # Sequence numbers are contiguous, so the offset is direct
+        start = max(0, from_seq - self.turns[0]["seq"] + 1)
+        return list(islice(self.turns, start, None))
+
+    def delta_message(self, turn):
+        return {
+            "type": "transcript_delta",
+            "data": {
+                "call_sid": self.call_sid,
+                "seq": turn["seq"],
+                "role": turn["role"],
+                "text": turn["text"]
+            }
+        }
+
+    def snapshot_message(self, from_seq=0):
+        return {
+            "type": "transcript_snapshot",
+            "data": {
+                "call_sid": self.call_sid,
+                "from_seq": from_seq,
+                "last_seq": self.last_seq,
+                "turns": self.since(from_seq)
+            }
+        }
+
+    def conversation(self):
+        """Buffered turns as user/assistant pairs for summarization."""
+        pairs = []
+        user_parts = []
+        for turn in self.turns:
+            if turn["role"] == "user":
+                user_parts.append(turn["text"])
+            else:
+                pairs.append({
+                    "user_message": " ".join(user_parts),
+                    "assistant_message": turn["text"]
+                })
+                user_parts = []
+        if user_parts:
+            pairs.append({"user_message": " ".join(user_parts), "assistant_message": ""})
+        return pairs
@@ -0,0 +1,198 @@
+import binascii
+import math
+import os
+import time
+from collections import deque
+
+from media_codec import TWILIO_FRAME_BYTES, FrameAssembler
+
+try:
+    import numpy as np
+except ImportError:  # optional; the pure-Python path gives the same results
+    np = None
+
+# Caller audio is sent to the agent in chunks of this many milliseconds; the
+# 400 ms default matches the original 20-message buffer
+INBOUND_FRAME_MS = int(os.getenv('INBOUND_FRAME_MS', '400'))
+# off: send all audio; suppress: stop sending after a silence tail;
+# thin: like suppress, but keep one 20 ms frame per keep-alive interval
+INBOUND_SILENCE_MODE = os.getenv('INBOUND_SILENCE_MODE', 'off')
+# Silence still sent after speech ends so the agent can detect end of turn
+INBOUND_SILENCE_TAIL_MS = int(os.getenv('INBOUND_SILENCE_TAIL_MS', '1000'))
+INBOUND_KEEPALIVE_MS = int(os.getenv('INBOUND_KEEPALIVE_MS', '500'))
+# Energy VAD: RMS floor (16-bit linear), multiple of the noise floor that
+# counts as speech, frames needed to start speech and silence to end it
+VAD_MIN_RMS = float(os.getenv('VAD_MIN_RMS', '300'))
+VAD_NOISE_RATIO = float(os.getenv('VAD_NOISE_RATIO', '3'))
+VAD_ATTACK_FRAMES = int(os.getenv('VAD_ATTACK_FRAMES', '2'))
+VAD_HANGOVER_MS = int(os.getenv('VAD_HANGOVER_MS', '300'))
+
+SILENCE_MODES = ("off", "suppress", "thin")
+FRAME_MS = 20
+
+
+def _mulaw_to_linear(byte):
+    byte = ~byte & 0xFF
+    exponent = (byte >> 4) & 0x07
+    sample = (((byte & 0x0F) << 3) + 0x84 << exponent) - 0x84
+    return -sample if byte & 0x80 else sample
+
+
+# G.711 mulaw byte -> 16-bit linear sample, and its square for energy sums
+MULAW_DECODE = tuple(_mulaw_to_linear(b) for b in range(256))
+_MULAW_SQUARED = tuple(v * v for v in MULAW_DECODE)
+if np is not None:
+    _NP_SQUARED = np.array(_MULAW_SQUARED, dtype=np.float64)
+
+
+def frame_rms(data, frame_bytes=TWILIO_FRAME_BYTES):
+    """RMS level of each complete `frame_bytes` frame in raw mulaw `data`."""
+    count = len(data) // frame_bytes
+    if np is not None:
+        squared = _NP_SQUARED[np.frombuffer(data, dtype=np.uint8, count=count * frame_bytes)]
+        return np.sqrt(squared.reshape(count, frame_bytes).mean(axis=1)).tolist()
+    squared = _MULAW_SQUARED
+    return [
+        math.sqrt(sum(map(squared.__getitem__, data[i:i + frame_bytes])) / frame_bytes)
+        for i in range(0, count * frame_bytes, frame_bytes)
+    ]
+
+
+class EnergyVAD:
+    """Frame-level speech detector on RMS energy with an adaptive noise floor.
+
+    Speech starts after `attack` consecutive loud frames and ends after
+    `hangover_ms` of quiet ones. The noise floor follows quiet frames, so the
+    threshold rises on noisy lines.
+    """
+
+    __slots__ = ("min_rms", "ratio", "attack", "hangover", "noise_floor", "speech",
+                 "_loud", "_quiet")
+
+    def __init__(self, min_rms=VAD_MIN_RMS, ratio=VAD_NOISE_RATIO, attack=VAD_ATTACK_FRAMES,
+                 hangover_ms=VAD_HANGOVER_MS):
+        self.min_rms = min_rms
+        self.ratio = ratio
+        self.attack = attack
+        self.hangover = max(1, hangover_ms // FRAME_MS)
+        self.noise_floor = min_rms / ratio
+        self.speech = False
+        self._loud = 0
+        self._quiet = 0
+
+    @property
+    def threshold(self):
+        return max(self.min_rms, self.noise_floor * self.ratio)
+
+    def update(self, rms):
+        """Feed one frame's RMS. Returns True when speech has just started."""
+        if rms >= self.threshold:
+            self._loud += 1
+            self._quiet = 0
+            if not self.speech and self._loud >= self.attack:
+                self.speech = True
+                return True
+            return False
+        self._loud = 0
+        self._quiet += 1
+        # Track the floor on quiet frames only: fast down, slow up
+        alpha = 0.2 if rms < self.noise_floor else 0.02
+        self.noise_floor += alpha * (rms - self.noise_floor)
+        if self.speech and self._quiet >= self.hangover:
+            self.speech = False
+        return False
+
+
+class InboundAudio:
+    """Caller audio from Twilio to agent-bound chunks.
+
+    Each 20 ms frame goes through the VAD; kept frames are batched into
+    `frame_ms` chunks. With silence suppression, audio stops being sent once
+    the caller has been quiet for `tail_ms` (after the VAD hangover) and
+    resumes when speech starts again, including the few frames the VAD needed
+    to confirm the onset. The chunk holding a speech onset is sent at once.
+    """
+
+    def __init__(self, frame_ms=INBOUND_FRAME_MS, silence_mode=INBOUND_SILENCE_MODE,
+                 tail_ms=INBOUND_SILENCE_TAIL_MS, keepalive_ms=INBOUND_KEEPALIVE_MS,
+                 vad=None, on_speech_start=None):
+        if silence_mode not in SILENCE_MODES:
+            raise ValueError(f"Unknown silence mode: {silence_mode}")
+        self.chunk_bytes = max(1, frame_ms // FRAME_MS) * TWILIO_FRAME_BYTES
+        self.silence_mode = silence_mode
+        self.tail_frames = tail_ms // FRAME_MS
+        self.keepalive_frames = max(1, keepalive_ms // FRAME_MS)
+        self.vad = vad or EnergyVAD()
+        self.on_speech_start = on_speech_start
+        self._frames = FrameAssembler(TWILIO_FRAME_BYTES)
+        self._pending = bytearray()
+        # Latest suppressed frames, sent ahead of the speech that follows them
+        self._preroll = deque(maxlen=self.vad.attack)
+        # Quiet frames since speech last ended (or since the call started)
+        self._quiet = 0
+        self.speech_started_at = None
+        self.speech_starts = 0
+        self.bytes_in = 0
+        self.bytes_sent = 0
+        self.bytes_suppressed = 0
+
+    def feed(self, payload):
+        """Decode a base64 media payload; returns chunks ready to send."""
+        return self.write(binascii.a2b_base64(payload))
+
+    def write(self, chunk):
+        self.bytes_in += len(chunk)
+        frames = self._frames.write(chunk)
+        if not frames:
+            return frames
+        data = frames[0] if len(frames) == 1 else b"".join(frames)
+        out = []
+        for i, rms in enumerate(frame_rms(data)):
+            frame = frames[i]
+            onset = self.vad.update(rms)
+            if onset:
+                self.speech_starts += 1
+                self.speech_started_at = time.monotonic()
+                if self.on_speech_start is not None:
+                    self.on_speech_start()
+                while self._preroll:
+                    preroll = self._preroll.popleft()
+                    self.bytes_suppressed -= len(preroll)
+                    self._pending += preroll
+            if self.vad.speech:
+                self._quiet = 0
+            else:
+                self._quiet += 1
+
+            if self.silence_mode == "off" or self._quiet <= self.tail_frames:
+                self._pending += frame
+                # Send the start of an utterance without waiting for a full chunk
+                if onset or len(self._pending) >= self.chunk_bytes:
+                    self._emit(out)
+            elif (self.silence_mode == "thin"
+                  and (self._quiet - self.tail_frames) % self.keepalive_frames == 0):
+                # Keep-alive frame during silence; sent on its own right away
+                self._pending += frame
+                self._emit(out)
+            else:
+                self.bytes_suppressed += len(frame)
+                self._preroll.append(frame)
+                if self._pending:
+                    # Entering suppression: don't hold the tail back
+                    self._emit(out)
+        return out
+
+    def _emit(self, out):
+        chunk = bytes(self._pending)
+        self._pending.clear()
+        self.bytes_sent += len(chunk)
+        out.append(chunk)
+
+    def snapshot(self):
+        return {
+            "bytes_in": self.bytes_in,
+            "bytes_sent": self.bytes_sent,
+            "bytes_suppressed": self.bytes_suppressed,
+            "speech_starts": self.speech_starts,
+            "noise_floor": round(self.vad.noise_floor, 1),
+        }
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import signal
+import sys
+import tempfile
+
+from event_bus import EventHub
+from structured_log import log
+
+# Number of server processes sharing the listening port
+WORKERS = int(os.getenv('WORKERS', '1'))
+# Seconds to wait before restarting a worker that exited
+WORKER_RESTART_DELAY = float(os.getenv('WORKER_RESTART_DELAY', '1'))
+
+
+class WorkerSupervisor:
+    """Runs the event hub and N copies of the server script.
+
+    Each worker is started with WORKER_ID and EVENT_BUS_SOCKET set; it binds
+    the shared port with SO_REUSEPORT, so the kernel spreads incoming calls
+    across workers, and publishes dashboard events through the hub so every
+    dashboard sees every call. Workers that exit are restarted.
+    """
+
+    def __init__(self, script, count=WORKERS, socket_path=None,
+                 restart_delay=WORKER_RESTART_DELAY):
+        self.script = script
+        self.count = count
+        self.socket_path = socket_path or os.path.join(
+            tempfile.gettempdir(), f"voice-agent-bus-{os.getpid()}.sock")
+        self.restart_delay = restart_delay
+        self.hub = EventHub(self.socket_path)
+        self.processes = {}
+        self.restarts = 0
+        self._stopping = False
+
+    async def _spawn(self, worker_id):
+        env = dict(os.environ, WORKER_ID=str(worker_id), EVENT_BUS_SOCKET=self.socket_path)
+        process = await asyncio.create_subprocess_exec(sys.executable, self.script, env=env)
+        self.processes[worker_id] = process
+        log.info("worker_started", worker=worker_id, pid=process.pid)
+        return process
+
+    async def _watch(self, worker_id):
+        while not self._stopping:
+            process = await self._spawn(worker_id)
+            code = await process.wait()
+            if self._stopping:
+                break
+            self.restarts += 1
+            log.warning("worker_restarting", worker=worker_id, exit_code=code)
+            await asyncio.sleep(self.restart_delay)
+
+    async def run(self):
+        await self.hub.start()
+        loop = asyncio.get_running_loop()
+        stop = asyncio.Event()
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, stop.set)
+        watchers = [asyncio.ensure_future(self._watch(i)) for i in range(self.count)]
+        try:
+            await stop.wait()
+        finally:
+            await self.stop(watchers)
+
+    async def stop(self, watchers=()):
+        self._stopping = True
+        for process in self.processes.values():
+            if process.returncode is None:
+                process.terminate()
+        await asyncio.gather(*(p.wait() for p in self.processes.values()), return_exceptions=True)
+        for watcher in watchers:
+            watcher.cancel()
+        await asyncio.gather(*watchers, return_exceptions=True)
+        await self.hub.stop()
+
+
+def run_workers(script, count=WORKERS):
+    log.info("workers_starting", count=count)
+    asyncio.run(WorkerSupervisor(script, count).run())